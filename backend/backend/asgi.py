@@ -3,6 +3,11 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+生产环境（配置见 gunicorn.conf.py）：
+    gunicorn backend.asgi:application
+单进程开发/调试：
+    uvicorn backend.asgi:application --host 0.0.0.0 --port 8000
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -0,0 +1,44 @@
+"""
+数据库连接复用配置，settings.py 在导入 local_settings 之后调用 configure_databases()。
+
+两种方式：
+- 连接池（DATABASE_POOL['ENABLED']，需要安装 django-db-connection-pool）：每个 worker 进程一个
+  SQLAlchemy QueuePool，请求结束时 Django 关闭连接实际上是还回连接池；取出连接时先 ping（PRE_PING），
+  断开的连接会自动重建。ASGI 下每个请求在不同的线程里执行，只能用这种方式复用连接。
+- 持久连接（DB_CONN_MAX_AGE > 0）：Django 自带，每个线程在 CONN_MAX_AGE 秒内复用自己的连接，
+  CONN_HEALTH_CHECKS 在每个请求第一次查询前检查连接是否可用。只适合 WSGI（固定的线程）。
+都没有启用时每个请求新建一次连接。
+"""
+from importlib.util import find_spec
+
+# Django 自带的数据库后端 -> 对应的连接池后端
+POOL_ENGINES = {
+    'django.db.backends.mysql': 'dj_db_conn_pool.backends.mysql',
+    'django.db.backends.postgresql': 'dj_db_conn_pool.backends.postgresql',
+}
+
+
+def pool_available():
+    return find_spec('dj_db_conn_pool') is not None and find_spec('sqlalchemy') is not None
+
+
+def configure_databases(databases, pool, conn_max_age=0):
+    """返回加上连接复用配置的 DATABASES，不支持连接池的数据库（如 SQLite）保持不变。"""
+    use_pool = pool.get('ENABLED') and pool_available()
+    configured = {}
+    for alias, database in databases.items():
+        database = dict(database)
+        engine = POOL_ENGINES.get(database['ENGINE'])
+        if engine is None:
+            configured[alias] = database
+            continue
+        if use_pool:
+            database['ENGINE'] = engine
+            database['POOL_OPTIONS'] = {key: value for key, value in pool.items() if key != 'ENABLED'}
+            # 每个请求结束时把连接还回连接池，而不是由线程一直占用
+            database['CONN_MAX_AGE'] = 0
+        else:
+            database.setdefault('CONN_MAX_AGE', conn_max_age)
+            database.setdefault('CONN_HEALTH_CHECKS', True)
+        configured[alias] = database
+    return configured
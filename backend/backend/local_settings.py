@@ -56,6 +56,12 @@ LOGGING = {
             'class': 'logging.FileHandler',
             'filename': os.path.join(BASE_DIR, 'logs/django.log'),
         },
+        # 慢请求日志，包含耗时最长的 SQL，见 bills/middleware.py
+        'slow_requests': {
+            'level': 'WARNING',
+            'class': 'logging.FileHandler',
+            'filename': os.path.join(BASE_DIR, 'logs/slow_requests.log'),
+        },
     },
     'loggers': {
         'django': {
@@ -63,6 +69,11 @@ LOGGING = {
             'level': 'ERROR',
             'propagate': True,
         },
+        'bills.middleware': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
 }
 
@@ -71,9 +82,19 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
         'LOCATION': 'redis://127.0.0.1:6379/1',
-    }
+    },
+    # DeepSeek 结果缓存（见 bills/cache.py），过期时间由 DEEPSEEK_CACHE_TIMEOUT 控制
+    # LRU 淘汰需要在 Redis 中配置 maxmemory 和 maxmemory-policy allkeys-lru
+    'llm': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/2',
+        'KEY_PREFIX': 'llm',
+    },
 }
 
+# DeepSeek 结果缓存时间（秒）
+DEEPSEEK_CACHE_TIMEOUT = 60 * 60 * 24
+
 # 邮件配置（如果需要，请提供相关信息后取消注释）
 # EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 # EMAIL_HOST = 'smtp服务器地址'
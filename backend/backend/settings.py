@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -45,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'bills.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -92,6 +94,19 @@ DATABASES = { # MySQL config
     }
 }
 
+# 数据库连接复用，见 backend/dbpool.py（在文件末尾导入 local_settings 之后应用）
+# 连接池：安装 django-db-connection-pool 后自动启用，ASGI 部署（gunicorn.conf.py）应使用这种方式
+DATABASE_POOL = {
+    'ENABLED': os.environ.get('DB_POOL', '1') != '0',
+    'POOL_SIZE': int(os.environ.get('DB_POOL_SIZE', 10)),             # 每个 worker 进程常驻的连接数
+    'MAX_OVERFLOW': int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10)),  # 高峰时额外允许的连接数
+    'TIMEOUT': 10,       # 连接都被占用时等待的秒数
+    'RECYCLE': 60 * 60,  # 连接使用超过该秒数后重建，需小于 MySQL 的 wait_timeout
+    'PRE_PING': True,    # 取出连接时先检查是否可用
+}
+# 没有连接池时 Django 自带的持久连接（秒），只适合 WSGI；ASGI 下每个请求的线程不同，应保持 0
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 0))
+
 # DATABASES = { # SQLite config
 #     'default': {
 #         'ENGINE': 'django.db.backends.sqlite3',
@@ -154,6 +169,56 @@ REST_FRAMEWORK = {
     ]
 }
 
+# DeepSeek 接口配置，见 bills/llm.py
+# API_URL 可以指向本地的模拟服务器做测试
+DEEPSEEK = {
+    'API_URL': os.environ.get('DEEPSEEK_API_URL', 'https://api.deepseek.com/v1/chat/completions'),
+    'API_KEY': os.environ.get('DEEPSEEK_API_KEY', ''),  # 必须通过环境变量配置，不要写在代码里
+    'MODEL': 'deepseek-chat',
+    'CONNECT_TIMEOUT': 5,   # 建立连接超时（秒）
+    'READ_TIMEOUT': 60,     # 等待响应超时（秒）
+    'MAX_RETRIES': 2,       # 429/5xx 的重试次数
+    'BACKOFF_FACTOR': 0.5,  # 重试间隔 0.5s, 1s, 2s...
+    'POOL_MAXSIZE': 20,     # 每个进程的连接池大小
+    'ASYNC_MAX_CONNECTIONS': 500,  # 异步客户端（ASGI）每个事件循环的最大并发连接数
+}
+
+# 智能分析对话窗口，见 bills/conversation.py
+ANALYSIS_HISTORY = {
+    'WINDOW_TOKENS': 3000,           # 每次发送的最近消息 token 预算
+    'SUMMARY_TRIGGER_TOKENS': 3000,  # 窗口外的消息超过该值时压缩成摘要
+    'PAGE_SIZE': 50,                 # 历史记录接口每页条数
+}
+
+# 后台任务队列，见 bills/jobs.py，worker 用 manage.py run_bill_jobs 启动
+BILL_JOBS = {
+    'MAX_RUNNING': 8,            # 全局同时执行的任务数
+    'MAX_RUNNING_PER_USER': 1,   # 每个用户同时执行的任务数
+    'MAX_ACTIVE_PER_USER': 20,   # 每个用户排队和执行中的任务总数
+    'POLL_INTERVAL': 1.0,        # 没有任务时 worker 的轮询间隔（秒）
+    'BACKGROUND_BY_DEFAULT': True,  # 记账和智能分析默认排队执行，需要运行 manage.py run_bill_jobs
+}
+
+# 接口指标和慢请求日志，见 bills/metrics.py，指标通过 /metrics 导出
+METRICS = {
+    'SLOW_REQUEST_SECONDS': 1.0,   # 超过该耗时的请求记录慢请求日志（包含最慢的 SQL）
+    'SLOW_REQUEST_QUERIES': 5,
+    'TOKEN': os.environ.get('METRICS_TOKEN', ''),  # 设置后访问 /metrics 需要 Bearer token
+}
+
+# 缓存，生产环境的 Redis 配置见 local_settings.py
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # DeepSeek 结果缓存，本地内存缓存按 LRU 淘汰，最多保留 MAX_ENTRIES 条
+    'llm': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'llm',
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    },
+}
+
 # Add Simple JWT settings (optional, but good for customization later)
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
@@ -189,3 +254,7 @@ try:
     from .local_settings import *
 except ImportError:
     pass
+
+from .dbpool import configure_databases  # noqa: E402
+
+DATABASES = configure_databases(DATABASES, DATABASE_POOL, DB_CONN_MAX_AGE)
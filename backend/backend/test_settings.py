@@ -0,0 +1,32 @@
+"""
+测试用配置：SQLite + 本地内存缓存，不依赖 MySQL 和 Redis。
+
+python manage.py test bills --settings=backend.test_settings
+"""
+from .settings import *  # noqa: F401,F403
+
+# 不指定 NAME，测试库使用内存中的 SQLite，不在仓库里留下数据库文件
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'llm': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'llm',
+    },
+}
+
+# 测试里会多次登录和注册，换成快速的哈希算法
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# 不写 logs/ 下的日志文件
+LOGGING = {'version': 1, 'disable_existing_loggers': False}
+
+# DeepSeek 调用在测试里都被 mock，只需要一个非空的 API Key
+DEEPSEEK = {**DEEPSEEK, 'API_KEY': 'test-key'}  # noqa: F405
@@ -22,6 +22,7 @@ from rest_framework_simplejwt.views import (
 )
 from bills.serializers import MyTokenObtainPairSerializer
 from bills.views import UserRegistrationView
+from bills.metrics import metrics_view
 
 # It's better to create a custom view that uses your serializer
 class MyTokenObtainPairView(TokenObtainPairView):
@@ -33,4 +34,5 @@ urlpatterns = [
     path('api/token/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/register/', UserRegistrationView.as_view(), name='user_register'),
+    path('metrics', metrics_view, name='metrics'),
 ]
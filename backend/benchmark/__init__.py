@@ -0,0 +1,12 @@
+"""
+压测工具，在 backend 目录下运行：
+
+    python -m benchmark.datagen --users 50 --bills 2000          # 生成压测用户和账单
+    python -m benchmark.stub --port 8765 --latency 0.8           # 本地模拟 DeepSeek 接口
+    DEEPSEEK_API_URL=http://127.0.0.1:8765/v1/chat/completions DEEPSEEK_API_KEY=stub gunicorn backend.asgi:application
+    python -m benchmark.load --concurrency 20 --duration 30      # 压测，结果写入 benchmark/results/
+    python -m benchmark.compare results/a.json results/b.json    # 对比两次结果
+    python -m benchmark.dbconn --requests 500                    # 对比每个请求新建连接、持久连接和连接池
+
+datagen 需要 Django 环境；stub 只用标准库；load 和 compare 只通过 HTTP 访问服务，load 需要 httpx。
+"""
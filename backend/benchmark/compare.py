@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+对比两次压测结果（benchmark.load 生成的 JSON 文件）。
+
+    python -m benchmark.compare benchmark/results/before.json benchmark/results/after.json
+    python -m benchmark.compare before.json after.json --threshold 15
+
+p95 延迟增加或每秒请求数下降超过 --threshold（百分比）时标记为退化，并以退出码 1 结束，可用于部署前检查。
+"""
+import argparse
+import json
+import sys
+
+METRICS = [
+    # (名称, 取值函数, 数值越大越好)
+    ('rps', lambda summary: summary['rps'], True),
+    ('p50', lambda summary: summary['latency_ms']['p50'], False),
+    ('p95', lambda summary: summary['latency_ms']['p95'], False),
+    ('p99', lambda summary: summary['latency_ms']['p99'], False),
+    ('errors', lambda summary: summary['error_rate'] * 100, False),
+]
+
+# 用于判断是否退化的指标
+GATED_METRICS = {'rps', 'p95'}
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def change(before, after):
+    if before is None or after is None:
+        return None
+    if before == 0:
+        return 0.0 if after == 0 else None
+    return (after - before) / before * 100
+
+
+def compare(before, after, threshold):
+    """返回 (行列表, 退化的场景和指标)。"""
+    rows = []
+    regressions = []
+    for name, summary in after['scenarios'].items():
+        previous = before['scenarios'].get(name)
+        if previous is None:
+            rows.append((name, '新场景', '', '', ''))
+            continue
+        for metric, value, higher_is_better in METRICS:
+            old, new = value(previous), value(summary)
+            delta = change(old, new)
+            regressed = (
+                metric in GATED_METRICS and delta is not None
+                and (delta < -threshold if higher_is_better else delta > threshold)
+            )
+            if regressed:
+                regressions.append((name, metric))
+            rows.append((
+                name, metric,
+                '-' if old is None else f'{old:.1f}',
+                '-' if new is None else f'{new:.1f}',
+                ('-' if delta is None else f'{delta:+.1f}%') + (' 退化' if regressed else ''),
+            ))
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='对比两次压测结果')
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10, help='判断退化的变化百分比')
+    args = parser.parse_args(argv)
+
+    before, after = load(args.before), load(args.after)
+    for label, report in (('之前', before), ('之后', after)):
+        print(f"{label}: {report.get('started_at')} {report.get('git_commit') or ''} {report.get('label') or ''}")
+    if before.get('config') != after.get('config'):
+        print(f"注意：两次压测参数不同 {before.get('config')} -> {after.get('config')}")
+
+    rows, regressions = compare(before, after, args.threshold)
+    print(f"{'场景':<20} {'指标':<8} {'之前':>10} {'之后':>10} {'变化':>12}")
+    for name, metric, old, new, delta in rows:
+        print(f'{name:<20} {metric:<8} {old:>10} {new:>10} {delta:>12}')
+    if regressions:
+        print('退化: ' + ', '.join(f'{name}.{metric}' for name, metric in regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
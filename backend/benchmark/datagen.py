@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+生成压测数据：N 个用户，每人 M 条账单（分布在最近一年，同时维护 DailyBillRollup）。
+
+    python -m benchmark.datagen --users 50 --bills 2000
+    python -m benchmark.datagen --users 50 --bills 2000 --reset   # 先删除之前生成的压测用户
+
+用户名为 <prefix>0001、<prefix>0002 ...，密码相同，benchmark.load 用同样的参数登录。
+"""
+import argparse
+import os
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+CHUNK_SIZE = 2000
+
+DEFAULT_PREFIX = 'bench'
+DEFAULT_PASSWORD = 'bench12345'
+
+# (收支, 分类, 权重, 金额范围, 备注)
+BILL_TEMPLATES = [
+    ('expense', 'food', 30, (8, 120), ['早餐 包子豆浆', '午饭 黄焖鸡米饭', '星巴克咖啡', '瑞幸咖啡', '晚饭 火锅', '外卖 麻辣烫']),
+    ('expense', 'transportation', 15, (3, 80), ['地铁', '公交', '滴滴打车', '加油']),
+    ('expense', 'shopping', 12, (20, 800), ['淘宝 运动鞋', '超市买菜', '京东 耳机', '优衣库 T恤']),
+    ('expense', 'living', 10, (10, 300), ['水电费', '话费充值', '物业费', None]),
+    ('expense', 'entertainment', 8, (30, 400), ['电影票', '游戏充值', 'KTV', '演唱会门票']),
+    ('expense', 'housing', 2, (1500, 6000), ['房租']),
+    ('expense', 'medical', 3, (20, 500), ['药店', '医院挂号']),
+    ('expense', 'pet', 3, (20, 300), ['猫粮', '宠物医院']),
+    ('income', 'salary', 2, (6000, 20000), ['工资']),
+    ('income', 'bonus', 1, (500, 5000), ['季度奖金']),
+    ('income', 'red_packet', 4, (5, 200), ['微信红包', '支付宝红包']),
+]
+
+
+def username(prefix, index):
+    return f'{prefix}{index + 1:04d}'
+
+
+def bill_rows(rng, count, today, days=365):
+    """按权重随机生成 count 条账单数据。"""
+    weights = [template[2] for template in BILL_TEMPLATES]
+    for template in rng.choices(BILL_TEMPLATES, weights=weights, k=count):
+        bill_type, category, _, (low, high), remarks = template
+        yield {
+            'date': today - timedelta(days=rng.randrange(days)),
+            'type': bill_type,
+            'category': category,
+            'amount': Decimal(rng.randint(low * 100, high * 100)) / 100,
+            'remark': rng.choice(remarks),
+        }
+
+
+def generate(users, bills, prefix=DEFAULT_PREFIX, password=DEFAULT_PASSWORD, reset=False, seed=0):
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+
+    from bills.bulk import insert_bills
+
+    started = time.monotonic()
+    if reset:
+        deleted, _ = User.objects.filter(username__startswith=prefix).delete()
+        print(f'已删除之前的压测数据 {deleted} 行')
+
+    names = [username(prefix, index) for index in range(users)]
+    existing = set(User.objects.filter(username__in=names).values_list('username', flat=True))
+    # 所有用户使用同一个密码哈希，避免逐个计算
+    password_hash = make_password(password)
+    User.objects.bulk_create([User(username=name, password=password_hash) for name in names if name not in existing])
+
+    rng = random.Random(seed)
+    today = timezone.localdate()
+    total = 0
+    for user in User.objects.filter(username__in=names).order_by('username'):
+        remaining = bills - user.bill_set.count()
+        while remaining > 0:
+            size = min(remaining, CHUNK_SIZE)
+            insert_bills(user, list(bill_rows(rng, size, today)))
+            remaining -= size
+            total += size
+        print(f'{user.username}: {bills} 条账单')
+
+    print(f'生成完成: {users} 个用户, 新增 {total} 条账单, 耗时 {time.monotonic() - started:.1f}s')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='生成压测用户和账单')
+    parser.add_argument('--users', type=int, default=20, help='用户数')
+    parser.add_argument('--bills', type=int, default=1000, help='每个用户的账单数')
+    parser.add_argument('--prefix', default=DEFAULT_PREFIX, help='用户名前缀')
+    parser.add_argument('--password', default=DEFAULT_PASSWORD, help='压测用户的密码')
+    parser.add_argument('--reset', action='store_true', help='先删除用户名以 prefix 开头的用户及其数据')
+    parser.add_argument('--seed', type=int, default=0, help='随机数种子，相同参数生成相同的数据')
+    args = parser.parse_args(argv)
+
+    # benchmark.load 只通过 HTTP 访问服务，Django 环境只在这里初始化
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    django.setup()
+    generate(args.users, args.bills, args.prefix, args.password, args.reset, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+"""
+比较数据库连接的复用方式对小接口的影响，在 backend 目录下运行：
+
+    python -m benchmark.dbconn --requests 500
+    python -m benchmark.dbconn --mode new --mode pool --output results/dbconn.json
+
+每种方式在单独的子进程里启动 Django（连接方式由 settings 启动时决定，见 backend/dbpool.py），
+用测试客户端在进程内反复请求 today_summary 和账单列表，不经过网络和 HTTP 服务器，
+每个请求前后与服务器一样调用 close_old_connections()，剩下的差别就是建立连接的开销：
+    new         每个请求新建连接（CONN_MAX_AGE=0，不用连接池）
+    persistent  Django 持久连接（CONN_MAX_AGE=600 + CONN_HEALTH_CHECKS，适合 WSGI）
+    pool        django-db-connection-pool 连接池（需要安装，适合 ASGI）
+MySQL 下同时统计实际新建的数据库连接数（SHOW GLOBAL STATUS 的 Connections）。
+需要先用 benchmark.datagen 生成压测用户；经过 HTTP 的对比可以分别用 DB_POOL=0/1 启动服务，
+再用 benchmark.load 和 benchmark.compare。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from .datagen import DEFAULT_PREFIX, username
+from .load import git_commit, percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    'new': {'DB_POOL': '0', 'DB_CONN_MAX_AGE': '0'},
+    'persistent': {'DB_POOL': '0', 'DB_CONN_MAX_AGE': '600'},
+    'pool': {'DB_POOL': '1', 'DB_CONN_MAX_AGE': '0'},
+}
+
+ENDPOINTS = {
+    'today_summary': '/api/bills/today_summary/',
+    'list': '/api/bills/?page_size=20',
+}
+
+
+def server_connections(connection):
+    """MySQL 启动以来的连接次数，其他数据库返回 None。"""
+    if connection.vendor != 'mysql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW GLOBAL STATUS LIKE 'Connections'")
+        return int(cursor.fetchone()[1])
+
+
+def check_mode(mode, database):
+    if mode == 'pool' and not database['ENGINE'].startswith('dj_db_conn_pool.'):
+        return '连接池没有启用，请安装 django-db-connection-pool（数据库需要是 MySQL 或 PostgreSQL）'
+    if mode == 'persistent' and not database['CONN_MAX_AGE']:
+        return '持久连接没有启用（SQLite 等数据库不使用 DB_CONN_MAX_AGE）'
+    return None
+
+
+def run_child(mode, requests, warmup, prefix):
+    """在当前进程里运行一种方式，返回统计结果。"""
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    django.setup()
+
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.db import close_old_connections, connection
+    from django.test import Client
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    database = settings.DATABASES['default']
+    result = {'mode': mode, 'engine': database['ENGINE'], 'conn_max_age': database['CONN_MAX_AGE']}
+    error = check_mode(mode, database)
+    if error:
+        return dict(result, error=error)
+
+    user = User.objects.filter(username=username(prefix, 0)).first()
+    if user is None:
+        return dict(result, error='没有压测用户，请先运行 benchmark.datagen')
+    client = Client()
+    headers = {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+    close_old_connections()
+    connections_before = server_connections(connection)
+
+    result['endpoints'] = {}
+    for name, url in ENDPOINTS.items():
+        latencies = []
+        for index in range(warmup + requests):
+            started = time.perf_counter()
+            # 测试客户端不会像服务器那样在请求开始和结束时处理连接，这里手动调用
+            close_old_connections()
+            response = client.get(url, headers=headers)
+            close_old_connections()
+            elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                return dict(result, error=f'{url} 返回 {response.status_code}')
+            if index >= warmup:
+                latencies.append(elapsed * 1000)
+        latencies.sort()
+        result['endpoints'][name] = {
+            'requests': requests,
+            'mean_ms': round(sum(latencies) / len(latencies), 3),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+        }
+
+    connections_after = server_connections(connection)
+    if connections_before is not None:
+        # 每个请求新建连接时会多算一个读取计数本身用到的连接
+        result['db_connections'] = connections_after - connections_before
+        result['total_requests'] = len(ENDPOINTS) * (warmup + requests)
+    return result
+
+
+def run_mode(mode, args):
+    command = [
+        sys.executable, '-m', 'benchmark.dbconn', '--child', mode,
+        '--requests', str(args.requests), '--warmup', str(args.warmup), '--prefix', args.prefix,
+    ]
+    process = subprocess.run(
+        command, cwd=BACKEND_DIR, env={**os.environ, **MODES[mode]}, capture_output=True, text=True
+    )
+    if process.returncode != 0:
+        return {'mode': mode, 'error': process.stderr.strip().splitlines()[-1] if process.stderr else '子进程失败'}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def print_results(results):
+    baseline = next((result for result in results if result['mode'] == 'new' and 'error' not in result), None)
+    print(f"{'方式':<12} {'接口':<14} {'平均(ms)':>9} {'p50(ms)':>9} {'p95(ms)':>9} {'比 new 节省':>12} {'新建连接':>8}")
+    for result in results:
+        if 'error' in result:
+            print(f"{result['mode']:<12} 跳过：{result['error']}")
+            continue
+        for name, summary in result['endpoints'].items():
+            saving = ''
+            if baseline is not None and result is not baseline:
+                saving = f"{baseline['endpoints'][name]['mean_ms'] - summary['mean_ms']:+.3f}ms"
+            connections = result.get('db_connections')
+            print(
+                f"{result['mode']:<12} {name:<14} {summary['mean_ms']:>9.3f} {summary['p50_ms']:>9.3f} "
+                f"{summary['p95_ms']:>9.3f} {saving:>12} {'-' if connections is None else connections:>8}"
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='比较数据库连接的复用方式')
+    parser.add_argument('--mode', action='append', choices=list(MODES), help='要比较的方式，可以重复；默认全部')
+    parser.add_argument('--requests', type=int, default=500, help='每个接口统计的请求数')
+    parser.add_argument('--warmup', type=int, default=20, help='每个接口开始时不计入统计的请求数')
+    parser.add_argument('--prefix', default=DEFAULT_PREFIX, help='压测用户名前缀，使用第一个用户')
+    parser.add_argument('--output', help='把结果写入 JSON 文件')
+    parser.add_argument('--child', choices=list(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.requests, args.warmup, args.prefix), ensure_ascii=False))
+        return
+
+    started_at = datetime.now()
+    results = [run_mode(mode, args) for mode in args.mode or list(MODES)]
+    print_results(results)
+    if args.output:
+        report = {
+            'started_at': started_at.isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'config': {'requests': args.requests, 'warmup': args.warmup},
+            'results': results,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'结果已保存到 {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+"""
+asyncio 压测：每个场景由 --concurrency 个虚拟用户循环请求 --duration 秒（闭环，收到响应后立即发下一个），
+统计 p50/p95/p99 延迟和每秒请求数，结果写入 JSON 文件，可以用 benchmark.compare 对比。
+
+    python -m benchmark.load --base-url http://127.0.0.1:8000 --concurrency 20 --duration 30
+    python -m benchmark.load --scenario list --scenario search --output results/list.json
+
+压测用户需要先用 benchmark.datagen 生成（--users / --prefix / --password 与生成时一致）。
+DeepSeek 相关的场景需要服务端的 DEEPSEEK_API_URL 指向 benchmark.stub，避免调用真实接口；
+这些场景带 async=0，测量的是请求内完成的耗时，而不是提交后台任务。
+写入类场景（bulk_create、call_deepseek、analyze）会新增数据，默认排在读取类场景之后。
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from .datagen import DEFAULT_PASSWORD, DEFAULT_PREFIX, username
+
+try:
+    import httpx
+except ImportError:  # 只有压测需要 httpx
+    httpx = None
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+SEARCH_TERMS = ['咖啡', '午饭', '打车', '超市', '红包', '电影']
+FILTERS = [
+    {'type': 'expense', 'category': 'food'},
+    {'type': 'expense', 'category': 'food,shopping'},
+    {'type': 'income'},
+    {'category': 'transportation,living'},
+]
+QUESTIONS = ['这个月吃饭花了多少钱？', '和上个月相比支出有什么变化？', '哪一类支出最多？', '最近一周的交通费是多少？']
+
+SCENARIOS = {}
+
+
+def scenario(name, description):
+    def register(func):
+        SCENARIOS[name] = (description, func)
+        return func
+    return register
+
+
+class VirtualUser:
+    """一个虚拟用户：固定的登录令牌和随机数生成器。"""
+
+    def __init__(self, client, token, index):
+        self.client = client
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.random = random.Random(index)
+        self.index = index
+        self.sent = 0
+
+    def get(self, url, **kwargs):
+        return self.client.get(url, headers=self.headers, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.client.post(url, headers=self.headers, **kwargs)
+
+
+@scenario('list', '账单列表（游标分页，每页 50 条）')
+def list_bills(user):
+    return user.get('/api/bills/', params={'page_size': 50})
+
+
+@scenario('filter', '按收支/分类/日期筛选')
+def filter_bills(user):
+    date_after = (datetime.now().date() - timedelta(days=user.random.choice([7, 30, 90]))).isoformat()
+    return user.get('/api/bills/', params={**user.random.choice(FILTERS), 'date_after': date_after, 'page_size': 50})
+
+
+@scenario('search', '按备注搜索')
+def search_bills(user):
+    return user.get('/api/bills/', params={'search': user.random.choice(SEARCH_TERMS), 'page_size': 50})
+
+
+@scenario('today_summary', '今日收支汇总')
+def today_summary(user):
+    return user.get('/api/bills/today_summary/')
+
+
+@scenario('stats', '按分类汇总')
+def stats(user):
+    return user.get('/api/bills/stats/')
+
+
+@scenario('bulk_create', '批量新增 20 条账单')
+def bulk_create(user):
+    today = datetime.now().date()
+    rows = [
+        {
+            'date': (today - timedelta(days=user.random.randrange(30))).isoformat(),
+            'type': 'expense',
+            'category': user.random.choice(['food', 'transportation', 'shopping']),
+            'amount': f'{user.random.randint(100, 20000) / 100:.2f}',
+            'remark': '压测批量新增',
+        }
+        for _ in range(20)
+    ]
+    return user.post('/api/bills/bulk/', json=rows)
+
+
+@scenario('call_deepseek_local', '记账（本地规则解析，不调用 DeepSeek）')
+def call_deepseek_local(user):
+    return user.post('/api/deepseek/?async=0', json={'input': f'午饭 {user.random.randint(10, 60)}，打车 {user.random.randint(10, 40)}'})
+
+
+@scenario('call_deepseek', '记账（调用 DeepSeek 解析）')
+def call_deepseek(user):
+    # 带日期的输入不能在本地解析；每次输入不同，不命中结果缓存
+    user.sent += 1
+    text = f'{user.random.randint(1, 28)}号和朋友吃饭花了{user.random.randint(50, 500)}，打车回家 {user.index}-{user.sent}'
+    return user.post('/api/deepseek/?async=0', json={'input': text})
+
+
+@scenario('analyze', '智能分析（调用 DeepSeek）')
+def analyze(user):
+    return user.post('/api/analyze/?async=0', json={'text': user.random.choice(QUESTIONS)})
+
+
+def percentile(values, p):
+    """已排序列表的百分位数（线性插值）。"""
+    if not values:
+        return None
+    k = (len(values) - 1) * p / 100
+    low = math.floor(k)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (k - low)
+
+
+def summarize(samples, seconds):
+    """samples 为 (耗时秒, 状态码或异常名) 列表。"""
+    latencies = sorted(latency * 1000 for latency, _ in samples)
+    statuses = Counter(str(status) for _, status in samples)
+    errors = sum(1 for _, status in samples if not isinstance(status, int) or status >= 400)
+
+    def ms(value):
+        return None if value is None else round(value, 2)
+
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0,
+        'seconds': round(seconds, 2),
+        'rps': round(len(samples) / seconds, 2) if seconds else 0,
+        'latency_ms': {
+            'min': ms(latencies[0] if latencies else None),
+            'mean': ms(sum(latencies) / len(latencies) if latencies else None),
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+            'max': ms(latencies[-1] if latencies else None),
+        },
+        'status_codes': dict(sorted(statuses.items())),
+    }
+
+
+async def login(client, names, password):
+    """并发登录压测用户，返回访问令牌列表。"""
+    semaphore = asyncio.Semaphore(10)
+
+    async def obtain(name):
+        async with semaphore:
+            response = await client.post('/api/token/', json={'username': name, 'password': password})
+        if response.status_code != 200:
+            raise SystemExit(f'用户 {name} 登录失败（{response.status_code}），请先运行 benchmark.datagen')
+        return response.json()['access']
+
+    return await asyncio.gather(*(obtain(name) for name in names))
+
+
+async def run_scenario(client, request, tokens, concurrency, duration, warmup):
+    """运行一个场景，返回统计结果；预热阶段的请求不计入。"""
+    started = time.monotonic()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+    samples = []
+
+    async def worker(index):
+        user = VirtualUser(client, tokens[index % len(tokens)], index)
+        while time.monotonic() < stop_at:
+            sent = time.monotonic()
+            try:
+                response = await request(user)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            if sent >= measure_from:
+                samples.append((time.monotonic() - sent, status))
+
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    return summarize(samples, time.monotonic() - measure_from)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(name, summary):
+    latency = summary['latency_ms']
+
+    def fmt(value):
+        return '-' if value is None else f'{value:.1f}'
+
+    print(
+        f"{name:<20} {summary['requests']:>7} {summary['rps']:>9.1f} {fmt(latency['p50']):>9} "
+        f"{fmt(latency['p95']):>9} {fmt(latency['p99']):>9} {summary['error_rate'] * 100:>6.1f}%"
+    )
+
+
+async def run(args):
+    names = [username(args.prefix, index) for index in range(min(args.users, args.concurrency))]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        tokens = await login(client, names, args.password)
+        results = {}
+        print(f"{'场景':<18} {'请求数':>5} {'每秒请求':>5} {'p50(ms)':>9} {'p95(ms)':>9} {'p99(ms)':>9} {'错误率':>5}")
+        for name in args.scenario:
+            _, request = SCENARIOS[name]
+            results[name] = await run_scenario(client, request, tokens, args.concurrency, args.duration, args.warmup)
+            print_summary(name, results[name])
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='账单接口压测')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS),
+                        help='要运行的场景，可以重复；默认按顺序运行全部场景')
+    parser.add_argument('--concurrency', type=int, default=10, help='虚拟用户数')
+    parser.add_argument('--duration', type=float, default=30, help='每个场景统计的时长（秒）')
+    parser.add_argument('--warmup', type=float, default=3, help='每个场景开始时不计入统计的时长（秒）')
+    parser.add_argument('--timeout', type=float, default=60, help='单个请求的超时（秒）')
+    parser.add_argument('--users', type=int, default=20, help='使用的压测用户数（不超过 datagen 生成的用户数）')
+    parser.add_argument('--prefix', default=DEFAULT_PREFIX)
+    parser.add_argument('--password', default=DEFAULT_PASSWORD)
+    parser.add_argument('--label', default='', help='写入结果文件的说明，如部署版本')
+    parser.add_argument('--output', help='结果文件，默认 benchmark/results/<时间>.json')
+    args = parser.parse_args(argv)
+    if httpx is None:
+        sys.exit('压测需要安装 httpx')
+    args.scenario = args.scenario or list(SCENARIOS)
+
+    started_at = datetime.now()
+    results = asyncio.run(run(args))
+    report = {
+        'label': args.label,
+        'started_at': started_at.isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'host': platform.node(),
+        'config': {
+            'base_url': args.base_url,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'warmup': args.warmup,
+            'users': min(args.users, args.concurrency),
+        },
+        'scenarios': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{started_at.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'结果已保存到 {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+"""
+本地模拟 DeepSeek 的 /v1/chat/completions 接口，只依赖标准库。
+
+    python -m benchmark.stub --port 8765 --latency 0.8 --jitter 0.3
+    python -m benchmark.stub --script responses.json --error-rate 0.05
+
+按请求内容返回脚本里第一条匹配的回复：解析记账的提示词返回当天的账单行，
+生成摘要的请求返回摘要，其他请求（智能分析）返回固定的分析结果；支持 stream=True。
+--script 指定的 JSON 文件是规则列表，会排在内置规则前面：
+    [{"match": "工资", "content": "{today}|收入|8000|工资|工资", "latency": 1.5}]
+match 为空表示匹配所有请求，content 中的 {today} 替换为当天日期，latency 覆盖默认延迟。
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_RULES = [
+    # bills.ingest.build_prompt
+    {'match': '只返回数据行', 'content': '{today}|支出|35|吃饭|午饭\n{today}|支出|18|交通|打车回家'},
+    # bills.conversation.SUMMARY_PROMPT
+    {'match': '压缩成一段简洁的中文摘要', 'content': '用户主要关心每月餐饮和交通支出，以及与上月的对比。'},
+    {'match': '', 'content': (
+        '根据您的账单，本月共支出 4,356.20 元，其中吃饭 1,286.50 元占比最高，'
+        '其次是购物 982.00 元和交通 436.80 元。与上月相比，吃饭支出增加了约 12%，'
+        '主要来自外卖和咖啡。建议适当减少外卖次数。'
+    )},
+]
+
+STREAM_CHUNK_CHARS = 8
+
+
+class StubState:
+    def __init__(self, rules, latency, jitter, error_rate, stream_interval, seed=None):
+        self.rules = rules
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.stream_interval = stream_interval
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def pick(self, messages):
+        text = '\n'.join(str(message.get('content', '')) for message in messages)
+        for rule in self.rules:
+            if rule.get('match', '') in text:
+                return rule
+        return {'content': ''}
+
+    def delay(self, rule):
+        latency = rule.get('latency', self.latency)
+        with self.lock:
+            return max(0.0, latency + self.random.uniform(-self.jitter, self.jitter))
+
+    def should_fail(self):
+        with self.lock:
+            self.requests += 1
+            if self.random.random() < self.error_rate:
+                self.errors += 1
+                return True
+        return False
+
+
+def usage(messages, content):
+    """与 bills.conversation.estimate_tokens 类似的粗略估算，只用于指标。"""
+    prompt = sum(len(str(message.get('content', ''))) for message in messages)
+    return {'prompt_tokens': prompt // 2 + 1, 'completion_tokens': len(content) // 2 + 1}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type='application/json'):
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        except ValueError:
+            self._send(400, {'error': {'message': 'invalid json'}})
+            return
+        messages = request.get('messages') or []
+        rule = self.state.pick(messages)
+        content = rule['content'].replace('{today}', date.today().isoformat())
+        time.sleep(self.state.delay(rule))
+
+        if self.state.should_fail():
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.send_header('Retry-After', '0')
+            self.end_headers()
+            return
+        if request.get('stream'):
+            self._stream(messages, content)
+            return
+        self._send(200, {
+            'id': 'stub',
+            'object': 'chat.completion',
+            'model': request.get('model'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': usage(messages, content),
+        })
+
+    def _stream(self, messages, content):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def write(data):
+            chunk = f'data: {data}\n\n'.encode('utf-8')
+            self.wfile.write(f'{len(chunk):x}\r\n'.encode('ascii') + chunk + b'\r\n')
+            self.wfile.flush()
+
+        for start in range(0, len(content), STREAM_CHUNK_CHARS):
+            delta = content[start:start + STREAM_CHUNK_CHARS]
+            write(json.dumps({'choices': [{'index': 0, 'delta': {'content': delta}}]}, ensure_ascii=False))
+            time.sleep(self.state.stream_interval)
+        write(json.dumps({'choices': [], 'usage': usage(messages, content)}))
+        write('[DONE]')
+        self.wfile.write(b'0\r\n\r\n')
+
+
+def serve(host='127.0.0.1', port=8765, rules=None, latency=0.5, jitter=0.0, error_rate=0.0,
+          stream_interval=0.02, seed=None):
+    """启动模拟服务器并在后台线程运行，返回 (server, 接口地址)；调用 server.shutdown() 停止。"""
+    state = StubState(list(rules or []) + DEFAULT_RULES, latency, jitter, error_rate, stream_interval, seed)
+    handler = type('StubHandler', (Handler,), {'state': state})
+    # 默认的监听队列只有 5，压测几百个并发请求时会排队
+    server_class = type('StubServer', (ThreadingHTTPServer,), {'request_queue_size': 1024})
+    server = server_class((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_port}/v1/chat/completions'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='本地模拟 DeepSeek 接口')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.5, help='每个请求的平均延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='延迟在 ±jitter 秒内均匀随机')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回 503 的比例（0~1）')
+    parser.add_argument('--stream-interval', type=float, default=0.02, help='流式响应每个数据块的间隔（秒）')
+    parser.add_argument('--script', help='回复规则的 JSON 文件')
+    parser.add_argument('--seed', type=int, help='随机数种子')
+    args = parser.parse_args(argv)
+
+    rules = []
+    if args.script:
+        with open(args.script, encoding='utf-8') as f:
+            rules = json.load(f)
+    server, url = serve(
+        args.host, args.port, rules, args.latency, args.jitter, args.error_rate, args.stream_interval, args.seed
+    )
+    print(f'模拟 DeepSeek 接口: {url}（Ctrl+C 停止）')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print(f'共 {server.state.requests} 个请求，其中 {server.state.errors} 个返回 503')
+
+
+if __name__ == '__main__':
+    main()
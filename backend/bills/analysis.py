@@ -0,0 +1,96 @@
+"""
+智能分析对话使用的账单上下文。
+
+直接从数据库生成紧凑的汇总（总览、分类汇总、月度趋势、最近账单），
+不再依赖前端上传的账单列表；结果按用户缓存，账单变动时随今日汇总一起清除。
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from . import stats
+from .cache import analysis_context_key
+from .models import Bill, DailyBillRollup
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_TIMEOUT = getattr(settings, 'BILL_ANALYSIS_CONTEXT_TIMEOUT', 60 * 60)
+RECENT_BILLS = getattr(settings, 'BILL_ANALYSIS_RECENT_BILLS', 30)
+TREND_MONTHS = 12
+
+TYPE_LABELS = dict(Bill.TYPE_CHOICES)
+CATEGORY_LABELS = {
+    'income': dict(Bill.INCOME_CATEGORY_CHOICES),
+    'expense': dict(Bill.EXPENSE_CATEGORY_CHOICES),
+}
+
+
+def _category_label(bill_type, category):
+    return CATEGORY_LABELS.get(bill_type, {}).get(category, category)
+
+
+def _months_ago(date, months):
+    month_index = date.year * 12 + date.month - 1 - months
+    return date.replace(year=month_index // 12, month=month_index % 12 + 1, day=1)
+
+
+def format_bill_context(user_id):
+    """生成账单上下文文本。"""
+    rollups = DailyBillRollup.objects.filter(user_id=user_id)
+    span = rollups.aggregate(first=Min('date'), last=Max('date'))
+    if span['first'] is None:
+        return "用户目前没有任何账单记录。"
+
+    lines = [f"账单时间范围：{span['first']} 至 {span['last']}", "", "【收支总览】"]
+    for row in stats.type_totals(rollups):
+        lines.append(f"{TYPE_LABELS.get(row['type'], row['type'])} | 共 {row['count']} 笔 | {row['total']:.2f}")
+
+    lines += ["", "【分类汇总】", "收支 | 类型 | 笔数 | 金额"]
+    for row in stats.category_totals(rollups):
+        lines.append(
+            f"{TYPE_LABELS.get(row['type'], row['type'])} | {_category_label(row['type'], row['category'])} "
+            f"| {row['count']} | {row['total']:.2f}"
+        )
+
+    today = timezone.now().date()
+    recent_months = rollups.filter(date__gte=_months_ago(today, TREND_MONTHS - 1))
+    lines += ["", f"【最近 {TREND_MONTHS} 个月趋势】", "月份 | 收支 | 笔数 | 金额"]
+    for row in stats.time_series(recent_months, 'month'):
+        lines.append(
+            f"{row['period'].strftime('%Y-%m')} | {TYPE_LABELS.get(row['type'], row['type'])} "
+            f"| {row['count']} | {row['total']:.2f}"
+        )
+
+    recent_bills = (
+        Bill.objects.filter(user_id=user_id)
+        .order_by('-date', '-created_at')
+        .only('date', 'type', 'category', 'amount', 'remark')[:RECENT_BILLS]
+    )
+    lines += ["", f"【最近 {RECENT_BILLS} 条账单】", "日期 | 收支 | 类型 | 金额 | 备注"]
+    for bill in recent_bills:
+        lines.append(
+            f"{bill.date} | {TYPE_LABELS.get(bill.type, bill.type)} | {_category_label(bill.type, bill.category)} "
+            f"| {bill.amount:.2f} | {bill.remark or '无'}"
+        )
+    return "\n".join(lines)
+
+
+def get_bill_context(user_id):
+    """优先从缓存读取账单上下文。"""
+    key = analysis_context_key(user_id)
+    try:
+        context = cache.get(key)
+    except Exception:
+        logger.warning('读取账单上下文缓存失败', exc_info=True)
+        return format_bill_context(user_id)
+
+    if context is None:
+        context = format_bill_context(user_id)
+        try:
+            cache.set(key, context, CONTEXT_TIMEOUT)
+        except Exception:
+            logger.warning('写入账单上下文缓存失败', exc_info=True)
+    return context
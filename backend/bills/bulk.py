@@ -0,0 +1,160 @@
+"""
+账单的批量新增、修改和删除。
+
+所有写入都在一个事务里完成，并同步维护 DailyBillRollup 和今日汇总缓存；
+校验失败时不写入任何数据，按行返回错误。
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import rollup, sync
+from .cache import invalidate_user_summaries
+from .models import Bill
+from .serializers import BillSerializer
+
+BULK_MAX_ROWS = getattr(settings, 'BILL_BULK_MAX_ROWS', 1000)
+BULK_BATCH_SIZE = 500
+
+BILL_WRITE_FIELDS = ['remark', 'amount', 'type', 'category', 'date']
+
+
+class BulkError(Exception):
+    """请求整体不合法（格式错误、条数超限等）。"""
+
+
+def _check_rows(rows):
+    if not isinstance(rows, list):
+        raise BulkError('请求数据必须是账单列表')
+    if not rows:
+        raise BulkError('账单列表不能为空')
+    if len(rows) > BULK_MAX_ROWS:
+        raise BulkError(f'单次最多处理 {BULK_MAX_ROWS} 条账单')
+
+
+def _row_errors(errors):
+    """把按位置排列的错误列表转换成只包含出错行的列表。"""
+    return [{'index': index, 'errors': error} for index, error in enumerate(errors) if error]
+
+
+def _invalidate_on_commit(user_id):
+    transaction.on_commit(lambda: invalidate_user_summaries(user_id))
+
+
+def bulk_create_bills(user, rows):
+    """
+    校验并批量新增账单。
+    返回 (新建的账单列表, 按行错误)，有错误时不写入。
+    """
+    _check_rows(rows)
+    serializer = BillSerializer(data=rows, many=True)
+    if not serializer.is_valid():
+        return [], _row_errors(serializer.errors)
+
+    return insert_bills(user, serializer.validated_data), []
+
+
+def insert_bills(user, validated_data, return_ids=True):
+    """
+    把已经校验过的账单数据在一个事务里批量写入，并同步汇总。
+    数据库不支持批量插入后返回 id 时（MySQL），return_ids 为真则逐条 INSERT 以取得 id，
+    不需要 id 的调用方（如账单文件导入）传 False，保持一次批量插入。
+    """
+    bills = [Bill(user=user, **data) for data in validated_data]
+    with transaction.atomic():
+        if return_ids and not connection.features.can_return_rows_from_bulk_insert:
+            # 汇总在下面一次性更新，逐条保存时不需要 signals 再同步
+            with rollup.suspended():
+                for bill in bills:
+                    bill.save(force_insert=True)
+        else:
+            bills = Bill.objects.bulk_create(bills, batch_size=BULK_BATCH_SIZE)
+        rollup.add_bills(bills)
+        _invalidate_on_commit(user.id)
+    return bills
+
+
+def _lock_states(ids, user=None):
+    """在事务里按主键顺序锁定账单，返回 {id: (user_id, date, type, category, amount)}。"""
+    bills = Bill.objects.select_for_update().filter(id__in=ids)
+    if user is not None:
+        bills = bills.filter(user=user)
+    rows = bills.order_by('pk').values_list('id', 'user_id', 'date', 'type', 'category', 'amount')
+    return {row[0]: row[1:] for row in rows}
+
+
+def bulk_update_bills(user, rows, partial=False):
+    """
+    按 id 批量修改当前用户的账单。
+    返回 (修改后的账单列表, 按行错误)，有错误时不写入。
+    """
+    _check_rows(rows)
+    ids = []
+    errors = [{} for _ in rows]
+    for index, row in enumerate(rows):
+        pk = row.get('id') if isinstance(row, dict) else None
+        if not isinstance(pk, int):
+            errors[index] = {'id': ['缺少有效的账单 id']}
+        elif pk in ids:
+            errors[index] = {'id': ['账单 id 重复']}
+        ids.append(pk)
+
+    bills = Bill.objects.filter(user=user).in_bulk([pk for pk in ids if isinstance(pk, int)])
+    validated = []
+    for index, (pk, row) in enumerate(zip(ids, rows)):
+        if errors[index]:
+            continue
+        bill = bills.get(pk)
+        if bill is None:
+            errors[index] = {'id': ['账单不存在']}
+            continue
+        serializer = BillSerializer(bill, data=row, partial=partial)
+        if not serializer.is_valid():
+            errors[index] = serializer.errors
+            continue
+        validated.append((bill, serializer.validated_data))
+
+    if any(errors):
+        return [], _row_errors(errors)
+
+    now = timezone.now()
+    updated = []
+    for bill, data in validated:
+        for field, value in data.items():
+            setattr(bill, field, value)
+        bill.updated_at = now
+        updated.append(bill)
+
+    with transaction.atomic():
+        # 修改前的值在事务里加锁重新读取，不用 in_bulk 时的快照，并发修改同一条账单时汇总不会重复扣除；
+        # 期间被删除的账单不再写入
+        previous = _lock_states([bill.pk for bill in updated])
+        updated = [bill for bill in updated if bill.pk in previous]
+        Bill.objects.bulk_update(updated, BILL_WRITE_FIELDS + ['updated_at'], batch_size=BULK_BATCH_SIZE)
+        rollup.remove_states(previous.values())
+        rollup.add_bills(updated)
+        _invalidate_on_commit(user.id)
+    for bill in updated:
+        bill._rollup_state = bill.rollup_state()
+    return updated, []
+
+
+def bulk_delete_bills(user, ids):
+    """
+    批量删除当前用户的账单。
+    返回 (删除条数, 不存在的 id 列表)。
+    """
+    if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+        raise BulkError('ids 必须是账单 id 列表')
+    _check_rows(ids)
+
+    with transaction.atomic():
+        states = _lock_states(ids, user=user)
+        existing = set(states)
+        with rollup.suspended():
+            Bill.objects.filter(id__in=existing).delete()
+        rollup.remove_states(states.values())
+        sync.record_deletions(user.id, existing)
+        _invalidate_on_commit(user.id)
+    missing = [pk for pk in ids if pk not in existing]
+    return len(existing), missing
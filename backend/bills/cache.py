@@ -0,0 +1,197 @@
+import hashlib
+import logging
+import re
+import unicodedata
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from . import metrics
+from .models import Bill
+
+logger = logging.getLogger(__name__)
+
+TODAY_SUMMARY_TIMEOUT = getattr(settings, 'BILL_TODAY_SUMMARY_CACHE_TIMEOUT', 60 * 60)
+LLM_RESPONSE_TIMEOUT = getattr(settings, 'DEEPSEEK_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def today_summary_version_key(user_id):
+    return f'bills:today_summary_version:{user_id}'
+
+
+def today_summary_key(user_id, date, version):
+    return f'bills:today_summary:{user_id}:{version}:{date.isoformat()}'
+
+
+def analysis_context_key(user_id):
+    return f'bills:analysis_context:{user_id}'
+
+
+def _summary_aggregates():
+    return {
+        'income': Sum('amount', filter=Q(type='income')),
+        'expense': Sum('amount', filter=Q(type='expense')),
+    }
+
+
+def _summary(totals, date):
+    return {
+        'income': totals['income'] or 0,
+        'expense': totals['expense'] or 0,
+        'date': date,
+    }
+
+
+def compute_today_summary(user_id, date):
+    """一次查询同时汇总当天的收入和支出。"""
+    totals = Bill.objects.filter(user_id=user_id, date=date).aggregate(**_summary_aggregates())
+    return _summary(totals, date)
+
+
+async def acompute_today_summary(user_id, date):
+    totals = await Bill.objects.filter(user_id=user_id, date=date).aaggregate(**_summary_aggregates())
+    return _summary(totals, date)
+
+
+def _summary_version(user_id):
+    """
+    当前的汇总缓存版本号，账单提交后换成新的版本号。
+    提交前开始计算的请求即使在清缓存之后才写入，也只会写到旧版本的 key 上，不会被再读到。
+    """
+    key = today_summary_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # 版本号被淘汰后也换一个新值，不会和旧版本的 key 重复
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key) or version
+    return version
+
+
+async def _asummary_version(user_id):
+    key = today_summary_version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not await cache.aadd(key, version, None):
+            version = await cache.aget(key) or version
+    return version
+
+
+def get_today_summary(user_id):
+    """优先从缓存读取当天汇总，缓存不可用时直接查库。"""
+    today = timezone.now().date()
+    try:
+        key = today_summary_key(user_id, today, _summary_version(user_id))
+        summary = cache.get(key)
+    except Exception:
+        logger.warning('读取今日汇总缓存失败', exc_info=True)
+        return compute_today_summary(user_id, today)
+
+    if summary is None:
+        summary = compute_today_summary(user_id, today)
+        try:
+            cache.set(key, summary, TODAY_SUMMARY_TIMEOUT)
+        except Exception:
+            logger.warning('写入今日汇总缓存失败', exc_info=True)
+    return summary
+
+
+async def aget_today_summary(user_id):
+    """get_today_summary 的异步版本，供 ASGI 下的异步视图使用。"""
+    today = timezone.now().date()
+    try:
+        key = today_summary_key(user_id, today, await _asummary_version(user_id))
+        summary = await cache.aget(key)
+    except Exception:
+        logger.warning('读取今日汇总缓存失败', exc_info=True)
+        return await acompute_today_summary(user_id, today)
+
+    if summary is None:
+        summary = await acompute_today_summary(user_id, today)
+        try:
+            await cache.aset(key, summary, TODAY_SUMMARY_TIMEOUT)
+        except Exception:
+            logger.warning('写入今日汇总缓存失败', exc_info=True)
+    return summary
+
+
+def invalidate_user_summaries(user_id):
+    """用户账单有任何变动时在事务提交后调用，换掉汇总缓存的版本号并清除分析上下文。"""
+    try:
+        cache.set(today_summary_version_key(user_id), uuid.uuid4().hex, None)
+        cache.delete(analysis_context_key(user_id))
+    except Exception:
+        logger.warning('清除今日汇总缓存失败', exc_info=True)
+
+
+def _llm_cache():
+    """DeepSeek 结果缓存，优先使用单独的 'llm' 缓存，方便单独设置容量和淘汰策略。"""
+    return caches['llm'] if 'llm' in settings.CACHES else cache
+
+
+def normalize_input(text):
+    """统一全角/半角、大小写和空白，让几乎相同的输入命中同一个缓存。"""
+    text = unicodedata.normalize('NFKC', text or '')
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+
+def llm_response_key(prompt_name, text, date):
+    # 提示词里包含“今天/昨天/前天”对应的日期，所以日期也要放进 key
+    digest = hashlib.sha256(normalize_input(text).encode('utf-8')).hexdigest()
+    return f'bills:llm_response:{prompt_name}:{date.isoformat()}:{digest}'
+
+
+def cached_llm_response(prompt_name, text, date, call):
+    """
+    按输入内容缓存 DeepSeek 的回复，返回 (回复内容, 是否命中缓存)。
+    call 返回 None 表示没有有效结果，此时不写缓存。
+    """
+    backend = _llm_cache()
+    key = llm_response_key(prompt_name, text, date)
+    try:
+        content = backend.get(key)
+    except Exception:
+        logger.warning('读取 DeepSeek 结果缓存失败', exc_info=True)
+        return call(), False
+
+    if content is not None:
+        metrics.observe_llm_cache(hit=True)
+        return content, True
+
+    metrics.observe_llm_cache(hit=False)
+    content = call()
+    if content is not None:
+        try:
+            backend.set(key, content, LLM_RESPONSE_TIMEOUT)
+        except Exception:
+            logger.warning('写入 DeepSeek 结果缓存失败', exc_info=True)
+    return content, False
+
+
+async def acached_llm_response(prompt_name, text, date, call):
+    """cached_llm_response 的异步版本，call 返回协程。"""
+    backend = _llm_cache()
+    key = llm_response_key(prompt_name, text, date)
+    try:
+        content = await backend.aget(key)
+    except Exception:
+        logger.warning('读取 DeepSeek 结果缓存失败', exc_info=True)
+        return await call(), False
+
+    if content is not None:
+        metrics.observe_llm_cache(hit=True)
+        return content, True
+
+    metrics.observe_llm_cache(hit=False)
+    content = await call()
+    if content is not None:
+        try:
+            await backend.aset(key, content, LLM_RESPONSE_TIMEOUT)
+        except Exception:
+            logger.warning('写入 DeepSeek 结果缓存失败', exc_info=True)
+    return content, False
+
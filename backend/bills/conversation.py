@@ -0,0 +1,228 @@
+"""
+智能分析对话的存储和上下文窗口。
+
+每条消息单独保存为 AnalysisMessage，每轮对话只新增两行；
+发给 DeepSeek 的上下文由三部分组成：账单汇总（每轮从 analysis.get_bill_context 读取，
+账单变动后自动更新）、较早对话的摘要、以及 token 预算内的最近若干条消息。窗口外未摘要的消息累计超过阈值时，
+提交一个 summarize 后台任务（bills/jobs.py），由 worker 调用 DeepSeek 把它们压缩进 AnalysisHistory.summary，
+请求本身不等待摘要。
+"""
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from rest_framework import status
+
+from .analysis import get_bill_context
+from .db import release_connection
+from .llm import LLMError, LLMTimeoutError, get_async_client, get_client
+from .models import AnalysisHistory, AnalysisMessage, Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'WINDOW_TOKENS': 3000,           # 最近消息窗口的 token 预算
+    'SUMMARY_TRIGGER_TOKENS': 3000,  # 窗口外未摘要的消息超过该值时生成摘要
+    'MAX_WINDOW_MESSAGES': 100,      # 每次最多读取的最近消息条数
+    'SUMMARY_BATCH_MESSAGES': 200,   # 每次最多摘要的消息条数
+    'PAGE_SIZE': 50,                 # 历史记录接口每页条数
+}
+
+SYSTEM_PROMPT = """你是一个智能账单分析助手。以下是用户全部账单的汇总和最近的账单记录：\n\n--- 开始账单记录 ---\n{bills}\n--- 结束账单记录 ---\n\n请注意：\n- 你的回答应主要基于上面提供的账单数据。\n- 如果数据中没有足够的信息来回答问题，请明确说明。\n- 不要编造数据或回答数据之外的信息。\n- 请用自然、流畅的中文来回答问题，就像与人对话一样。"""
+
+SUMMARY_PROMPT = """请把下面这段账单分析对话压缩成一段简洁的中文摘要，保留用户关心的问题、涉及的关键数字和得出的结论，不超过 300 字。只返回摘要内容。"""
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'ANALYSIS_HISTORY', {})}
+
+
+def estimate_tokens(text):
+    """粗略估算 token 数：中文约 0.6 token/字，其他字符约 0.3 token/字符。"""
+    cjk = sum(1 for char in text if '\u4e00' <= char <= '\u9fff')
+    return int(cjk * 0.6 + (len(text) - cjk) * 0.3) + 1
+
+
+def _recent_messages(history, config):
+    """未摘要的最近消息（不含系统消息），按时间倒序。"""
+    return list(
+        history.messages.filter(id__gt=history.summarized_until)
+        .exclude(role='system')
+        .order_by('-id')[:config['MAX_WINDOW_MESSAGES']]
+    )
+
+
+def window_messages(history, config=None):
+    """token 预算内的最近消息，按时间正序；至少保留最近一条。"""
+    config = config or get_config()
+    window = []
+    used = 0
+    for message in _recent_messages(history, config):
+        if window and used + message.tokens > config['WINDOW_TOKENS']:
+            break
+        window.append(message)
+        used += message.tokens
+    window.reverse()
+    return window
+
+
+def build_prompt(history, system_content, question):
+    """组装发给 DeepSeek 的消息列表。"""
+    messages = [{'role': 'system', 'content': system_content}]
+    if history.summary:
+        messages.append({'role': 'system', 'content': f"此前对话的摘要：\n{history.summary}"})
+    messages.extend(message.as_message() for message in window_messages(history))
+    messages.append({'role': 'user', 'content': question})
+    return messages
+
+
+def prepare_turn(user, question):
+    """
+    准备一轮对话，返回 (history, messages)。
+    账单汇总每轮重新读取（有缓存，账单变动时清除），不保存在对话里，
+    这样对话中途新增或修改的账单也能被分析到。
+    """
+    history, _ = AnalysisHistory.objects.get_or_create(user=user)
+    system_content = SYSTEM_PROMPT.format(bills=get_bill_context(user.id))
+    # 只发送摘要和 token 预算内的最近消息
+    return history, build_prompt(history, system_content, question)
+
+
+def _llm_error(e):
+    if isinstance(e, LLMTimeoutError):
+        return {'error': '请求分析服务超时，请稍后重试。'}, status.HTTP_504_GATEWAY_TIMEOUT
+    logger.warning('调用分析服务失败', exc_info=True)
+    return {'error': '调用分析服务时出错。'}, status.HTTP_502_BAD_GATEWAY
+
+
+def _answer(messages, answer):
+    if answer is None:
+        return {'error': '未能从 Deepseek 获取有效分析结果。'}, status.HTTP_500_INTERNAL_SERVER_ERROR
+    return {
+        'analysis': answer,
+        'conversation_history': messages + [{'role': 'assistant', 'content': answer}],
+    }, status.HTTP_200_OK
+
+
+def answer_question(user, question, timeout=45):
+    """完成一轮非流式问答，返回 (响应数据, HTTP 状态码)，供视图和后台任务共用。"""
+    history, messages = prepare_turn(user, question)
+    try:
+        answer = get_client().chat(messages, temperature=0.3, timeout=timeout)
+    except LLMError as e:
+        return _llm_error(e)
+    if answer is not None:
+        # 只新增本轮的消息，必要时把较早的对话压缩成摘要
+        finish_turn(history, question, answer)
+    return _answer(messages, answer)
+
+
+async def aanswer_question(user, question, timeout=45):
+    """answer_question 的异步版本，等待 DeepSeek 时不占用线程和数据库连接。"""
+    history, messages = await sync_to_async(prepare_turn)(user, question)
+    await release_connection()
+    try:
+        answer = await get_async_client().chat(messages, temperature=0.3, timeout=timeout)
+    except LLMError as e:
+        return _llm_error(e)
+    if answer is not None:
+        await afinish_turn(history, question, answer)
+    return _answer(messages, answer)
+
+
+def finish_turn(history, question, answer):
+    """保存本轮对话，较早的对话需要压缩时提交后台任务。"""
+    append_turn(history, question, answer)
+    schedule_summary(history)
+
+
+async def afinish_turn(history, question, answer):
+    await sync_to_async(finish_turn)(history, question, answer)
+
+
+def append_turn(history, question, answer):
+    """保存一轮对话的提问和回答。"""
+    rows = [('user', question), ('assistant', answer)]
+    with transaction.atomic():
+        AnalysisMessage.objects.bulk_create([
+            AnalysisMessage(history=history, role=role, content=content, tokens=estimate_tokens(content))
+            for role, content in rows
+        ])
+        history.save(update_fields=['updated_at'])
+
+
+def _pending_summary(history):
+    """窗口外未摘要的消息超过阈值时，返回 (这些消息, 生成摘要的提示消息)，否则返回 None。"""
+    config = get_config()
+    window = window_messages(history, config)
+    if not window:
+        return None
+    older = list(
+        history.messages.filter(id__gt=history.summarized_until, id__lt=window[0].id)
+        .exclude(role='system')
+        .order_by('id')[:config['SUMMARY_BATCH_MESSAGES']]
+    )
+    if sum(message.tokens for message in older) < config['SUMMARY_TRIGGER_TOKENS']:
+        return None
+
+    transcript = "\n".join(
+        f"{'用户' if message.role == 'user' else '助手'}：{message.content}" for message in older
+    )
+    if history.summary:
+        transcript = f"之前的摘要：\n{history.summary}\n\n后续对话：\n{transcript}"
+    return older, [{'role': 'system', 'content': SUMMARY_PROMPT}, {'role': 'user', 'content': transcript}]
+
+
+def _save_summary(history, summary, older):
+    history.summary = summary.strip()
+    history.summarized_until = older[-1].id
+    history.save(update_fields=['summary', 'summarized_until', 'updated_at'])
+
+
+def schedule_summary(history):
+    """窗口外未摘要的消息超过阈值时提交摘要任务，已有排队中的摘要任务时不重复提交。"""
+    if _pending_summary(history) is None:
+        return
+    if Job.objects.filter(user_id=history.user_id, kind='summarize', status='pending').exists():
+        return
+    Job.objects.create(user_id=history.user_id, kind='summarize')
+
+
+def maybe_summarize(history):
+    """窗口外未摘要的消息超过阈值时，把它们压缩进摘要，返回是否生成了摘要。"""
+    pending = _pending_summary(history)
+    if pending is None:
+        return False
+    older, messages = pending
+    try:
+        summary = get_client().chat(messages, temperature=0.1)
+    except LLMError:
+        logger.warning('生成对话摘要失败', exc_info=True)
+        return False
+    if not summary:
+        return False
+    _save_summary(history, summary, older)
+    return True
+
+
+def summarize_history(user):
+    """summarize 后台任务的处理函数。"""
+    history = AnalysisHistory.objects.filter(user=user).first()
+    return history is not None and maybe_summarize(history)
+
+
+def history_page(history, before=None, page_size=None):
+    """
+    按时间倒序分页读取对话（不含系统消息），每页内按时间正序返回。
+    返回 (消息列表, 下一页的 before 参数)，没有更早的消息时后者为 None。
+    """
+    page_size = page_size or get_config()['PAGE_SIZE']
+    queryset = history.messages.exclude(role='system')
+    if before is not None:
+        queryset = queryset.filter(id__lt=before)
+    page = list(queryset.order_by('-id')[:page_size + 1])
+    has_more = len(page) > page_size
+    page = page[:page_size]
+    page.reverse()
+    return page, (page[0].id if has_more else None)
@@ -0,0 +1,114 @@
+"""
+export_data.py / import_data.py 使用的数据文件格式。
+
+每张表一个 NDJSON 文件（每行一个 JSON 对象），可以用 gzip 或 zstd 压缩，
+导出目录里另有 manifest.json 记录导出时间、筛选条件和每张表的行数。
+"""
+import datetime
+import gzip
+import io
+import json
+import os
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import zstandard
+except ImportError:  # 只有 zstd 压缩需要
+    zstandard = None
+
+# 导出/导入顺序，后面的表依赖前面的表
+TABLES = ['users', 'bills', 'analysis_histories', 'analysis_messages']
+
+EXTENSIONS = {
+    'none': '.ndjson',
+    'gzip': '.ndjson.gz',
+    'zstd': '.ndjson.zst',
+}
+
+MANIFEST = 'manifest.json'
+
+
+def table_path(directory, table, compress):
+    return os.path.join(directory, table + EXTENSIONS[compress])
+
+
+def read_manifest(directory):
+    """读取导出目录里的 manifest.json，不存在时返回 None。"""
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def find_table(directory, table, compress=None):
+    """
+    在导出目录里查找某张表的文件，返回 (路径, 压缩方式)，不存在时返回 (None, None)。
+    compress 一般取自 manifest.json，只查找这种压缩方式的文件；
+    没有 manifest 时同一张表有多个文件无法判断哪个是最新的，抛出 ValueError。
+    """
+    if compress is not None:
+        path = table_path(directory, table, compress)
+        return (path, compress) if os.path.exists(path) else (None, None)
+    found = [
+        (os.path.join(directory, table + extension), candidate)
+        for candidate, extension in EXTENSIONS.items()
+        if os.path.exists(os.path.join(directory, table + extension))
+    ]
+    if len(found) > 1:
+        raise ValueError(f"{directory} 中 {table} 有多个数据文件: {', '.join(path for path, _ in found)}")
+    return found[0] if found else (None, None)
+
+
+def remove_stale_tables(directory, table, compress):
+    """删除同一张表其他压缩方式的旧文件，避免导入时读到上一次导出的数据。"""
+    for candidate in EXTENSIONS:
+        path = table_path(directory, table, candidate)
+        if candidate != compress and os.path.exists(path):
+            os.remove(path)
+
+
+def _zstd():
+    if zstandard is None:
+        raise RuntimeError('zstd 压缩需要安装 zstandard')
+    return zstandard
+
+
+def open_writer(path, compress):
+    if compress == 'gzip':
+        return gzip.open(path, 'wt', encoding='utf-8', compresslevel=6)
+    if compress == 'zstd':
+        raw = open(path, 'wb')
+        return io.TextIOWrapper(_zstd().ZstdCompressor(level=3).stream_writer(raw), encoding='utf-8')
+    return open(path, 'w', encoding='utf-8')
+
+
+def open_reader(path, compress):
+    if compress == 'gzip':
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if compress == 'zstd':
+        raw = open(path, 'rb')
+        return io.TextIOWrapper(_zstd().ZstdDecompressor().stream_reader(raw), encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+class DataFileEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder 会把时间截断到毫秒，导出的时间保留完整的微秒，导入后与原数据相同。"""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def dump_row(row):
+    return json.dumps(row, ensure_ascii=False, cls=DataFileEncoder) + '\n'
+
+
+def read_rows(path, compress):
+    """逐行读取 NDJSON 文件，跳过空行。"""
+    with open_reader(path, compress) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,22 @@
+"""
+异步视图使用的数据库连接工具。
+
+ASGI 下异步视图里的 ORM 调用在每个请求各自的线程里执行，数据库连接要到请求结束才关闭；
+等待 DeepSeek 的几秒里先把连接还回去，同时进行的几百个请求就不会占满 MySQL 的连接数。
+"""
+from asgiref.sync import sync_to_async
+from django.db import connection
+
+
+def _close_idle_connection():
+    # 在事务里（如测试用例）不能关闭连接；持久连接（CONN_MAX_AGE，WSGI）由 Django 在请求结束时处理
+    if not connection.in_atomic_block and connection.settings_dict['CONN_MAX_AGE'] == 0:
+        connection.close()
+
+
+async def release_connection():
+    """
+    关闭当前请求的数据库连接，之后的查询会重新获取连接。
+    使用连接池（backend/dbpool.py）时只是把连接还回连接池，再次获取不需要重新建立连接。
+    """
+    await sync_to_async(_close_idle_connection)()
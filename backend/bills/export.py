@@ -0,0 +1,73 @@
+"""
+账单导出为 CSV（/api/bills/export/）。
+
+按列表相同的顺序 (date, created_at, id) 分批读取，每批一条 keyset 查询，
+边读边写入 StreamingHttpResponse，导出多少行都不会把结果集整个放进内存。
+"""
+import csv
+
+from django.utils import timezone
+
+from .models import Bill
+from .pagination import BILL_ORDERING, keyset_filter
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_COLUMNS = ['日期', '收支', '类型', '金额', '备注', '创建时间']
+
+TYPE_LABELS = dict(Bill.TYPE_CHOICES)
+CATEGORY_LABELS = dict(Bill.INCOME_CATEGORY_CHOICES + Bill.EXPENSE_CATEGORY_CHOICES)
+
+# 以这些字符开头的单元格会被 Excel 当成公式
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class _Echo:
+    """csv.writer 需要一个文件对象，这里直接把写入的内容返回。"""
+
+    def write(self, value):
+        return value
+
+
+def _safe_text(value):
+    value = value or ''
+    if value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_chunks(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """按 (date, created_at, id) 降序逐批读取，每次只取导出需要的字段。"""
+    queryset = queryset.order_by(*BILL_ORDERING)
+    position = None
+    while True:
+        chunk = queryset
+        if position is not None:
+            chunk = chunk.filter(keyset_filter(position))
+        rows = list(chunk.values_list('date', 'created_at', 'id', 'type', 'category', 'amount', 'remark')[:chunk_size])
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        position = rows[-1][:3]
+
+
+def csv_lines(queryset):
+    """
+    产出 CSV 内容：先输出表头，之后每批账单输出一段。
+    表头带 BOM，方便 Excel 识别 UTF-8 中文。
+    """
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow(EXPORT_COLUMNS)
+    for rows in iter_chunks(queryset):
+        yield ''.join(
+            writer.writerow([
+                date.isoformat(),
+                TYPE_LABELS.get(bill_type, bill_type),
+                CATEGORY_LABELS.get(category, category),
+                amount,
+                _safe_text(remark),
+                timezone.localtime(created_at).strftime('%Y-%m-%d %H:%M:%S'),
+            ])
+            for date, created_at, _, bill_type, category, amount, remark in rows
+        )
@@ -0,0 +1,167 @@
+"""
+把用户输入的自然语言记账文本解析成账单并保存。
+
+简单输入由 parsing.parse_simple_entry 在本地解析，其余交给 DeepSeek；
+HTTP 视图和后台任务（bills.jobs）共用这里的逻辑。
+"""
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import status
+
+from .bulk import insert_bills
+from .cache import acached_llm_response, cached_llm_response
+from .db import release_connection
+from .llm import get_async_client, get_client
+from .parsing import parse_bill_lines, parse_simple_entry
+from .serializers import BillSerializer
+
+logger = logging.getLogger(__name__)
+
+LOCAL_PARSER_ENABLED = getattr(settings, 'BILL_LOCAL_PARSER_ENABLED', True)
+
+
+def build_prompt(input_text, today):
+    return f"""今天是 {today.strftime('%Y-%m-%d')}，请帮我分析以下消费收入信息，将其按照时间、收入/支出、金额、类型、备注五个字段进行整理。备注中需要包含具体的商品名称、活动内容等详细信息。
+
+时间处理规则：
+- 如果提到"今天"，就用 {today.strftime('%Y-%m-%d')} 表示；
+- 如果提到"昨天"，就用 {(today - timezone.timedelta(days=1)).strftime('%Y-%m-%d')} 表示；
+- 如果提到"前天"，就用 {(today - timezone.timedelta(days=2)).strftime('%Y-%m-%d')} 表示；
+- 如果没有提供具体日期，则使用今天的日期。
+
+类型识别规则：
+1. 饮食类：
+- 如果提到"吃"、"喝"、"饭"、"餐"、"菜"、"火锅"、"烧烤"、"外卖"、"零食"、"水果"、"超市"等饮食相关词，记为"吃饭"
+
+2. 购物类：
+- 如果提到"买"、"购"、"衣服"、"裤子"、"鞋"、"包"、"电子产品"、"数码"、"家电"、"网购"、"淘宝"、"京东"等购物相关词，记为"购物"
+
+3. 娱乐类：
+- 如果提到"电影"、"游戏"、"KTV"、"唱歌"、"旅游"、"度假"、"健身"、"运动"、"演唱会"、"展览"、"门票"、"玩"等娱乐相关词，记为"娱乐"
+
+4. 住房类：
+- 如果提到"房租"、"水电"、"物业"、"维修"、"装修"、"家具"、"家居"、"电费"、"水费"、"燃气费"、"宽带"、"房贷"等住房相关词，记为"住房"
+
+5. 工作类：
+- 如果提到"办公"、"文具"、"打印"、"复印"、"培训"、"课程"、"考试"、"认证"、"工作餐"、"加班"、"差旅"等工作相关词，记为"工作"
+
+6. 交通类：
+- 如果提到"地铁"、"公交"、"打车"、"滴滴"、"高铁"、"火车"、"飞机"、"机票"、"加油"、"停车"、"汽车"、"修车"等交通相关词，记为"交通"
+
+7. 医疗类：
+- 如果提到"医院"、"看病"、"药"、"体检"、"门诊"、"挂号"、"手术"、"治疗"、"保健"、"医保"、"牙科"等医疗相关词，记为"医疗"
+
+8. 宠物类：
+- 如果提到"宠物"、"猫"、"狗"、"兽医"、"宠物医院"、"宠物食品"、"猫粮"、"狗粮"、"宠物用品"、"洗澡"、"美容"等宠物相关词，记为"宠物"
+
+9. 收入类：
+- 如果提到"工资"、"薪水"、"工钱"，记为"工资"
+- 如果提到"奖金"、"奖励"、"年终奖"、"提成"，记为"奖金"
+- 如果提到"红包"、"压岁钱"，记为"红包"
+- 其他收入类型记为"其他"
+
+10. 其他支出：
+- 不属于以上类型的支出记为"生活"
+
+需要分析的信息：
+{input_text}
+
+请严格按照以下格式返回（注意用|分隔，不要有多余空格）：
+时间|收入/支出|金额|类型|备注
+2024-03-21|支出|300|购物|李宁运动鞋
+2024-03-21|收入|5000|工资|3月工资
+
+只返回数据行，不要表头，不要其他解释。如果某个字段信息不存在，该位置留空，但分隔符要保留。例如：
+||300|购物|运动鞋"""
+
+
+def _local_parse(input_text, today):
+    # 简单输入直接按规则解析，不需要调用 DeepSeek
+    return parse_simple_entry(input_text, today) if LOCAL_PARSER_ENABLED else None
+
+
+def parse_and_create_bills(user, input_text):
+    """
+    解析输入并保存账单，返回 (响应数据, HTTP 状态码)。
+    调用 DeepSeek 失败时抛出 LLMError，由调用方处理。
+    """
+    today = timezone.now().date()
+    analysis_result = _local_parse(input_text, today)
+    if analysis_result is not None:
+        return save_parsed_bills(user, analysis_result, today, 'local', False)
+
+    # 相同（规范化后）的输入当天直接复用之前的解析结果
+    prompt = build_prompt(input_text, today)
+    analysis_result, cached = cached_llm_response(
+        'call_deepseek', input_text, today,
+        lambda: get_client().chat([{'role': 'user', 'content': prompt}], temperature=0.1)
+    )
+    return save_parsed_bills(user, analysis_result, today, 'llm', cached)
+
+
+async def aparse_and_create_bills(user, input_text):
+    """parse_and_create_bills 的异步版本，等待 DeepSeek 时不占用线程和数据库连接。"""
+    today = timezone.now().date()
+    analysis_result = _local_parse(input_text, today)
+    if analysis_result is not None:
+        return await sync_to_async(save_parsed_bills)(user, analysis_result, today, 'local', False)
+
+    await release_connection()
+    prompt = build_prompt(input_text, today)
+    analysis_result, cached = await acached_llm_response(
+        'call_deepseek', input_text, today,
+        lambda: get_async_client().chat([{'role': 'user', 'content': prompt}], temperature=0.1)
+    )
+    return await sync_to_async(save_parsed_bills)(user, analysis_result, today, 'llm', cached)
+
+
+def save_parsed_bills(user, analysis_result, today, source, cached):
+    """校验并保存解析结果（每行一条账单），返回 (响应数据, HTTP 状态码)。"""
+    if analysis_result is None:
+        return {'error': '无法获取分析结果'}, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    # 先解析全部行，再统一校验，最后一次性写入
+    rows, diagnostics = parse_bill_lines(analysis_result, today)
+    valid_data = []
+    for line_no, line, data in rows:
+        row_serializer = BillSerializer(data=data)
+        if row_serializer.is_valid():
+            valid_data.append(row_serializer.validated_data)
+            diagnostics.append({'line': line_no, 'text': line, 'status': 'created'})
+        else:
+            diagnostics.append({'line': line_no, 'text': line, 'status': 'invalid', 'reason': row_serializer.errors})
+    diagnostics.sort(key=lambda item: item['line'])
+
+    created_bills = []
+    if valid_data:
+        try:
+            created_bills = insert_bills(user, valid_data)
+        except Exception as e:
+            logger.exception('创建账单失败')
+            return {
+                'status': 'error',
+                'message': f'保存账单失败: {str(e)}',
+                'result': analysis_result,
+                'diagnostics': diagnostics
+            }, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    if not created_bills:
+        return {
+            'status': 'error',
+            'message': '无法解析有效的账单信息',
+            'result': analysis_result,
+            'diagnostics': diagnostics
+        }, status.HTTP_400_BAD_REQUEST
+
+    return {
+        'status': 'success',
+        'message': f'成功创建 {len(created_bills)} 条账单记录',
+        'result': analysis_result,
+        'created_bills': BillSerializer(created_bills, many=True).data,
+        'diagnostics': diagnostics,
+        'source': source,
+        'cached': cached
+    }, status.HTTP_200_OK
@@ -0,0 +1,182 @@
+"""
+基于数据库的后台任务队列。
+
+call_deepseek 和 analyze 默认调用 enqueue() 写入一条 pending 任务后立即返回任务 id（202），
+worker 进程（manage.py run_bill_jobs）用 SELECT ... FOR UPDATE SKIP LOCKED 领取任务并执行，
+客户端通过 /api/jobs/<id>/ 轮询结果。
+全局和每个用户同时执行的任务数、每个用户排队的任务数都有上限，见 settings.BILL_JOBS。
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework import status
+
+from . import conversation
+from .ingest import parse_and_create_bills
+from .llm import LLMError
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MAX_RUNNING': 8,            # 全局同时执行的任务数
+    'MAX_RUNNING_PER_USER': 1,   # 每个用户同时执行的任务数，1 可以保证同一用户的对话按顺序进行
+    'MAX_ACTIVE_PER_USER': 20,   # 每个用户排队和执行中的任务总数
+    'MAX_ATTEMPTS': 3,           # worker 异常退出后任务最多重新执行的次数
+    'STALE_SECONDS': 600,        # 执行超过该时间的任务视为 worker 已退出
+    'POLL_INTERVAL': 1.0,        # 没有任务时 worker 的轮询间隔（秒）
+    'KEEP_DAYS': 7,              # 已结束任务的保留天数
+    'BACKGROUND_BY_DEFAULT': True,  # call_deepseek / analyze 默认提交后台任务，async=0 时在请求内完成
+}
+
+ACTIVE_STATUSES = ('pending', 'running')
+
+MAINTENANCE_INTERVAL = 60
+
+
+class JobLimitExceeded(Exception):
+    """用户排队中的任务太多。"""
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'BILL_JOBS', {})}
+
+
+def _parse_bills(user, payload):
+    try:
+        return parse_and_create_bills(user, payload.get('input', ''))
+    except LLMError as e:
+        return {'error': str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+
+def _analyze(user, payload):
+    return conversation.answer_question(user, payload['text'])
+
+
+def _summarize(user, payload):
+    # 分析对话保存后提交的任务，见 conversation.schedule_summary
+    return {'summarized': conversation.summarize_history(user)}, status.HTTP_200_OK
+
+
+# 任务类型 -> 处理函数，处理函数返回 (响应数据, HTTP 状态码)，与同步接口的返回一致
+HANDLERS = {
+    'parse_bills': _parse_bills,
+    'analyze': _analyze,
+    'summarize': _summarize,
+}
+
+
+def enqueue(user, kind, payload):
+    """新建一条排队中的任务；用户排队的任务超过上限时抛出 JobLimitExceeded。"""
+    if kind not in HANDLERS:
+        raise ValueError(f'未知的任务类型: {kind}')
+    limit = get_config()['MAX_ACTIVE_PER_USER']
+    if Job.objects.filter(user=user, status__in=ACTIVE_STATUSES).count() >= limit:
+        raise JobLimitExceeded(f'排队中的任务过多（最多 {limit} 个），请稍后再试')
+    return Job.objects.create(user=user, kind=kind, payload=payload)
+
+
+def queue_position(job):
+    """排在该任务前面的 pending 任务数，任务不在排队时返回 None。"""
+    if job.status != 'pending':
+        return None
+    return Job.objects.filter(status='pending', id__lt=job.id).count()
+
+
+def claim_next(worker):
+    """
+    领取下一个可以执行的任务并标记为 running，没有时返回 None。
+    全局执行数已满，或用户的执行数已满时跳过；多个 worker 同时领取时，
+    SKIP LOCKED 保证同一任务只会被一个 worker 拿到，上限在并发领取时可能短暂超出一两个。
+    """
+    config = get_config()
+    with transaction.atomic():
+        running = Job.objects.filter(status='running')
+        if running.count() >= config['MAX_RUNNING']:
+            return None
+        busy_users = (
+            running.order_by().values('user_id')
+            .annotate(running_count=Count('id'))
+            .filter(running_count__gte=config['MAX_RUNNING_PER_USER'])
+            .values('user_id')
+        )
+        skip_locked = connection.features.has_select_for_update_skip_locked
+        job = (
+            Job.objects.select_for_update(skip_locked=skip_locked)
+            .filter(status='pending')
+            .exclude(user_id__in=busy_users)
+            .order_by('id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = 'running'
+        job.worker = worker
+        job.attempts += 1
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'worker', 'attempts', 'started_at'])
+    return job
+
+
+def run_job(job):
+    """执行已领取的任务并保存结果。"""
+    started = time.monotonic()
+    try:
+        result, status_code = HANDLERS[job.kind](job.user, job.payload)
+    except Exception as e:
+        logger.exception('任务 #%s 执行失败', job.id)
+        job.status = 'failed'
+        job.error = str(e)
+    else:
+        job.status = 'succeeded' if status_code < 400 else 'failed'
+        job.result = result
+        job.status_code = status_code
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'status_code', 'error', 'finished_at'])
+    logger.info('任务 #%s (%s) %s，耗时 %.2fs', job.id, job.kind, job.status, time.monotonic() - started)
+    return job
+
+
+def maintain():
+    """
+    重新排队 worker 异常退出时留下的 running 任务（超过重试次数的标记为失败），
+    并删除过期的已结束任务。
+    """
+    config = get_config()
+    now = timezone.now()
+    stale = Job.objects.filter(status='running', started_at__lt=now - timedelta(seconds=config['STALE_SECONDS']))
+    failed = stale.filter(attempts__gte=config['MAX_ATTEMPTS']).update(
+        status='failed', error='任务执行超时', finished_at=now
+    )
+    requeued = stale.update(status='pending', worker='')
+    purged, _ = Job.objects.filter(
+        status__in=('succeeded', 'failed'), finished_at__lt=now - timedelta(days=config['KEEP_DAYS'])
+    ).delete()
+    if failed or requeued or purged:
+        logger.info('任务维护：%s 个超时失败，%s 个重新排队，删除 %s 个过期任务', failed, requeued, purged)
+
+
+def run_worker(worker, once=False, should_stop=lambda: False):
+    """
+    worker 主循环：领取并执行任务，没有任务时按 POLL_INTERVAL 轮询。
+    once 为 True 时执行完当前可领取的任务后退出。
+    """
+    poll_interval = get_config()['POLL_INTERVAL']
+    last_maintenance = None
+    while not should_stop():
+        close_old_connections()
+        if last_maintenance is None or time.monotonic() - last_maintenance > MAINTENANCE_INTERVAL:
+            maintain()
+            last_maintenance = time.monotonic()
+        job = claim_next(worker)
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
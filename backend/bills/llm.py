@@ -0,0 +1,319 @@
+"""
+DeepSeek 接口的共享客户端。
+
+同步客户端基于 requests.Session，每个进程复用同一个连接池（keep-alive），
+对 429/5xx 按指数退避重试；异步客户端基于 httpx.AsyncClient，供 ASGI 下的异步视图使用。
+配置见 settings.DEEPSEEK，API_URL 可以指向本地的模拟服务器方便测试。
+"""
+import asyncio
+import functools
+import json
+import logging
+import threading
+import time
+import weakref
+
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import metrics
+
+try:
+    import httpx
+except ImportError:  # 只有异步视图需要 httpx
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+DEFAULTS = {
+    'API_URL': 'https://api.deepseek.com/v1/chat/completions',
+    'API_KEY': '',
+    'MODEL': 'deepseek-chat',
+    'CONNECT_TIMEOUT': 5,
+    'READ_TIMEOUT': 60,
+    'MAX_RETRIES': 2,
+    'BACKOFF_FACTOR': 0.5,
+    'POOL_MAXSIZE': 20,
+    'ASYNC_MAX_CONNECTIONS': 500,
+}
+
+
+class LLMError(Exception):
+    """调用 DeepSeek 失败（网络错误、重试后仍返回错误状态码等）。"""
+
+
+class LLMTimeoutError(LLMError):
+    """调用 DeepSeek 超时。"""
+
+
+class ImproperlyConfiguredLLM(LLMError):
+    """缺少可选依赖或配置错误。"""
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'DEEPSEEK', {})}
+
+
+def extract_content(result):
+    """从 chat/completions 的返回结果中取出回复内容，没有结果时返回 None。"""
+    choices = result.get('choices') or []
+    if not choices:
+        return None
+    return choices[0].get('message', {}).get('content')
+
+
+def _retry_delay(attempt, backoff_factor, retry_after=None):
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return backoff_factor * (2 ** attempt)
+
+
+def _check_config(config):
+    if not config['API_KEY']:
+        raise ImproperlyConfiguredLLM('没有配置 DeepSeek API Key，请设置环境变量 DEEPSEEK_API_KEY')
+
+
+def _headers(config):
+    return {
+        'Content-Type': 'application/json',
+        'Authorization': f"Bearer {config['API_KEY']}",
+    }
+
+
+class DeepSeekClient:
+    """
+    同步客户端，可在多个请求之间共享。
+    requests.Session 不保证线程安全，每个线程使用自己的 Session，
+    它们挂载同一个 HTTPAdapter，共用一个连接池。
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        _check_config(self.config)
+        retry_options = dict(
+            total=self.config['MAX_RETRIES'],
+            backoff_factor=self.config['BACKOFF_FACTOR'],
+            status_forcelist=RETRY_STATUS_CODES,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        try:
+            retry = Retry(allowed_methods=frozenset({'POST'}), **retry_options)
+        except TypeError:  # urllib3 < 1.26
+            retry = Retry(method_whitelist=frozenset({'POST'}), **retry_options)
+        self.adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.config['POOL_MAXSIZE'],
+            max_retries=retry,
+        )
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers.update(_headers(self.config))
+            session.mount('http://', self.adapter)
+            session.mount('https://', self.adapter)
+        return session
+
+    def _payload(self, messages, temperature, **extra):
+        return {'model': self.config['MODEL'], 'messages': messages, 'temperature': temperature, **extra}
+
+    def _timeout(self, read_timeout):
+        return (self.config['CONNECT_TIMEOUT'], read_timeout or self.config['READ_TIMEOUT'])
+
+    def complete(self, messages, temperature=0.3, timeout=None, **extra):
+        """调用 chat/completions，返回解析后的 JSON。"""
+        started = time.monotonic()
+        outcome, result = 'error', None
+        try:
+            response = self.session.post(
+                self.config['API_URL'],
+                json=self._payload(messages, temperature, **extra),
+                timeout=self._timeout(timeout),
+            )
+            response.raise_for_status()
+            result = response.json()
+            outcome = 'ok'
+            return result
+        except requests.exceptions.Timeout as e:
+            outcome = 'timeout'
+            raise LLMTimeoutError(str(e)) from e
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise LLMError(str(e)) from e
+        finally:
+            elapsed = time.monotonic() - started
+            logger.info('DeepSeek 请求耗时 %.2fs', elapsed)
+            metrics.observe_llm('sync', elapsed, outcome, (result or {}).get('usage'))
+
+    def chat(self, messages, temperature=0.3, timeout=None, **extra):
+        """返回回复内容，没有结果时返回 None。"""
+        return extract_content(self.complete(messages, temperature, timeout, **extra))
+
+    def close(self):
+        self.adapter.close()
+
+
+class AsyncDeepSeekClient:
+    """异步客户端，每个事件循环一个实例，事件循环结束时关闭，见 get_async_client()。"""
+
+    def __init__(self, config=None):
+        if httpx is None:
+            raise ImproperlyConfiguredLLM('异步客户端需要安装 httpx')
+        self.config = config or get_config()
+        _check_config(self.config)
+        self.client = httpx.AsyncClient(
+            headers=_headers(self.config),
+            timeout=httpx.Timeout(self.config['READ_TIMEOUT'], connect=self.config['CONNECT_TIMEOUT']),
+            # 异步视图不占线程，同时等待的请求数只受这里的连接数限制
+            limits=httpx.Limits(
+                max_connections=self.config['ASYNC_MAX_CONNECTIONS'],
+                max_keepalive_connections=self.config['POOL_MAXSIZE'],
+            ),
+        )
+
+    def _payload(self, messages, temperature, **extra):
+        return {'model': self.config['MODEL'], 'messages': messages, 'temperature': temperature, **extra}
+
+    def _timeout(self, read_timeout):
+        if read_timeout is None:
+            return httpx.USE_CLIENT_DEFAULT
+        return httpx.Timeout(read_timeout, connect=self.config['CONNECT_TIMEOUT'])
+
+    async def complete(self, messages, temperature=0.3, timeout=None, **extra):
+        started = time.monotonic()
+        outcome, result = 'error', None
+        try:
+            for attempt in range(self.config['MAX_RETRIES'] + 1):
+                response = await self.client.post(
+                    self.config['API_URL'],
+                    json=self._payload(messages, temperature, **extra),
+                    timeout=self._timeout(timeout),
+                )
+                if response.status_code in RETRY_STATUS_CODES and attempt < self.config['MAX_RETRIES']:
+                    await asyncio.sleep(_retry_delay(
+                        attempt, self.config['BACKOFF_FACTOR'], response.headers.get('Retry-After')
+                    ))
+                    continue
+                response.raise_for_status()
+                result = response.json()
+                outcome = 'ok'
+                return result
+        except httpx.TimeoutException as e:
+            outcome = 'timeout'
+            raise LLMTimeoutError(str(e)) from e
+        except (httpx.HTTPError, ValueError) as e:
+            raise LLMError(str(e)) from e
+        finally:
+            elapsed = time.monotonic() - started
+            logger.info('DeepSeek 异步请求耗时 %.2fs', elapsed)
+            metrics.observe_llm('async', elapsed, outcome, (result or {}).get('usage'))
+
+    async def chat(self, messages, temperature=0.3, timeout=None, **extra):
+        return extract_content(await self.complete(messages, temperature, timeout, **extra))
+
+    async def stream_chat(self, messages, temperature=0.3, timeout=None, **extra):
+        """
+        以流式（stream=True）方式调用，逐段产出回复内容。
+        只在收到第一个字节之前对 429/5xx 重试。
+        """
+        # include_usage 让最后一个数据块带上 token 用量
+        payload = self._payload(
+            messages, temperature, stream=True, stream_options={'include_usage': True}, **extra
+        )
+        started = time.monotonic()
+        outcome, usage = 'error', None
+        try:
+            for attempt in range(self.config['MAX_RETRIES'] + 1):
+                async with self.client.stream(
+                    'POST', self.config['API_URL'], json=payload, timeout=self._timeout(timeout)
+                ) as response:
+                    if response.status_code in RETRY_STATUS_CODES and attempt < self.config['MAX_RETRIES']:
+                        retry_after = response.headers.get('Retry-After')
+                    else:
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if not line.startswith('data:'):
+                                continue
+                            data = line[len('data:'):].strip()
+                            if data == '[DONE]':
+                                break
+                            chunk = json.loads(data)
+                            usage = chunk.get('usage') or usage
+                            choices = chunk.get('choices') or [{}]
+                            content = choices[0].get('delta', {}).get('content')
+                            if content:
+                                yield content
+                        outcome = 'ok'
+                        return
+                await asyncio.sleep(_retry_delay(attempt, self.config['BACKOFF_FACTOR'], retry_after))
+        except httpx.TimeoutException as e:
+            outcome = 'timeout'
+            raise LLMTimeoutError(str(e)) from e
+        except (httpx.HTTPError, ValueError) as e:
+            raise LLMError(str(e)) from e
+        finally:
+            metrics.observe_llm('stream', time.monotonic() - started, outcome, usage)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+@functools.lru_cache(maxsize=None)
+def get_client():
+    """当前进程共享的同步客户端。"""
+    return DeepSeekClient()
+
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _close_with_loop(client):
+    """
+    事件循环结束时关闭它的客户端。
+    WSGI 下异步视图由 async_to_sync 在每个请求新建的事件循环里执行，不关闭的话每个请求都会留下一个连接池。
+    asyncio.run() 结束前会调用 loop.shutdown_asyncgens()，对还停在 yield 的异步生成器调用 aclose()，
+    这里用这样一个生成器在那时关闭客户端；ASGI 下事件循环一直运行，客户端在 worker 退出时关闭。
+    """
+    async def lifetime():
+        try:
+            yield
+        finally:
+            await client.aclose()
+
+    generator = lifetime()
+    # 第一次迭代时生成器登记到当前事件循环；函数体直接停在 yield，这一步不会挂起
+    try:
+        generator.asend(None).send(None)
+    except StopIteration:
+        pass
+    # 事件循环只弱引用异步生成器
+    client._lifetime = generator
+
+
+def get_async_client():
+    """当前事件循环共享的异步客户端，必须在协程里调用。"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncDeepSeekClient()
+        _close_with_loop(client)
+    return client
+
+
+@receiver(setting_changed)
+def reset_clients(setting, **kwargs):
+    if setting == 'DEEPSEEK':
+        get_client.cache_clear()
+        _async_clients.clear()
@@ -0,0 +1,74 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from bills.models import Bill
+from bills.pagination import BILL_ORDERING, keyset_filter
+from bills.search import search_bills
+from bills.views import BillFilter
+
+
+def canonical_queries(user_id):
+    """
+    bills.views 中各个热点接口实际执行的查询。
+    新增接口或修改查询时，记得同步到这里。
+    """
+    today = timezone.now().date()
+    base = Bill.objects.filter(user_id=user_id)
+    position = (today, timezone.now(), 0)
+
+    return [
+        ('list', base.order_by('-created_at')),
+        ('list_page', base.order_by(*BILL_ORDERING)),
+        ('list_next_page', base.filter(keyset_filter(position)).order_by(*BILL_ORDERING)),
+        ('today_summary', base.filter(date=today).values('type')),
+        ('filter_date_range', BillFilter(
+            {'date_after': today.replace(day=1), 'date_before': today},
+            queryset=base,
+        ).qs),
+        ('filter_type_category', BillFilter(
+            {'type': 'expense', 'category': 'food,shopping', 'date_after': today.replace(day=1)},
+            queryset=base,
+        ).qs),
+        ('search_remark', search_bills(base, ['午饭'])),
+    ]
+
+
+def is_full_scan(vendor, plan):
+    """根据不同数据库的 EXPLAIN 输出判断是否对账单表做了全表扫描。"""
+    table = Bill._meta.db_table
+    if vendor == 'mysql':
+        return re.search(r'"access_type":\s*"ALL"', plan) is not None
+    if vendor == 'postgresql':
+        return f'Seq Scan on {table}' in plan
+    if vendor == 'sqlite':
+        return re.search(rf'\bSCAN {table}\b', plan) is not None
+    raise CommandError(f'不支持的数据库类型: {vendor}')
+
+
+class Command(BaseCommand):
+    help = '对 bills.views 中的主要查询执行 EXPLAIN，发现全表扫描时返回失败'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, default=1, help='生成查询时使用的用户 ID')
+        parser.add_argument('--verbose-plan', action='store_true', help='输出完整的查询计划')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        explain_options = {'format': 'json'} if vendor == 'mysql' else {}
+        failures = []
+
+        for name, queryset in canonical_queries(options['user_id']):
+            plan = queryset.explain(**explain_options)
+            if is_full_scan(vendor, plan):
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'[全表扫描] {name}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'[OK] {name}'))
+            if options['verbose_plan'] or name in failures:
+                self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f'以下查询出现全表扫描: {", ".join(failures)}')
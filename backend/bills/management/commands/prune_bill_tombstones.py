@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from bills import sync
+
+
+class Command(BaseCommand):
+    help = '删除超过保留期的账单删除记录（增量同步用），建议每天定时执行'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='保留天数，默认使用 BILL_SYNC 中的 TOMBSTONE_DAYS')
+
+    def handle(self, *args, **options):
+        count = sync.prune_tombstones(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'已删除 {count} 条删除记录'))
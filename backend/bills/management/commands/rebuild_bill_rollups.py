@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from bills import rollup
+
+
+class Command(BaseCommand):
+    help = '根据账单表重新生成 DailyBillRollup 每日汇总'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, help='只重建指定用户的汇总')
+
+    def handle(self, *args, **options):
+        count = rollup.rebuild(options['user_id'])
+        self.stdout.write(self.style.SUCCESS(f'已生成 {count} 条每日汇总'))
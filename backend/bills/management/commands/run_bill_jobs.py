@@ -0,0 +1,53 @@
+import multiprocessing
+import os
+import signal
+import socket
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from bills import jobs
+
+
+def _work(name, once):
+    stopping = []
+    # 收到 SIGTERM / SIGINT 时执行完当前任务再退出
+    signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+    signal.signal(signal.SIGINT, lambda *args: stopping.append(True))
+    jobs.run_worker(name, once=once, should_stop=lambda: bool(stopping))
+
+
+class Command(BaseCommand):
+    help = '启动后台任务 worker，执行排队中的账单解析和智能分析任务'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='worker 进程数')
+        parser.add_argument('--once', action='store_true', help='执行完当前排队的任务后退出')
+
+    def handle(self, *args, **options):
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        processes = max(options['processes'], 1)
+        self.stdout.write(f'启动 {processes} 个 worker 进程')
+        if processes == 1:
+            _work(prefix, options['once'])
+            return
+
+        # 子进程不能复用父进程的数据库连接
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=_work, args=(f'{prefix}-{index}', options['once']), daemon=False)
+            for index in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+
+        def forward(signum, frame):
+            for worker in workers:
+                if worker.is_alive():
+                    os.kill(worker.pid, signal.SIGTERM)
+
+        signal.signal(signal.SIGTERM, forward)
+        signal.signal(signal.SIGINT, forward)
+        for worker in workers:
+            worker.join()
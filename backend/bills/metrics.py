@@ -0,0 +1,92 @@
+"""
+Prometheus 指标：接口耗时、每个请求的 SQL 次数和耗时、DeepSeek 调用耗时和 token 用量、DeepSeek 结果缓存命中次数。
+
+指标由 bills.middleware.RequestMetricsMiddleware、bills.llm 和 bills.cache 记录，通过 /metrics 导出。
+gunicorn 等多进程部署时需要设置环境变量 PROMETHEUS_MULTIPROC_DIR，汇总各个 worker 进程的数据。
+没有安装 prometheus_client 时不记录指标，/metrics 返回 501。
+"""
+import os
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Histogram, multiprocess
+except ImportError:  # prometheus_client 是可选依赖
+    prometheus_client = None
+
+DEFAULTS = {
+    'SLOW_REQUEST_SECONDS': 1.0,   # 超过该耗时的请求记录慢请求日志
+    'SLOW_REQUEST_QUERIES': 5,     # 慢请求日志中列出的最慢 SQL 条数
+    'TOKEN': '',                   # 不为空时访问 /metrics 需要 Authorization: Bearer <TOKEN>
+}
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+LLM_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'METRICS', {})}
+
+
+if prometheus_client is not None:
+    REQUEST_LATENCY = Histogram(
+        'bill_http_request_duration_seconds', '接口耗时（返回响应对象为止，不含流式响应的传输时间）',
+        ['view', 'method', 'status'], buckets=LATENCY_BUCKETS,
+    )
+    REQUEST_QUERIES = Histogram(
+        'bill_http_request_db_queries', '每个请求执行的 SQL 条数', ['view'], buckets=QUERY_COUNT_BUCKETS,
+    )
+    REQUEST_DB_TIME = Histogram(
+        'bill_http_request_db_seconds', '每个请求执行 SQL 的总耗时', ['view'], buckets=LATENCY_BUCKETS,
+    )
+    LLM_LATENCY = Histogram(
+        'bill_deepseek_request_duration_seconds', 'DeepSeek 调用耗时（含重试）',
+        ['mode', 'outcome'], buckets=LLM_LATENCY_BUCKETS,
+    )
+    LLM_TOKENS = Counter('bill_deepseek_tokens', 'DeepSeek 消耗的 token 数', ['kind'])
+    LLM_CACHE = Counter('bill_deepseek_cache_lookups', 'DeepSeek 结果缓存的查询次数', ['result'])
+
+
+def observe_request(view, method, status, seconds, query_count=None, query_seconds=None):
+    if prometheus_client is None:
+        return
+    REQUEST_LATENCY.labels(view, method, str(status)).observe(seconds)
+    if query_count is not None:
+        REQUEST_QUERIES.labels(view).observe(query_count)
+        REQUEST_DB_TIME.labels(view).observe(query_seconds)
+
+
+def observe_llm(mode, seconds, outcome, usage=None):
+    """mode: sync / async / stream；outcome: ok / timeout / error；usage 为接口返回的 usage 字段。"""
+    if prometheus_client is None:
+        return
+    LLM_LATENCY.labels(mode, outcome).observe(seconds)
+    for kind in ('prompt_tokens', 'completion_tokens'):
+        if usage and usage.get(kind):
+            LLM_TOKENS.labels(kind.replace('_tokens', '')).inc(usage[kind])
+
+
+def observe_llm_cache(hit):
+    if prometheus_client is None:
+        return
+    LLM_CACHE.labels('hit' if hit else 'miss').inc()
+
+
+def metrics_view(request):
+    """Prometheus 文本格式的指标。"""
+    if prometheus_client is None:
+        return HttpResponse('没有安装 prometheus_client\n', status=501, content_type='text/plain; charset=utf-8')
+    token = get_config()['TOKEN']
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return HttpResponse(prometheus_client.generate_latest(registry), content_type=prometheus_client.CONTENT_TYPE_LATEST)
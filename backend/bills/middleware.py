@@ -0,0 +1,123 @@
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# 每个请求最多保留的 SQL 条数（只用于慢请求日志）
+MAX_RECORDED_QUERIES = 200
+
+# 当前请求的 QueryCollector；sync_to_async 会把 contextvar 复制到执行 ORM 调用的线程
+_current_collector = ContextVar('request_query_collector', default=None)
+
+
+class QueryCollector:
+    """通过 connection.execute_wrapper 记录当前请求执行的 SQL 条数和耗时。"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.monotonic() - started
+            self.count += 1
+            self.seconds += elapsed
+            if len(self.queries) < MAX_RECORDED_QUERIES:
+                self.queries.append((elapsed, sql))
+
+    def slowest(self, limit):
+        return sorted(self.queries, key=lambda query: query[0], reverse=True)[:limit]
+
+
+def collect_queries(execute, sql, params, many, context):
+    """常驻在每个数据库连接上的 execute_wrapper，把 SQL 记到当前请求的 QueryCollector。"""
+    collector = _current_collector.get()
+    if collector is None:
+        return execute(sql, params, many, context)
+    return collector(execute, sql, params, many, context)
+
+
+def install_query_collector(connection):
+    """
+    连接建立时（connection_created 信号）挂上 collect_queries。
+    异步视图的 ORM 调用在其他线程、用那个线程的连接执行，请求开始时无法给那个连接挂 execute_wrapper，
+    所以每个连接都常驻一个，按 contextvar 找到所属的请求。
+    放在最前面：connection.execute_wrapper() 退出时移除的是最后一个。
+    """
+    if collect_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, collect_queries)
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route
+
+
+class RequestMetricsMiddleware:
+    """
+    记录每个接口的耗时和 SQL 次数/耗时，超过 METRICS['SLOW_REQUEST_SECONDS'] 时
+    把最慢的几条 SQL 写入日志。
+    同步和异步请求都通过 collect_queries 统计 SQL，异步视图在 sync_to_async 线程里执行的 SQL 也计入。
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = time.monotonic()
+        collector = QueryCollector()
+        token = _current_collector.set(collector)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_collector.reset(token)
+        self._record(request, response, time.monotonic() - started, collector)
+        return response
+
+    async def __acall__(self, request):
+        started = time.monotonic()
+        collector = QueryCollector()
+        token = _current_collector.set(collector)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_collector.reset(token)
+        self._record(request, response, time.monotonic() - started, collector)
+        return response
+
+    def _record(self, request, response, seconds, collector):
+        view = _view_name(request)
+        if view == 'metrics':
+            return
+        metrics.observe_request(
+            view, request.method, response.status_code, seconds, collector.count, collector.seconds,
+        )
+        config = metrics.get_config()
+        if seconds < config['SLOW_REQUEST_SECONDS']:
+            return
+        lines = [
+            f'慢请求 {request.method} {request.path} ({view}) 状态 {response.status_code} 耗时 {seconds:.3f}s'
+        ]
+        lines.append(f'SQL {collector.count} 条，共 {collector.seconds:.3f}s，最慢的几条：')
+        lines.extend(
+            f'  {elapsed:.3f}s  {sql[:1000]}' for elapsed, sql in collector.slowest(config['SLOW_REQUEST_QUERIES'])
+        )
+        logger.warning('\n'.join(lines))
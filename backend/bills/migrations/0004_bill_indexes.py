@@ -0,0 +1,25 @@
+# Generated by Django 4.2.21 on 2026-10-16 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bills', '0003_analysishistory'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['user', 'date', 'created_at'], name='bill_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['user', 'type', 'category', 'date'], name='bill_user_type_cat_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['user', 'created_at'], name='bill_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.21 on 2026-10-16 23:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bills', '0004_bill_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyBillRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('type', models.CharField(choices=[('income', '收入'), ('expense', '支出')], max_length=10, verbose_name='收支')),
+                ('category', models.CharField(max_length=20, verbose_name='类型')),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='金额合计')),
+                ('bill_count', models.IntegerField(default=0, verbose_name='笔数')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': '每日账单汇总',
+                'verbose_name_plural': '每日账单汇总',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailybillrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'date', 'type', 'category'), name='unique_daily_bill_rollup'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.21 on 2026-10-16 23:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def estimate_tokens(text):
+    # 与 bills.conversation.estimate_tokens 相同的估算方式
+    cjk = sum(1 for char in text if '\u4e00' <= char <= '\u9fff')
+    return int(cjk * 0.6 + (len(text) - cjk) * 0.3) + 1
+
+
+def copy_history_to_messages(apps, schema_editor):
+    AnalysisHistory = apps.get_model('bills', 'AnalysisHistory')
+    AnalysisMessage = apps.get_model('bills', 'AnalysisMessage')
+    for history in AnalysisHistory.objects.iterator():
+        AnalysisMessage.objects.bulk_create([
+            AnalysisMessage(
+                history=history,
+                role=message.get('role', 'user'),
+                content=message.get('content') or '',
+                tokens=estimate_tokens(message.get('content') or ''),
+            )
+            for message in history.history or []
+        ])
+
+
+def copy_messages_to_history(apps, schema_editor):
+    AnalysisHistory = apps.get_model('bills', 'AnalysisHistory')
+    for history in AnalysisHistory.objects.prefetch_related('messages'):
+        history.history = [
+            {'role': message.role, 'content': message.content}
+            for message in history.messages.order_by('id')
+        ]
+        history.save(update_fields=['history'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bills', '0005_dailybillrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysishistory',
+            name='summarized_until',
+            field=models.BigIntegerField(default=0, verbose_name='已摘要的最后一条消息 ID'),
+        ),
+        migrations.AddField(
+            model_name='analysishistory',
+            name='summary',
+            field=models.TextField(blank=True, default='', verbose_name='早期对话摘要'),
+        ),
+        migrations.CreateModel(
+            name='AnalysisMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('system', '系统'), ('user', '用户'), ('assistant', '助手')], max_length=10)),
+                ('content', models.TextField()),
+                ('tokens', models.PositiveIntegerField(default=0, verbose_name='估算 token 数')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('history', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='bills.analysishistory')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.RunPython(copy_history_to_messages, copy_messages_to_history),
+        migrations.RemoveField(
+            model_name='analysishistory',
+            name='history',
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.21 on 2026-10-16 23:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bills', '0006_analysismessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('parse_bills', '解析账单'), ('analyze', '智能分析')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', '排队中'), ('running', '执行中'), ('succeeded', '成功'), ('failed', '失败')], default='pending', max_length=10)),
+                ('payload', models.JSONField(default=dict, verbose_name='任务参数')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='执行结果')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='结果对应的 HTTP 状态码')),
+                ('error', models.TextField(blank=True, default='')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='执行次数')),
+                ('worker', models.CharField(blank=True, default='', max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': '后台任务',
+                'verbose_name_plural': '后台任务',
+                'indexes': [models.Index(fields=['status', 'id'], name='job_status_id_idx'), models.Index(fields=['user', 'status'], name='job_user_status_idx')],
+            },
+        ),
+    ]
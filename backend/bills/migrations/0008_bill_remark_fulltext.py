@@ -0,0 +1,29 @@
+from django.db import migrations
+
+INDEX_NAME = 'bill_remark_ngram_idx'
+
+
+def create_fulltext_index(apps, schema_editor):
+    # 只有 MySQL 支持 ngram 全文索引，其他数据库的搜索回退到 LIKE，见 bills/search.py
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(
+        f'ALTER TABLE bills_bill ADD FULLTEXT INDEX {INDEX_NAME} (remark) WITH PARSER ngram'
+    )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(f'ALTER TABLE bills_bill DROP INDEX {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bills', '0007_job'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.21 on 2026-10-17 00:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bills', '0008_bill_remark_fulltext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bill_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='bill_user_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='billtombstone',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='bill_tombstones', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='billtombstone',
+            index=models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='billtombstone',
+            index=models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.21 on 2026-10-17 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bills', '0009_billtombstone'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('parse_bills', '解析账单'), ('analyze', '智能分析'), ('summarize', '压缩分析对话')], max_length=20),
+        ),
+    ]
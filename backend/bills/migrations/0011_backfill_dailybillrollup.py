@@ -0,0 +1,44 @@
+"""
+0005 只建了 DailyBillRollup 表，之前已有的账单没有计入汇总，
+统计接口和智能分析的账单上下文读取汇总表，这里按 Bill 表重新生成一次（与 rollup.rebuild() 相同）。
+"""
+from django.db import migrations
+from django.db.models import Count, Sum
+
+BATCH_SIZE = 2000
+
+
+def backfill(apps, schema_editor):
+    Bill = apps.get_model('bills', 'Bill')
+    DailyBillRollup = apps.get_model('bills', 'DailyBillRollup')
+    DailyBillRollup.objects.all().delete()
+    rows = (
+        Bill.objects.order_by()
+        .values('user_id', 'date', 'type', 'category')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    DailyBillRollup.objects.bulk_create(
+        (
+            DailyBillRollup(
+                user_id=row['user_id'], date=row['date'], type=row['type'],
+                category=row['category'], amount=row['total'], bill_count=row['count'],
+            )
+            for row in rows.iterator(chunk_size=BATCH_SIZE)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def clear(apps, schema_editor):
+    apps.get_model('bills', 'DailyBillRollup').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bills', '0010_job_summarize_kind'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, clear),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.contrib.auth.models import User
 
@@ -40,14 +40,143 @@ class Bill(models.Model):
         verbose_name = '账单'
         verbose_name_plural = '账单'
         ordering = ['-date', '-created_at']
+        indexes = [
+            # 按日期查询/排序（today_summary、日期范围筛选、游标分页）
+            models.Index(fields=['user', 'date', 'created_at'], name='bill_user_date_idx'),
+            # 按收支和分类筛选（BillFilter）
+            models.Index(fields=['user', 'type', 'category', 'date'], name='bill_user_type_cat_date_idx'),
+            # 默认列表按创建时间倒序
+            models.Index(fields=['user', 'created_at'], name='bill_user_created_idx'),
+            # 增量同步（/api/bills/changes/）按修改时间读取
+            models.Index(fields=['user', 'updated_at', 'id'], name='bill_user_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.date} - {self.remark or '无备注'} - {self.amount}"
 
+    def save(self, *args, **kwargs):
+        # signals 在 pre_save 加锁读取修改前的汇总维度、post_save 修正汇总，两步需要在同一个事务里
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 记录从数据库读出时的汇总维度，更新时用来修正 DailyBillRollup
+        instance._rollup_state = instance.rollup_state()
+        return instance
+
+    def rollup_state(self):
+        """(user_id, date, type, category, amount)，字段未加载时返回 None。"""
+        deferred = self.get_deferred_fields()
+        if deferred & {'user_id', 'date', 'type', 'category', 'amount'}:
+            return None
+        return (self.user_id, self.date, self.type, self.category, self.amount)
+
+class BillTombstone(models.Model):
+    """已删除账单的记录，供增量同步返回删除的 id，见 bills/sync.py。"""
+    # 删除用户时账单和墓碑一起清除；不建外键约束，避免级联删除过程中写入的墓碑阻塞用户删除
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False, related_name='bill_tombstones')
+    bill_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.bill_id} - {self.deleted_at}"
+
+class DailyBillRollup(models.Model):
+    """按 (用户, 日期, 收支, 分类) 预先汇总的账单金额和笔数，由 bills.rollup 维护。"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField(verbose_name='日期')
+    type = models.CharField(max_length=10, choices=Bill.TYPE_CHOICES, verbose_name='收支')
+    category = models.CharField(max_length=20, verbose_name='类型')
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='金额合计')
+    bill_count = models.IntegerField(default=0, verbose_name='笔数')
+
+    class Meta:
+        verbose_name = '每日账单汇总'
+        verbose_name_plural = '每日账单汇总'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date', 'type', 'category'], name='unique_daily_bill_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.type} - {self.category} - {self.amount}"
+
 class AnalysisHistory(models.Model):
+    """用户的智能分析对话，消息逐条保存在 AnalysisMessage 中，较早的对话压缩进 summary。"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='analysis_history')
-    history = models.JSONField(default=list, blank=True)
+    summary = models.TextField(blank=True, default='', verbose_name='早期对话摘要')
+    summarized_until = models.BigIntegerField(default=0, verbose_name='已摘要的最后一条消息 ID')
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user.username} 的分析历史"
+
+class AnalysisMessage(models.Model):
+    ROLE_CHOICES = [
+        ('system', '系统'),
+        ('user', '用户'),
+        ('assistant', '助手'),
+    ]
+
+    history = models.ForeignKey(AnalysisHistory, on_delete=models.CASCADE, related_name='messages')
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+    content = models.TextField()
+    tokens = models.PositiveIntegerField(default=0, verbose_name='估算 token 数')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.role}: {self.content[:20]}"
+
+    def as_message(self):
+        return {'role': self.role, 'content': self.content}
+
+class Job(models.Model):
+    """后台任务，由 run_bill_jobs 命令的 worker 进程领取执行，见 bills/jobs.py。"""
+    KIND_CHOICES = [
+        ('parse_bills', '解析账单'),
+        ('analyze', '智能分析'),
+        ('summarize', '压缩分析对话'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', '排队中'),
+        ('running', '执行中'),
+        ('succeeded', '成功'),
+        ('failed', '失败'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    payload = models.JSONField(default=dict, verbose_name='任务参数')
+    result = models.JSONField(null=True, blank=True, verbose_name='执行结果')
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='结果对应的 HTTP 状态码')
+    error = models.TextField(blank=True, default='')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='执行次数')
+    worker = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = '后台任务'
+        verbose_name_plural = '后台任务'
+        indexes = [
+            # worker 按 id 顺序领取排队中的任务
+            models.Index(fields=['status', 'id'], name='job_status_id_idx'),
+            # 按用户统计排队/执行中的任务数
+            models.Index(fields=['user', 'status'], name='job_user_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} - {self.status}"
@@ -0,0 +1,188 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# 账单列表、游标分页和导出共用的顺序
+BILL_ORDERING = ('-date', '-created_at', '-id')
+
+
+def keyset_filter(position, reverse=False):
+    """
+    生成“位于 position 之后”的复合条件：(date, created_at, id) 按字典序比较。
+    默认按 BILL_ORDERING 降序往后取，reverse 为真时往前取。
+    """
+    date, created_at, pk = position
+    op = 'gt' if reverse else 'lt'
+    return (
+        Q(**{f'date__{op}': date})
+        | Q(date=date, **{f'created_at__{op}': created_at})
+        | Q(date=date, created_at=created_at, **{f'id__{op}': pk})
+    )
+
+
+class BillCursorPagination(BasePagination):
+    """
+    账单列表的游标（keyset）分页。
+
+    按 (date, created_at, id) 降序排列，游标中记录的是边界行的这三个值，
+    翻页时直接用 WHERE 条件定位，不使用 OFFSET，因此每页的查询成本与历史数据量无关。
+
+    只有请求中带了 ``page_size`` 或 ``cursor`` 参数时才启用分页，
+    否则保持原来一次返回全部账单的行为，兼容旧的前端。
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 50
+    max_page_size = 500
+    invalid_cursor_message = '无效的分页游标'
+    ordering = BILL_ORDERING
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self._page_queryset(queryset, request)
+        if page_queryset is None:
+            return None
+        return self._finish_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """异步视图使用的版本，见 views.bill_list_async。"""
+        page_queryset = self._page_queryset(queryset, request)
+        if page_queryset is None:
+            return None
+        return self._finish_page([bill async for bill in page_queryset])
+
+    def _page_queryset(self, queryset, request):
+        """没有启用分页时返回 None，否则返回读取本页（多取一条）的查询集。"""
+        if (self.page_size_query_param not in request.query_params
+                and self.cursor_query_param not in request.query_params):
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+        self._position, self._reverse = position, reverse
+
+        if reverse:
+            queryset = queryset.order_by('date', 'created_at', 'id')
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if position is not None:
+            queryset = queryset.filter(keyset_filter(position, reverse))
+
+        return queryset[:self.page_size + 1]
+
+    def _finish_page(self, results):
+        position, reverse = self._position, self._reverse
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            date = parse_date(payload['d'])
+            created_at = parse_datetime(payload['c'])
+            pk = int(payload['i'])
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError, json.JSONDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if date is None or created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return (date, created_at, pk), reverse
+
+    def encode_cursor(self, bill, reverse):
+        payload = {
+            'd': bill.date.isoformat(),
+            'c': bill.created_at.isoformat(),
+            'i': bill.pk,
+        }
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        ).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # 向前翻到了空页，回到第一页
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': '分页游标',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': '每页条数，传入后启用分页',
+                'schema': {'type': 'integer'},
+            },
+        ]
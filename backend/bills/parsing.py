@@ -0,0 +1,195 @@
+"""
+把 DeepSeek 返回的 “时间|收入/支出|金额|类型|备注” 文本解析成账单数据，
+以及不调用 DeepSeek、直接按规则解析简单输入（如“午饭 25”、“昨天打车 40”）。
+"""
+import re
+from datetime import datetime, timedelta
+
+CATEGORY_MAPPING = {
+    '工资': 'salary',
+    '奖金': 'bonus',
+    '红包': 'red_packet',
+    '吃饭': 'food',
+    '购物': 'shopping',
+    '娱乐': 'entertainment',
+    '生活': 'living',
+    '住房': 'housing',
+    '工作': 'work',
+    '交通': 'transportation',
+    '医疗': 'medical',
+    '宠物': 'pet',
+}
+
+
+def map_category(label, bill_type):
+    """中文分类名转换成 Bill.category，未知分类收入记为 other，支出记为 living。"""
+    return CATEGORY_MAPPING.get(label.strip(), 'other' if bill_type == 'income' else 'living')
+
+
+def parse_bill_line(line, today):
+    """
+    解析一行结果，返回 (账单数据, 错误原因)，两者只有一个不为 None。
+    账单数据的格式与 BillSerializer 的输入一致。
+    """
+    fields = line.split('|')
+    if len(fields) != 5:
+        return None, f'字段数应为 5，实际为 {len(fields)}'
+
+    date_str, type_str, amount_str, category, remark = (field.strip() for field in fields)
+    if not type_str or not amount_str:  # 收支和金额是必填项
+        return None, '缺少收支类型或金额'
+
+    bill_type = 'income' if '收入' in type_str else 'expense'
+    amount = amount_str.replace('¥', '').replace(',', '')
+
+    try:
+        date = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else today
+    except ValueError:
+        date = today
+
+    return {
+        'type': bill_type,
+        'amount': amount,
+        'date': date.isoformat(),
+        'category': map_category(category, bill_type),
+        'remark': remark or None,
+    }, None
+
+
+def parse_bill_lines(text, today):
+    """
+    解析全部结果行。
+    返回 (rows, diagnostics)：rows 为 [(行号, 原文, 账单数据)]，diagnostics 记录被跳过的行。
+    """
+    rows = []
+    diagnostics = []
+    for line_no, line in enumerate(text.strip().split('\n'), start=1):
+        if not line.strip():
+            continue
+        data, reason = parse_bill_line(line, today)
+        if data is None:
+            diagnostics.append({'line': line_no, 'text': line, 'status': 'skipped', 'reason': reason})
+        else:
+            rows.append((line_no, line, data))
+    return rows, diagnostics
+
+
+# 以下规则与 call_deepseek 提示词中的规则保持一致，修改时需要同步
+RELATIVE_DATES = {'今天': 0, '昨天': 1, '前天': 2}
+
+EXPENSE_KEYWORDS = {
+    '吃饭': ['吃', '喝', '饭', '餐', '菜', '火锅', '烧烤', '外卖', '零食', '水果', '超市',
+           '早饭', '午饭', '晚饭', '早餐', '午餐', '晚餐', '夜宵'],
+    '购物': ['买', '购', '衣服', '裤子', '鞋', '包', '电子产品', '数码', '家电', '网购', '淘宝', '京东'],
+    '娱乐': ['电影', '游戏', 'ktv', '唱歌', '旅游', '度假', '健身', '运动', '演唱会', '展览', '门票', '玩'],
+    '住房': ['房租', '水电', '物业', '维修', '装修', '家具', '家居', '电费', '水费', '燃气费', '宽带', '房贷'],
+    '工作': ['办公', '文具', '打印', '复印', '培训', '课程', '考试', '认证', '工作餐', '加班', '差旅'],
+    '交通': ['地铁', '公交', '打车', '滴滴', '高铁', '火车', '飞机', '机票', '加油', '停车', '汽车', '修车'],
+    '医疗': ['医院', '看病', '药', '体检', '门诊', '挂号', '手术', '治疗', '保健', '医保', '牙科'],
+    '宠物': ['宠物', '猫', '狗', '兽医', '宠物医院', '宠物食品', '猫粮', '狗粮', '宠物用品', '洗澡', '美容'],
+}
+
+INCOME_KEYWORDS = {
+    '工资': ['工资', '薪水', '工钱'],
+    '奖金': ['奖金', '奖励', '年终奖', '提成'],
+    '红包': ['红包', '压岁钱'],
+}
+
+# 出现这些词时无法可靠判断收支方向，交给 DeepSeek
+AMBIGUOUS_WORDS = ['发红包', '给', '借', '还', '退款', '转账', '报销']
+
+SEGMENT_SEPARATORS = re.compile(r'[，,；;、\n]+')
+# 金额前的正负号一起去掉，不留在备注里；收支方向仍按关键词判断
+AMOUNT_PATTERN = re.compile(r'[-+]?\s*[¥￥]?\s*(\d+(?:\.\d{1,2})?)\s*(?:元|块钱|块|rmb)?', re.IGNORECASE)
+# 数字后面跟着日期/时间/数量单位时，说明不是简单的“项目 金额”格式
+NON_AMOUNT_PATTERN = re.compile(r'\d+\s*(?:月|日|号|点|年|个|斤|次|天|小时|分钟|%)')
+FILLER_WORDS = re.compile(r'花了|花费|用了|付了|支付|消费|收到|入账|到账')
+# 只匹配到单个字（如“包子”里的“包”）时不够可靠，交给 DeepSeek
+MIN_KEYWORD_LENGTH = 2
+
+
+def _best_keyword_match(text, keyword_table):
+    """返回最长关键词匹配的分类名，最长匹配对应多个分类时返回 None。"""
+    best_length = 0
+    best_labels = set()
+    for label, keywords in keyword_table.items():
+        for keyword in keywords:
+            if keyword in text:
+                if len(keyword) > best_length:
+                    best_length, best_labels = len(keyword), {label}
+                elif len(keyword) == best_length:
+                    best_labels.add(label)
+    if len(best_labels) == 1:
+        return best_labels.pop(), best_length
+    return None, best_length
+
+
+def classify(text, bill_type):
+    """按关键词规则给账单分类，返回 Bill.category；没有可靠的匹配时收入记为 other，支出记为 living。"""
+    keyword_table = INCOME_KEYWORDS if bill_type == 'income' else EXPENSE_KEYWORDS
+    label, _ = _best_keyword_match((text or '').lower(), keyword_table)
+    return map_category(label or '', bill_type)
+
+
+def parse_simple_segment(segment, today):
+    """
+    按规则解析一条简单记录，返回结果行（时间|收入/支出|金额|类型|备注），
+    无法确定时返回 None。
+    """
+    # 匹配时不区分大小写（如“ktv”），备注保留用户输入的原文
+    text = segment.strip()
+    lowered = text.lower()
+    if not text or NON_AMOUNT_PATTERN.search(lowered):
+        return None
+    if any(word in lowered for word in AMBIGUOUS_WORDS):
+        return None
+
+    amounts = AMOUNT_PATTERN.findall(text)
+    if len(amounts) != 1:
+        return None
+    amount = amounts[0]
+
+    date = today
+    date_words = [word for word in RELATIVE_DATES if word in text]
+    if len(date_words) > 1:
+        return None
+    if date_words:
+        date = today - timedelta(days=RELATIVE_DATES[date_words[0]])
+
+    remark = AMOUNT_PATTERN.sub('', text)
+    for word in date_words:
+        remark = remark.replace(word, '')
+    remark = FILLER_WORDS.sub('', remark).strip(' ：:。.!！')
+    if not remark:
+        return None
+
+    income_label, income_length = _best_keyword_match(remark.lower(), INCOME_KEYWORDS)
+    expense_label, expense_length = _best_keyword_match(remark.lower(), EXPENSE_KEYWORDS)
+    if max(income_length, expense_length) < MIN_KEYWORD_LENGTH:
+        return None
+    # 收入和支出关键词都出现时取更长的匹配，如“红包”优先于“包”
+    if income_label and income_length > expense_length:
+        type_label, category = '收入', income_label
+    elif expense_label and expense_length > income_length:
+        type_label, category = '支出', expense_label
+    else:
+        return None
+
+    return f"{date.isoformat()}|{type_label}|{amount}|{category}|{remark}"
+
+
+def parse_simple_entry(text, today):
+    """
+    不调用 DeepSeek，直接按规则解析输入。
+    每一段都能可靠解析时返回与 DeepSeek 相同格式的结果文本，否则返回 None。
+    """
+    segments = [segment for segment in SEGMENT_SEPARATORS.split(text or '') if segment.strip()]
+    if not segments:
+        return None
+    lines = []
+    for segment in segments:
+        line = parse_simple_segment(segment, today)
+        if line is None:
+            return None
+        lines.append(line)
+    return '\n'.join(lines)
@@ -0,0 +1,196 @@
+"""
+DailyBillRollup 的增量维护。
+
+单条账单的增删改通过 signals 自动同步；bulk_create / bulk_update / QuerySet.update
+不会触发 signals，调用方需要在同一个事务里显式调用 add_bills / remove_bills。
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Sum, Value, When
+
+from .models import Bill, DailyBillRollup
+
+_suspended = ContextVar('bill_rollup_suspended', default=False)
+
+
+@contextmanager
+def suspended():
+    """
+    暂停 signals 里的逐条同步，用于批量操作：
+    调用方自己在同一个事务里按批次调用 add_bills / remove_bills。
+    """
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+def is_suspended():
+    return _suspended.get()
+
+
+def _group(states):
+    """把 (user_id, date, type, category, amount) 列表按汇总维度合并。"""
+    deltas = defaultdict(lambda: [Decimal('0'), 0])
+    for user_id, date, bill_type, category, amount in states:
+        delta = deltas[(user_id, str(date), bill_type, category)]
+        delta[0] += Decimal(str(amount))
+        delta[1] += 1
+    return deltas
+
+
+def _add(key, total, count):
+    user_id, date, bill_type, category = key
+    lookup = dict(user_id=user_id, date=date, type=bill_type, category=category)
+    updated = DailyBillRollup.objects.filter(**lookup).update(
+        amount=F('amount') + total, bill_count=F('bill_count') + count
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            DailyBillRollup.objects.create(amount=total, bill_count=count, **lookup)
+    except IntegrityError:
+        # 并发请求抢先创建了这一行
+        DailyBillRollup.objects.filter(**lookup).update(
+            amount=F('amount') + total, bill_count=F('bill_count') + count
+        )
+
+
+def _remove(key, total, count):
+    user_id, date, bill_type, category = key
+    lookup = dict(user_id=user_id, date=date, type=bill_type, category=category)
+    # 只做扣减，不创建新行：用户被级联删除时汇总行可能已经不存在
+    DailyBillRollup.objects.filter(**lookup).update(
+        amount=F('amount') - total, bill_count=F('bill_count') - count
+    )
+    DailyBillRollup.objects.filter(bill_count__lte=0, **lookup).delete()
+
+
+def _lock_rows(deltas):
+    """
+    锁定并返回 deltas 中已经存在的汇总行，按汇总维度索引。
+    按唯一索引的顺序加锁，并发的批量写入（如 import_data.py --workers）以相同顺序加锁，不会互相死锁。
+    """
+    user_ids = {key[0] for key in deltas}
+    dates = {key[1] for key in deltas}
+    rows = (
+        DailyBillRollup.objects.select_for_update()
+        .filter(user_id__in=user_ids, date__in=dates)
+        .order_by('user_id', 'date', 'type', 'category')
+        .only('pk', 'user_id', 'date', 'type', 'category')
+    )
+    existing = {}
+    for row in rows:
+        key = (row.user_id, str(row.date), row.type, row.category)
+        if key in deltas:
+            existing[key] = row.pk
+    return existing
+
+
+def _increment(existing, deltas, sign):
+    """一条 UPDATE 按主键给多行加上（sign=-1 时减去）各自的金额和笔数。"""
+    amount_field = DailyBillRollup._meta.get_field('amount')
+    amounts = Case(
+        *[When(pk=pk, then=Value(sign * deltas[key][0])) for key, pk in existing.items()],
+        output_field=DecimalField(max_digits=amount_field.max_digits, decimal_places=amount_field.decimal_places),
+    )
+    counts = Case(
+        *[When(pk=pk, then=Value(sign * deltas[key][1])) for key, pk in existing.items()],
+        output_field=IntegerField(),
+    )
+    DailyBillRollup.objects.filter(pk__in=existing.values()).update(
+        amount=F('amount') + amounts, bill_count=F('bill_count') + counts
+    )
+
+
+def add_states(states):
+    """
+    多个汇总维度时批量处理：锁定已有的行后一条 UPDATE 累加，缺少的行一次 INSERT，
+    SQL 条数与账单条数无关；只涉及一个维度（单条账单）时直接 UPDATE。
+    """
+    deltas = _group(states)
+    if len(deltas) <= 1:
+        for key, (total, count) in deltas.items():
+            _add(key, total, count)
+        return
+
+    with transaction.atomic(savepoint=False):
+        existing = _lock_rows(deltas)
+        if existing:
+            _increment(existing, deltas, 1)
+        missing = sorted(key for key in deltas if key not in existing)
+        if not missing:
+            return
+        try:
+            with transaction.atomic():
+                DailyBillRollup.objects.bulk_create([
+                    DailyBillRollup(
+                        user_id=key[0], date=key[1], type=key[2], category=key[3],
+                        amount=deltas[key][0], bill_count=deltas[key][1],
+                    )
+                    for key in missing
+                ])
+        except IntegrityError:
+            # 并发请求抢先创建了其中的行，逐行处理
+            for key in missing:
+                _add(key, *deltas[key])
+
+
+def remove_states(states):
+    deltas = _group(states)
+    if len(deltas) <= 1:
+        for key, (total, count) in deltas.items():
+            _remove(key, total, count)
+        return
+
+    with transaction.atomic(savepoint=False):
+        # 只扣减已有的行：用户被级联删除时汇总行可能已经不存在
+        existing = _lock_rows(deltas)
+        if not existing:
+            return
+        _increment(existing, deltas, -1)
+        DailyBillRollup.objects.filter(pk__in=existing.values(), bill_count__lte=0).delete()
+
+
+def add_bills(bills):
+    """新增的账单计入汇总。"""
+    add_states(bill.rollup_state() for bill in bills)
+
+
+def remove_bills(bills):
+    """删除的账单从汇总中扣除。"""
+    remove_states(bill.rollup_state() for bill in bills)
+
+
+@transaction.atomic
+def rebuild(user_id=None):
+    """根据 Bill 表重新生成汇总，返回生成的行数。"""
+    rollups = DailyBillRollup.objects.all()
+    bills = Bill.objects.all()
+    if user_id is not None:
+        rollups = rollups.filter(user_id=user_id)
+        bills = bills.filter(user_id=user_id)
+    rollups.delete()
+
+    rows = (
+        bills.order_by()
+        .values('user_id', 'date', 'type', 'category')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    created = DailyBillRollup.objects.bulk_create(
+        (
+            DailyBillRollup(
+                user_id=row['user_id'], date=row['date'], type=row['type'],
+                category=row['category'], amount=row['total'], bill_count=row['count'],
+            )
+            for row in rows.iterator(chunk_size=2000)
+        ),
+        batch_size=2000,
+    )
+    return len(created)
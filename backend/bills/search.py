@@ -0,0 +1,67 @@
+"""
+账单备注的全文搜索。
+
+MySQL 下使用 remark 上的 FULLTEXT 索引（ngram 分词，见 0008 迁移），按相关度排序，
+查询成本不随账单表变大而增长；中文没有空格分词，ngram 按连续的 2 个字切分。
+其他数据库（本地开发用的 SQLite 等）没有该索引，回退到 DRF SearchFilter 的 LIKE 查询。
+"""
+import re
+
+from django.db import connections
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+from .models import Bill
+
+FULLTEXT_INDEX_NAME = 'bill_remark_ngram_idx'
+
+# 与 MySQL ngram_token_size 的默认值一致，更短的词无法走全文索引
+MIN_TOKEN_LENGTH = 2
+
+# BOOLEAN MODE 中有特殊含义的字符
+FULLTEXT_OPERATORS = re.compile(r'[+\-<>()~*"@]+')
+
+
+def supports_fulltext(queryset):
+    return connections[queryset.db].vendor == 'mysql'
+
+
+def search_bills(queryset, terms):
+    """
+    按备注搜索，每个词都必须出现。
+    使用全文索引时附加 search_rank 并按相关度排序；太短的词退回 LIKE 查询。
+    """
+    if not supports_fulltext(queryset):
+        for term in terms:
+            queryset = queryset.filter(remark__icontains=term)
+        return queryset
+
+    phrases = []
+    for term in terms:
+        cleaned = FULLTEXT_OPERATORS.sub(' ', term).strip()
+        if len(cleaned) >= MIN_TOKEN_LENGTH:
+            # 每个词作为短语且必须出现
+            phrases.append(f'+"{cleaned}"')
+        else:
+            queryset = queryset.filter(remark__icontains=term)
+    if not phrases:
+        return queryset
+
+    connection = connections[queryset.db]
+    column = f'{connection.ops.quote_name(Bill._meta.db_table)}.{connection.ops.quote_name("remark")}'
+    rank = RawSQL(f'MATCH ({column}) AGAINST (%s IN BOOLEAN MODE)', (' '.join(phrases),))
+    ordering = queryset.query.order_by or Bill._meta.ordering
+    return queryset.annotate(search_rank=rank).filter(search_rank__gt=0).order_by('-search_rank', *ordering)
+
+
+class BillSearchFilter(filters.SearchFilter):
+    """
+    替换 SearchFilter：MySQL 下走全文索引并按相关度排序，其他数据库行为不变。
+    启用游标分页时按分页的固定顺序返回，相关度只影响是否命中。
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms or not supports_fulltext(queryset):
+            return super().filter_queryset(request, queryset, view)
+        return search_bills(queryset, terms)
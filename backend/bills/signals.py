@@ -0,0 +1,86 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import rollup, sync
+from .middleware import install_query_collector
+from .cache import invalidate_user_summaries
+from .models import Bill
+
+
+def _invalidate_on_commit(*user_ids):
+    # 事务提交后再清缓存，避免其他请求在提交前把旧数据重新写回缓存
+    for user_id in set(user_ids):
+        transaction.on_commit(lambda user_id=user_id: invalidate_user_summaries(user_id))
+
+
+def _stored_state(pk, lock=False):
+    """
+    数据库里当前的汇总维度。lock 为真时加行锁读取：并发修改同一条账单时，
+    后一个事务等前一个提交后读到新值，不会两次扣除同一个旧金额。
+    """
+    bills = Bill.objects.filter(pk=pk)
+    if lock:
+        bills = bills.select_for_update()
+    return bills.values_list('user_id', 'date', 'type', 'category', 'amount').first()
+
+
+@receiver(pre_save, sender=Bill)
+def bill_pre_save(sender, instance, **kwargs):
+    if instance._state.adding or rollup.is_suspended():
+        instance._previous_rollup_state = None
+        return
+    # 不用 from_db 时的快照：读出之后可能已被其他请求修改；Bill.save() 保证这里在事务里
+    instance._previous_rollup_state = _stored_state(instance.pk, lock=True)
+
+
+@receiver(post_save, sender=Bill)
+def bill_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_rollup_state', None)
+    current = instance.rollup_state()
+    if current is None and previous is not None:
+        # 只加载了部分字段的实例（.only()/.defer()）保存后，从数据库读取保存后的值
+        current = _stored_state(instance.pk)
+    if rollup.is_suspended():
+        instance._rollup_state = current
+        return
+    if previous != current:
+        if previous is not None:
+            rollup.remove_states([previous])
+        if current is not None:
+            rollup.add_states([current])
+    instance._rollup_state = current
+    _invalidate_on_commit(instance.user_id, *([previous[0]] if previous else []))
+
+
+@receiver(pre_delete, sender=Bill)
+def bill_pre_delete(sender, instance, origin=None, **kwargs):
+    # 删除在 Collector 的事务里进行，与 pre_save 一样锁定后读取删除前的值
+    if rollup.is_suspended() or isinstance(origin, User):
+        return
+    instance._deleted_rollup_state = _stored_state(instance.pk, lock=True)
+
+
+@receiver(post_delete, sender=Bill)
+def bill_deleted(sender, instance, origin=None, **kwargs):
+    if rollup.is_suspended():
+        return
+    # 删除用户时级联删除的账单不需要同步
+    if not isinstance(origin, User):
+        sync.record_deletions(instance.user_id, [instance.pk])
+    if hasattr(instance, '_deleted_rollup_state'):
+        # 为 None 时账单已被并发请求删除，汇总已经扣除过
+        state = instance._deleted_rollup_state
+    else:
+        state = getattr(instance, '_rollup_state', None) or instance.rollup_state()
+    if state is not None:
+        rollup.remove_states([state])
+    _invalidate_on_commit(instance.user_id)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    # 请求指标统计 SQL，见 bills/middleware.py
+    install_query_collector(connection)
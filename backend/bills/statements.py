@@ -0,0 +1,304 @@
+"""
+导入银行 / 支付宝 / 微信等导出的账单 CSV（/api/bills/import/）。
+
+上传的文件逐行读取：先在开头若干行里找到表头，根据列配置（profile）确定日期、金额、
+收支和备注所在的列，再用 parsing 中与 call_deepseek 相同的关键词规则在本地分类，
+每批 BATCH_SIZE 行调用 bulk.insert_bills 写入一次，整个文件在一个事务里导入，
+中途出错（编码、超过行数上限等）时已写入的批次一起回滚。
+已有账单按 (日期, 金额, 备注) 去重：同一份账单重复上传不会重复导入，
+文件里本来就有的多笔相同记录（如同一天两杯咖啡）会全部保留。
+"""
+import codecs
+import csv
+import io
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+
+from .bulk import insert_bills
+from .models import Bill
+from .parsing import classify
+
+BATCH_SIZE = 500
+HEADER_SEARCH_ROWS = 50   # 在前多少行里查找表头，银行流水开头通常有几行说明
+SNIFF_BYTES = 64 * 1024
+MAX_DIAGNOSTICS = 50
+
+# 列配置：date / amount / type 可以给出多个候选列名，取文件里第一个存在的；
+# remark 中的列会全部拼接作为备注，也用于分类。没有 type 列时按金额正负判断收支。
+DEFAULT_PROFILES = {
+    'wechat': {
+        'date': ['交易时间'],
+        'amount': ['金额(元)', '金额（元）'],
+        'type': ['收/支'],
+        'remark': ['交易对方', '商品', '备注'],
+    },
+    'alipay': {
+        'date': ['交易时间', '交易创建时间'],
+        'amount': ['金额', '金额（元）', '金额(元)'],
+        'type': ['收/支'],
+        'remark': ['交易对方', '商品说明', '商品名称', '备注'],
+    },
+    'bank': {
+        'date': ['交易日期', '记账日期'],
+        'amount': ['交易金额', '发生额'],
+        'remark': ['摘要', '对方户名', '交易地点', '附言'],
+    },
+    'generic': {
+        'date': ['日期', 'date'],
+        'amount': ['金额', 'amount'],
+        'type': ['收支', 'type'],
+        'remark': ['备注', 'remark', 'description'],
+    },
+}
+
+INCOME_VALUES = {'收入', '收', 'income', '贷'}
+EXPENSE_VALUES = {'支出', '支', 'expense', '借'}
+
+DATE_FORMATS = [
+    '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d',
+    '%Y/%m/%d %H:%M:%S', '%Y/%m/%d %H:%M', '%Y/%m/%d',
+    '%Y%m%d',
+]
+
+
+class StatementError(Exception):
+    """文件无法识别（编码、表头、列配置等）。"""
+
+
+def get_profiles():
+    return {**DEFAULT_PROFILES, **getattr(settings, 'BILL_STATEMENT_PROFILES', {})}
+
+
+def max_rows():
+    return getattr(settings, 'BILL_STATEMENT_MAX_ROWS', 50000)
+
+
+def detect_encoding(upload):
+    """根据文件开头判断编码：能按 UTF-8 解码就用 UTF-8，否则按 GB18030（支付宝和多数银行的导出格式）。"""
+    head = upload.read(SNIFF_BYTES)
+    upload.seek(0)
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+    except UnicodeDecodeError:
+        return 'gb18030'
+    return 'utf-8-sig'
+
+
+def _resolve_columns(header, profile):
+    """按列配置在表头中找到各字段的列号，缺少日期或金额列时返回 None。"""
+    positions = {name.strip(): index for index, name in enumerate(header)}
+
+    def first(candidates):
+        return next((positions[name] for name in candidates if name in positions), None)
+
+    columns = {
+        'date': first(profile['date']),
+        'amount': first(profile['amount']),
+        'type': first(profile.get('type', [])),
+        'remark': [positions[name] for name in profile.get('remark', []) if name in positions],
+    }
+    if columns['date'] is None or columns['amount'] is None:
+        return None
+    return columns
+
+
+def find_header(reader, profile_name=None):
+    """
+    在开头若干行里查找表头，返回 (配置名, 列号)。
+    指定 profile_name 时只按该配置匹配，否则依次尝试所有配置。
+    """
+    profiles = get_profiles()
+    if profile_name is not None:
+        if profile_name not in profiles:
+            raise StatementError(f"未知的列配置: {profile_name}，可选: {', '.join(profiles)}")
+        profiles = {profile_name: profiles[profile_name]}
+    for _ in range(HEADER_SEARCH_ROWS):
+        try:
+            row = next(reader)
+        except StopIteration:
+            break
+        for name, profile in profiles.items():
+            columns = _resolve_columns(row, profile)
+            if columns is not None:
+                return name, columns
+    raise StatementError('没有找到表头，请确认文件格式或指定列配置 profile')
+
+
+def _cell(row, index):
+    if index is None or index >= len(row):
+        return ''
+    return row[index].strip()
+
+
+def parse_date(value):
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_amount(value):
+    value = value.replace('¥', '').replace('￥', '').replace(',', '').replace(' ', '')
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        return None
+
+
+def parse_row(row, columns):
+    """把一行转换成账单数据，返回 (账单数据, 跳过原因)，两者只有一个不为 None。"""
+    date = parse_date(_cell(row, columns['date']))
+    if date is None:
+        return None, '无法识别日期'
+    amount = parse_amount(_cell(row, columns['amount']))
+    if amount is None or amount == 0:
+        return None, '无法识别金额'
+
+    if columns['type'] is not None:
+        type_value = _cell(row, columns['type']).lower()
+        if type_value in INCOME_VALUES:
+            bill_type = 'income'
+        elif type_value in EXPENSE_VALUES:
+            bill_type = 'expense'
+        else:
+            # 如微信的“/”、支付宝的“不计收支”（转账到余额宝等）
+            return None, f'不计收支: {type_value or "空"}'
+    else:
+        bill_type = 'income' if amount > 0 else 'expense'
+    amount = abs(amount).quantize(Decimal('0.01'))
+
+    remark = ' '.join(
+        value for value in (_cell(row, index) for index in columns['remark']) if value and value != '/'
+    )
+    remark = remark[:Bill._meta.get_field('remark').max_length] or None
+    return {
+        'date': date,
+        'type': bill_type,
+        'amount': amount,
+        'category': classify(remark, bill_type),
+        'remark': remark,
+    }, None
+
+
+class StatementImporter:
+    """逐批导入一个文件，记录新增、重复和跳过的行数。"""
+
+    def __init__(self, user):
+        self.user = user
+        self.created = 0
+        self.duplicates = 0
+        self.skipped = 0
+        self.diagnostics = []
+        # 导入前已有账单按 (日期, 金额, 备注) 的计数，按日期懒加载
+        self._existing = Counter()
+        self._loaded_dates = set()
+        # 本次文件里已经出现过的次数
+        self._seen = Counter()
+
+    def _skip(self, line_no, reason):
+        self.skipped += 1
+        if len(self.diagnostics) < MAX_DIAGNOSTICS:
+            self.diagnostics.append({'line': line_no, 'status': 'skipped', 'reason': reason})
+
+    def _load_existing(self, dates):
+        """一次查询载入这批新出现日期上的已有账单。"""
+        dates = set(dates) - self._loaded_dates
+        if not dates:
+            return
+        self._existing.update(
+            Bill.objects.filter(user=self.user, date__in=dates).values_list('date', 'amount', 'remark')
+        )
+        self._loaded_dates |= dates
+
+    def add_batch(self, batch):
+        self._load_existing(data['date'] for _, data in batch)
+        new_rows = []
+        for line_no, data in batch:
+            key = (data['date'], data['amount'], data['remark'])
+            # 文件中第 n 次出现的记录，只有已有账单里少于 n 条时才导入
+            self._seen[key] += 1
+            if self._seen[key] <= self._existing[key]:
+                self.duplicates += 1
+                continue
+            new_rows.append(data)
+        if new_rows:
+            insert_bills(self.user, new_rows, return_ids=False)
+            self.created += len(new_rows)
+
+    def run(self, reader, columns, lines):
+        batch = []
+        total = 0
+        for row in reader:
+            line_no = lines.line_no
+            if not any(cell.strip() for cell in row):
+                continue
+            total += 1
+            if total > max_rows():
+                raise StatementError(f'单个文件最多导入 {max_rows()} 行')
+            data, reason = parse_row(row, columns)
+            if data is None:
+                self._skip(line_no, reason)
+                continue
+            batch.append((line_no, data))
+            if len(batch) >= BATCH_SIZE:
+                self.add_batch(batch)
+                batch = []
+        if batch:
+            self.add_batch(batch)
+
+
+def import_statement(user, upload, profile=None, encoding=None):
+    """
+    导入上传的 CSV 文件，返回导入结果。
+    文件无法识别时抛出 StatementError，这时不会导入任何账单。
+    """
+    encoding = encoding or detect_encoding(upload)
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        raise StatementError(f'未知的编码: {encoding}')
+    text = io.TextIOWrapper(upload, encoding=encoding, errors='strict', newline='')
+    lines = _LineCounter(text)
+    reader = csv.reader(lines)
+    try:
+        profile_name, columns = find_header(reader, profile)
+        importer = StatementImporter(user)
+        with transaction.atomic():
+            importer.run(reader, columns, lines)
+    except UnicodeDecodeError:
+        raise StatementError(f'文件不是 {encoding} 编码，请通过 encoding 参数指定')
+    except csv.Error as e:
+        raise StatementError(f'CSV 格式错误: {e}')
+    finally:
+        text.detach()
+    return {
+        'profile': profile_name,
+        'encoding': encoding,
+        'created': importer.created,
+        'duplicates': importer.duplicates,
+        'skipped': importer.skipped,
+        'diagnostics': importer.diagnostics,
+    }
+
+
+class _LineCounter:
+    """包装文本流，记录已读取的行号，用于在诊断信息中定位行。"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.line_no = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = next(self.stream)
+        self.line_no += 1
+        return line
@@ -0,0 +1,64 @@
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+from .models import DailyBillRollup
+
+PERIOD_FUNCTIONS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def _measures(queryset):
+    """Bill 表按行计数；DailyBillRollup 已经预先汇总过，直接累加。"""
+    if queryset.model is DailyBillRollup:
+        return {'total': Sum('amount'), 'count': Sum('bill_count')}
+    return {'total': Sum('amount'), 'count': Count('id')}
+
+
+def category_totals(queryset):
+    """按收支和分类汇总金额与笔数。"""
+    return list(
+        queryset.order_by()
+        .values('type', 'category')
+        .annotate(**_measures(queryset))
+        .order_by('type', '-total')
+    )
+
+
+def type_totals(queryset):
+    """按收支汇总金额与笔数。"""
+    return list(
+        queryset.order_by()
+        .values('type')
+        .annotate(**_measures(queryset))
+        .order_by('type')
+    )
+
+
+def time_series(queryset, period='day', by_category=False):
+    """按天/周/月生成收支（可选按分类）的时间序列。"""
+    trunc = PERIOD_FUNCTIONS[period]
+    fields = ['period', 'type']
+    if by_category:
+        fields.append('category')
+    return list(
+        queryset.order_by()
+        .annotate(period=trunc('date'))
+        .values(*fields)
+        .annotate(**_measures(queryset))
+        .order_by(*fields)
+    )
+
+
+def top_remarks(queryset, limit=10):
+    """出现次数最多的备注。"""
+    return list(
+        queryset.order_by()
+        .exclude(remark__isnull=True)
+        .exclude(remark='')
+        .values('remark')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by('-count', '-total')[:limit]
+    )
@@ -0,0 +1,109 @@
+"""
+账单增量同步（/api/bills/changes/）。
+
+客户端保存上次返回的 next 令牌，下次只取之后新增/修改的账单（按 updated_at, id 排序分批返回）
+和之后删除的账单 id（BillTombstone）。令牌是不透明的 base64 JSON：
+t/i 为已读取到的 (updated_at, id) 位置，d 为删除记录的起点。
+
+一批读完时新令牌回退 OVERLAP_SECONDS：提交较晚的事务里 updated_at 可能早于本次查询时间，
+回退一段时间后这些账单会在下次同步时返回，客户端按 id 覆盖即可，重复返回没有副作用。
+"""
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Bill, BillTombstone
+
+DEFAULTS = {
+    'PAGE_SIZE': 500,        # 每次最多返回的账单数
+    'OVERLAP_SECONDS': 30,   # 新令牌回退的时间
+    'TOMBSTONE_DAYS': 30,    # 删除记录保留天数，更早的令牌需要全量同步
+}
+
+
+class InvalidSyncToken(Exception):
+    """令牌格式错误。"""
+
+
+class SyncTokenExpired(Exception):
+    """令牌早于删除记录的保留期，客户端需要重新全量同步。"""
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'BILL_SYNC', {})}
+
+
+def encode_token(updated_at, pk, deleted_since):
+    payload = {'t': updated_at.isoformat(), 'i': pk, 'd': deleted_since.isoformat()}
+    return base64.urlsafe_b64encode(
+        json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    ).decode('ascii')
+
+
+def decode_token(token):
+    """返回 (updated_at, id, deleted_since)。"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+        updated_at = parse_datetime(payload['t'])
+        pk = int(payload['i'])
+        deleted_since = parse_datetime(payload['d'])
+    except (TypeError, ValueError, KeyError, UnicodeError, json.JSONDecodeError):
+        raise InvalidSyncToken('无效的同步令牌')
+    if updated_at is None or deleted_since is None:
+        raise InvalidSyncToken('无效的同步令牌')
+    return updated_at, pk, deleted_since
+
+
+def record_deletions(user_id, bill_ids):
+    """记录被删除的账单，需要与删除在同一个事务里调用。"""
+    BillTombstone.objects.bulk_create(
+        [BillTombstone(user_id=user_id, bill_id=bill_id) for bill_id in bill_ids],
+        batch_size=1000,
+    )
+
+
+def changes(user, token=None, page_size=None):
+    """
+    返回 (新增/修改的账单, 删除的账单 id, 下一个令牌, 是否还有更多)。
+    没有令牌时从头返回全部账单（首次同步）。
+    """
+    config = get_config()
+    page_size = min(page_size or config['PAGE_SIZE'], config['PAGE_SIZE'])
+    now = timezone.now()
+    sync_point = now - timedelta(seconds=config['OVERLAP_SECONDS'])
+
+    bills = Bill.objects.filter(user=user)
+    deleted = []
+    if token:
+        updated_at, pk, deleted_since = decode_token(token)
+        if deleted_since < now - timedelta(days=config['TOMBSTONE_DAYS']):
+            raise SyncTokenExpired('同步令牌已过期，请重新全量同步')
+        bills = bills.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk))
+        deleted = list(
+            BillTombstone.objects.filter(user=user, deleted_at__gt=deleted_since)
+            .values_list('bill_id', flat=True).distinct()
+        )
+    else:
+        deleted_since = sync_point
+
+    rows = list(bills.order_by('updated_at', 'id')[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if has_more:
+        # 还没读完时保留删除记录的起点，读完后再前移
+        next_token = encode_token(rows[-1].updated_at, rows[-1].id, deleted_since)
+    else:
+        next_token = encode_token(sync_point, 0, sync_point)
+    return rows, deleted, next_token, has_more
+
+
+def prune_tombstones(days=None):
+    """删除超过保留期的删除记录，返回删除条数。"""
+    days = get_config()['TOMBSTONE_DAYS'] if days is None else days
+    deleted, _ = BillTombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=days)).delete()
+    return deleted
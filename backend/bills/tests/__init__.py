@@ -0,0 +1,29 @@
+"""
+bills 应用的测试，按模块分文件：test_endpoints.py 是各接口的 SQL 条数和响应大小预算，
+其余文件测试对应模块的行为。
+
+python manage.py test bills --settings=backend.test_settings
+"""
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class BillTestCase(TestCase):
+    """
+    测试共用的用户和登录状态：cls.user 是 alice，cls.other 是 bob，
+    self.client 带着 alice 的 JWT（异步视图不支持 force_authenticate）。
+    子类覆盖 setUpTestData / setUp 时先调用 super()。
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', password='alice123')
+        cls.other = User.objects.create_user('bob', password='bob123')
+        cls.token = str(RefreshToken.for_user(cls.user).access_token)
+        cls.authorization = f'Bearer {cls.token}'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=self.authorization)
@@ -0,0 +1,87 @@
+"""批量新增、修改和删除接口（bills/bulk.py）。"""
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+
+from ..models import Bill, BillTombstone, DailyBillRollup
+from . import BillTestCase
+
+
+def row(amount='10.00', **fields):
+    return dict({'date': '2026-10-01', 'type': 'expense', 'category': 'food', 'amount': amount, 'remark': '午饭'}, **fields)
+
+
+class BulkBillTests(BillTestCase):
+
+    def create(self, rows):
+        response = self.client.post('/api/bills/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def assertReturnsStoredIds(self, data, count):
+        ids = [bill['id'] for bill in data['bills']]
+        self.assertEqual(data['count'], count)
+        self.assertNotIn(None, ids)
+        self.assertEqual(
+            sorted(ids), list(Bill.objects.filter(user=self.user).order_by('id').values_list('id', flat=True))
+        )
+
+    def test_create_returns_ids(self):
+        data = self.create([row(str(index)) for index in range(1, 6)])
+        self.assertReturnsStoredIds(data, 5)
+        self.assertEqual(DailyBillRollup.objects.get(user=self.user).bill_count, 5)
+
+    def test_create_returns_ids_without_returning_support(self):
+        # MySQL 的批量 INSERT 不返回 id，此时逐条插入
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert',
+                               new_callable=mock.PropertyMock, return_value=False):
+            data = self.create([row(str(index), category=('food', 'pet')[index % 2]) for index in range(1, 6)])
+        self.assertReturnsStoredIds(data, 5)
+        self.assertEqual(
+            dict(DailyBillRollup.objects.filter(user=self.user).values_list('category', 'bill_count')),
+            {'food': 2, 'pet': 3},
+        )
+
+    def test_invalid_row_writes_nothing(self):
+        response = self.client.post('/api/bills/bulk/', [row(), row(amount='abc'), row(type='gift')], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [1, 2])
+        self.assertFalse(Bill.objects.exists())
+
+    def test_empty_or_malformed_body(self):
+        self.assertEqual(self.client.post('/api/bills/bulk/', [], format='json').status_code, 400)
+        self.assertEqual(self.client.post('/api/bills/bulk/', {'amount': '1'}, format='json').status_code, 400)
+
+    def test_update_and_partial_update(self):
+        ids = [bill['id'] for bill in self.create([row('1'), row('2')])['bills']]
+        response = self.client.put(
+            '/api/bills/bulk/', [row('5', id=ids[0], remark='晚饭'), row('6', id=ids[1])], format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        response = self.client.patch('/api/bills/bulk/', [{'id': ids[1], 'category': 'pet'}], format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            list(Bill.objects.order_by('id').values_list('amount', 'remark', 'category')),
+            [(Decimal('5.00'), '晚饭', 'food'), (Decimal('6.00'), '午饭', 'pet')],
+        )
+
+    def test_update_rejects_other_users_and_duplicate_ids(self):
+        foreign = Bill.objects.create(user=self.other, date='2026-10-01', type='expense', category='food', amount=1)
+        own = self.create([row()])['bills'][0]['id']
+        response = self.client.patch(
+            '/api/bills/bulk/', [{'id': own, 'amount': '2'}, {'id': own, 'amount': '3'}, {'id': foreign.id, 'amount': '4'}],
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [1, 2])
+        self.assertEqual(Bill.objects.get(pk=own).amount, Decimal('10.00'))
+        self.assertEqual(Bill.objects.get(pk=foreign.id).amount, Decimal('1.00'))
+
+    def test_delete(self):
+        ids = [bill['id'] for bill in self.create([row('1'), row('2'), row('3')])['bills']]
+        response = self.client.delete('/api/bills/bulk/', {'ids': ids[:2] + [999999]}, format='json')
+        self.assertEqual(response.json(), {'deleted': 2, 'missing': [999999]})
+        self.assertEqual(list(Bill.objects.values_list('id', flat=True)), ids[2:])
+        self.assertEqual(sorted(BillTombstone.objects.values_list('bill_id', flat=True)), ids[:2])
+        self.assertEqual(DailyBillRollup.objects.get(user=self.user).amount, Decimal('3.00'))
@@ -0,0 +1,145 @@
+"""今日汇总和 DeepSeek 结果缓存（bills/cache.py）。"""
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipIf
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache, caches
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import cache as bill_cache, metrics
+from ..cache import (
+    acached_llm_response, cached_llm_response, get_today_summary, normalize_input,
+    today_summary_version_key,
+)
+from ..models import Bill
+from . import BillTestCase
+
+
+class TodaySummaryCacheTests(BillTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.today = timezone.now().date()
+
+    def add_bill(self, bill_type, amount, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Bill.objects.create(
+                user=self.user, date=fields.pop('date', self.today), type=bill_type,
+                category=fields.pop('category', 'food'), amount=Decimal(amount), **fields
+            )
+
+    def test_summary_sums_today_only(self):
+        self.add_bill('expense', '12.50')
+        self.add_bill('expense', '7.50')
+        self.add_bill('income', '100')
+        self.add_bill('expense', '999', date=self.today.replace(year=self.today.year - 1))
+        summary = get_today_summary(self.user.id)
+        self.assertEqual(summary['expense'], Decimal('20.00'))
+        self.assertEqual(summary['income'], Decimal('100'))
+        self.assertEqual(summary['date'], self.today)
+
+    def test_second_read_is_cached(self):
+        self.add_bill('expense', '10')
+        get_today_summary(self.user.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_today_summary(self.user.id)['expense'], Decimal('10'))
+
+    def test_writes_invalidate_cache(self):
+        bill = self.add_bill('expense', '10')
+        self.assertEqual(get_today_summary(self.user.id)['expense'], Decimal('10'))
+
+        self.add_bill('expense', '5')
+        self.assertEqual(get_today_summary(self.user.id)['expense'], Decimal('15'))
+
+        bill.amount = Decimal('1')
+        with self.captureOnCommitCallbacks(execute=True):
+            bill.save()
+        self.assertEqual(get_today_summary(self.user.id)['expense'], Decimal('6'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bill.delete()
+        self.assertEqual(get_today_summary(self.user.id)['expense'], Decimal('5'))
+
+    def test_other_users_cache_untouched(self):
+        get_today_summary(self.other.id)
+        version = cache.get(today_summary_version_key(self.other.id))
+        self.add_bill('expense', '10')
+        self.assertEqual(cache.get(today_summary_version_key(self.other.id)), version)
+        with self.assertNumQueries(0):
+            get_today_summary(self.other.id)
+
+    def test_result_computed_before_commit_not_served(self):
+        self.add_bill('expense', '10')
+        compute = bill_cache.compute_today_summary
+
+        def racing(user_id, date):
+            # 读到提交前的数据后，另一个请求提交了新账单并清了缓存
+            summary = compute(user_id, date)
+            self.add_bill('expense', '5')
+            return summary
+
+        with mock.patch('bills.cache.compute_today_summary', side_effect=racing):
+            self.assertEqual(get_today_summary(self.user.id)['expense'], Decimal('10'))
+        self.assertEqual(get_today_summary(self.user.id)['expense'], Decimal('15'))
+
+    def test_cache_errors_fall_back_to_database(self):
+        self.add_bill('expense', '10')
+        with mock.patch('bills.cache.cache.get', side_effect=ConnectionError('redis down')), \
+                self.assertLogs('bills.cache', 'WARNING'):
+            self.assertEqual(get_today_summary(self.user.id)['expense'], Decimal('10'))
+
+
+class LLMResponseCacheTests(TestCase):
+
+    def setUp(self):
+        caches['llm'].clear()
+        self.today = timezone.now().date()
+        self.call = mock.Mock(return_value='2026-10-17|支出|25|吃饭|午饭')
+
+    def test_normalize_input(self):
+        self.assertEqual(normalize_input('  午饭\u3000２５\n KTV  '), '午饭 25 ktv')
+
+    def test_equivalent_inputs_hit(self):
+        with mock.patch.object(metrics, 'observe_llm_cache') as observe:
+            self.assertEqual(cached_llm_response('call_deepseek', '午饭 25', self.today, self.call), (self.call.return_value, False))
+            self.assertEqual(cached_llm_response('call_deepseek', ' 午饭  ２５ ', self.today, self.call), (self.call.return_value, True))
+        self.assertEqual(self.call.call_count, 1)
+        self.assertEqual(observe.call_args_list, [mock.call(hit=False), mock.call(hit=True)])
+
+    @skipIf(metrics.prometheus_client is None, '需要 prometheus_client')
+    def test_hits_exported_to_prometheus(self):
+        registry = metrics.prometheus_client.REGISTRY
+        sample = 'bill_deepseek_cache_lookups_total'
+        before = registry.get_sample_value(sample, {'result': 'hit'}) or 0
+        cached_llm_response('call_deepseek', '午饭 25', self.today, self.call)
+        cached_llm_response('call_deepseek', '午饭 25', self.today, self.call)
+        self.assertEqual(registry.get_sample_value(sample, {'result': 'hit'}), before + 1)
+
+    def test_key_depends_on_prompt_and_date(self):
+        cached_llm_response('call_deepseek', '午饭 25', self.today, self.call)
+        cached_llm_response('call_deepseek', '午饭 25', self.today + timedelta(days=1), self.call)
+        cached_llm_response('other_prompt', '午饭 25', self.today, self.call)
+        self.assertEqual(self.call.call_count, 3)
+
+    def test_empty_result_not_cached(self):
+        self.call.return_value = None
+        cached_llm_response('call_deepseek', '午饭 25', self.today, self.call)
+        cached_llm_response('call_deepseek', '午饭 25', self.today, self.call)
+        self.assertEqual(self.call.call_count, 2)
+
+    def test_async_shares_cache(self):
+        async def call():
+            return 'async'
+
+        self.assertEqual(async_to_sync(acached_llm_response)('call_deepseek', '午饭 25', self.today, call), ('async', False))
+        self.assertEqual(cached_llm_response('call_deepseek', '午饭 25', self.today, self.call), ('async', True))
+        self.call.assert_not_called()
+
+    def test_cache_errors_call_through(self):
+        with mock.patch.object(caches['llm'], 'get', side_effect=ConnectionError('redis down')), \
+                self.assertLogs('bills.cache', 'WARNING'):
+            self.assertEqual(cached_llm_response('call_deepseek', '午饭 25', self.today, self.call)[1], False)
+        self.call.assert_called_once()
@@ -0,0 +1,172 @@
+"""智能分析的账单上下文（bills/analysis.py）和对话窗口（bills/conversation.py）。"""
+import importlib
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.apps import apps
+from django.core.cache import cache
+from django.test import override_settings
+
+from .. import conversation, jobs
+from ..analysis import format_bill_context, get_bill_context
+from ..llm import LLMError
+from ..models import AnalysisHistory, AnalysisMessage, Bill, DailyBillRollup, Job
+from . import BillTestCase
+
+
+def add_bill(user, amount, remark, category='food'):
+    return Bill.objects.create(
+        user=user, date=date(2026, 10, 1), type='expense', category=category, amount=Decimal(amount), remark=remark
+    )
+
+
+class BillContextTests(BillTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_empty(self):
+        self.assertEqual(format_bill_context(self.user.id), '用户目前没有任何账单记录。')
+
+    def test_sections(self):
+        add_bill(self.user, '25', '午饭')
+        add_bill(self.user, '199', '运动鞋', category='shopping')
+        context = format_bill_context(self.user.id)
+        self.assertIn('账单时间范围：2026-10-01 至 2026-10-01', context)
+        self.assertIn('支出 | 共 2 笔 | 224.00', context)
+        self.assertIn('支出 | 购物 | 1 | 199.00', context)
+        self.assertIn('2026-10 | 支出 | 2 | 224.00', context)
+        self.assertIn('2026-10-01 | 支出 | 吃饭 | 25.00 | 午饭', context)
+
+    def test_bills_from_before_rollup(self):
+        # 汇总表上线前已有的账单由 0011 迁移补进汇总，账单上下文不会误报“没有账单”
+        add_bill(self.user, '25', '午饭')
+        DailyBillRollup.objects.all().delete()
+        importlib.import_module('bills.migrations.0011_backfill_dailybillrollup').backfill(apps, None)
+        context = format_bill_context(self.user.id)
+        self.assertNotIn('没有任何账单', context)
+        self.assertIn('支出 | 共 1 笔 | 25.00', context)
+
+    def test_cached_until_bills_change(self):
+        add_bill(self.user, '25', '午饭')
+        get_bill_context(self.user.id)
+        with self.assertNumQueries(0):
+            get_bill_context(self.user.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            add_bill(self.user, '30', '晚饭')
+        self.assertIn('晚饭', get_bill_context(self.user.id))
+
+
+class ConversationContextTests(BillTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def answer(self, question):
+        with mock.patch.object(conversation, 'get_client') as get_client:
+            get_client.return_value.chat.return_value = f'回答：{question}'
+            data, status_code = conversation.answer_question(self.user, question)
+        self.assertEqual(status_code, 200)
+        return get_client.return_value.chat.call_args.args[0]
+
+    def test_context_follows_new_bills(self):
+        add_bill(self.user, '25', '午饭')
+        first = self.answer('我吃饭花了多少？')
+        self.assertIn('午饭', first[0]['content'])
+
+        # 对话中途记的账，下一轮就能看到
+        with self.captureOnCommitCallbacks(execute=True):
+            add_bill(self.user, '88', '火锅')
+        second = self.answer('现在呢？')
+        self.assertEqual(second[0]['role'], 'system')
+        self.assertIn('火锅', second[0]['content'])
+        self.assertEqual([message['content'] for message in second[1:]],
+                         ['我吃饭花了多少？', '回答：我吃饭花了多少？', '现在呢？'])
+
+    def test_context_not_stored_in_history(self):
+        add_bill(self.user, '25', '午饭')
+        self.answer('我吃饭花了多少？')
+        self.assertEqual(list(AnalysisMessage.objects.values_list('role', flat=True)), ['user', 'assistant'])
+
+
+@override_settings(ANALYSIS_HISTORY={'WINDOW_TOKENS': 100, 'SUMMARY_TRIGGER_TOKENS': 100, 'PAGE_SIZE': 4})
+class ConversationWindowTests(BillTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.history = AnalysisHistory.objects.create(user=self.user)
+
+    def add_turns(self, count, tokens=20):
+        start = self.history.messages.count() // 2
+        for index in range(start, start + count):
+            AnalysisMessage.objects.create(history=self.history, role='user', content=f'问题 {index}', tokens=tokens)
+            AnalysisMessage.objects.create(history=self.history, role='assistant', content=f'回答 {index}', tokens=tokens)
+
+    def test_window_keeps_latest_within_budget(self):
+        self.add_turns(5)
+        window = conversation.window_messages(self.history)
+        self.assertEqual([message.content for message in window], ['回答 2', '问题 3', '回答 3', '问题 4', '回答 4'])
+
+    def test_window_keeps_at_least_one_message(self):
+        self.add_turns(1, tokens=500)
+        self.assertEqual([message.content for message in conversation.window_messages(self.history)], ['回答 0'])
+
+    def test_prompt_includes_summary(self):
+        self.add_turns(1)
+        self.history.summary = '用户关心餐饮支出。'
+        messages = conversation.build_prompt(self.history, '账单汇总', '还有呢？')
+        self.assertEqual([message['role'] for message in messages], ['system', 'system', 'user', 'assistant', 'user'])
+        self.assertIn('用户关心餐饮支出。', messages[1]['content'])
+
+    def test_history_page(self):
+        self.add_turns(3)
+        page, before = conversation.history_page(self.history)
+        self.assertEqual([message.content for message in page], ['问题 1', '回答 1', '问题 2', '回答 2'])
+        page, before = conversation.history_page(self.history, before)
+        self.assertEqual([message.content for message in page], ['问题 0', '回答 0'])
+        self.assertIsNone(before)
+
+    def answer(self, question):
+        with mock.patch.object(conversation, 'get_client') as get_client:
+            get_client.return_value.chat.return_value = '回答'
+            conversation.answer_question(self.user, question)
+        return get_client.return_value.chat
+
+    def test_summary_runs_in_background(self):
+        self.add_turns(5)
+        chat = self.answer('新问题')
+        # 请求里只调用一次 DeepSeek（回答问题），摘要交给后台任务
+        self.assertEqual(chat.call_count, 1)
+        self.assertEqual(list(Job.objects.values_list('kind', 'status')), [('summarize', 'pending')])
+
+        self.answer('再问一次')
+        self.assertEqual(Job.objects.filter(kind='summarize').count(), 1)
+
+        job = jobs.claim_next('test')
+        with mock.patch.object(conversation, 'get_client') as get_client:
+            get_client.return_value.chat.return_value = ' 用户问了很多问题。 '
+            jobs.run_job(job)
+        self.assertEqual((job.status, job.result), ('succeeded', {'summarized': True}))
+        self.history.refresh_from_db()
+        self.assertEqual(self.history.summary, '用户问了很多问题。')
+        window = conversation.window_messages(self.history)
+        self.assertEqual(self.history.summarized_until, window[0].id - 1)
+        transcript = get_client.return_value.chat.call_args.args[0][1]['content']
+        self.assertIn('用户：问题 0', transcript)
+
+    def test_no_summary_below_threshold(self):
+        self.add_turns(1)
+        self.answer('新问题')
+        self.assertFalse(Job.objects.exists())
+
+    def test_summary_failure_keeps_messages(self):
+        self.add_turns(5)
+        with mock.patch.object(conversation, 'get_client') as get_client, self.assertLogs('bills.conversation', 'WARNING'):
+            get_client.return_value.chat.side_effect = LLMError('down')
+            self.assertFalse(conversation.summarize_history(self.user))
+        self.history.refresh_from_db()
+        self.assertEqual((self.history.summary, self.history.summarized_until), ('', 0))
@@ -0,0 +1,169 @@
+"""export_data.py / import_data.py 的 NDJSON 数据文件（bills/datafiles.py）。"""
+import io
+import os
+import shutil
+import tempfile
+from collections import Counter
+from contextlib import redirect_stdout
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import OperationalError
+from django.utils import timezone
+
+import export_data
+import import_data
+from .. import datafiles
+from ..models import AnalysisHistory, AnalysisMessage, Bill, DailyBillRollup
+from . import BillTestCase
+
+
+class DataFileRoundTripTests(BillTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.stamp = timezone.now().replace(microsecond=123456)
+        bill = Bill.objects.create(
+            user=self.user, date=timezone.localdate(), type='expense', category='food',
+            amount=Decimal('12.34'), remark='午饭',
+        )
+        Bill.objects.filter(pk=bill.pk).update(created_at=self.stamp, updated_at=self.stamp + timedelta(microseconds=1))
+        history = AnalysisHistory.objects.create(user=self.user)
+        AnalysisMessage.objects.create(history=history, role='user', content='本月花了多少', tokens=6)
+        AnalysisMessage.objects.filter(history=history).update(created_at=self.stamp)
+
+    def run_quietly(self, function, *args, **kwargs):
+        with redirect_stdout(io.StringIO()):
+            return function(*args, **kwargs)
+
+    def test_dump_row_keeps_microseconds(self):
+        line = datafiles.dump_row({'at': self.stamp})
+        self.assertIn('.123456', line)
+
+    def test_round_trip_keeps_timestamps(self):
+        for compress in ('none', 'gzip'):
+            with self.subTest(compress=compress):
+                directory = os.path.join(self.directory, compress)
+                self.run_quietly(export_data.export_data, directory, compress)
+                before = list(Bill.objects.values_list('id', 'amount', 'remark', 'created_at', 'updated_at'))
+                messages = list(AnalysisMessage.objects.values_list('id', 'content', 'created_at'))
+                User.objects.all().delete()
+                self.assertFalse(Bill.objects.exists())
+
+                self.assertTrue(self.run_quietly(import_data.import_data, directory))
+                self.assertEqual(
+                    list(Bill.objects.values_list('id', 'amount', 'remark', 'created_at', 'updated_at')), before
+                )
+                self.assertEqual(list(AnalysisMessage.objects.values_list('id', 'content', 'created_at')), messages)
+
+    def test_reexport_with_other_compression_replaces_files(self):
+        self.run_quietly(export_data.export_data, self.directory, 'none')
+        Bill.objects.update(remark='第二次导出')
+        self.run_quietly(export_data.export_data, self.directory, 'gzip')
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            sorted([datafiles.MANIFEST] + [table + datafiles.EXTENSIONS['gzip'] for table in datafiles.TABLES]),
+        )
+        User.objects.all().delete()
+        self.assertTrue(self.run_quietly(import_data.import_data, self.directory))
+        self.assertEqual(list(Bill.objects.values_list('remark', flat=True)), ['第二次导出'])
+
+    def test_import_follows_manifest_compression(self):
+        self.run_quietly(export_data.export_data, self.directory, 'gzip')
+        # 旧版导出留下的未压缩文件不会被读取
+        with open(datafiles.table_path(self.directory, 'bills', 'none'), 'w', encoding='utf-8') as f:
+            f.write(datafiles.dump_row({'id': 999, 'user_id': self.user.id}))
+        self.assertEqual(datafiles.find_table(self.directory, 'bills', 'gzip')[1], 'gzip')
+        User.objects.all().delete()
+        self.assertTrue(self.run_quietly(import_data.import_data, self.directory))
+        self.assertEqual(list(Bill.objects.values_list('remark', flat=True)), ['午饭'])
+
+    def test_ambiguous_files_without_manifest(self):
+        self.run_quietly(export_data.export_data, self.directory, 'gzip')
+        os.remove(os.path.join(self.directory, datafiles.MANIFEST))
+        open(datafiles.table_path(self.directory, 'bills', 'none'), 'w').close()
+        with self.assertRaises(ValueError):
+            datafiles.find_table(self.directory, 'bills')
+        self.assertFalse(self.run_quietly(import_data.import_data, self.directory))
+
+
+class ImportDataTests(BillTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.old = timezone.now() - timedelta(days=30)
+        self.bills = [
+            Bill.objects.create(
+                user=self.user, date=timezone.localdate() - timedelta(days=index), type='expense',
+                category='food', amount=Decimal(index + 1), remark=f'账单{index}',
+            )
+            for index in range(3)
+        ]
+        Bill.objects.update(updated_at=self.old)
+        with redirect_stdout(io.StringIO()):
+            export_data.export_data(self.directory, 'none')
+
+    def run_import(self, **kwargs):
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(import_data.import_data(self.directory, **kwargs))
+
+    def rollups(self):
+        return sorted(DailyBillRollup.objects.values_list('date', 'amount', 'bill_count'))
+
+    def test_update_bumps_updated_at_of_overwritten_bills(self):
+        rollups = self.rollups()
+        started = timezone.now()
+        self.run_import(on_conflict='update')
+        for updated_at in Bill.objects.values_list('updated_at', flat=True):
+            self.assertGreaterEqual(updated_at, started)
+        self.assertEqual(self.rollups(), rollups)
+
+    def test_skip_keeps_updated_at(self):
+        self.run_import()
+        self.assertEqual(set(Bill.objects.values_list('updated_at', flat=True)), {self.old})
+
+    def test_ignored_conflicts_are_not_counted(self):
+        stats = Counter()
+        objs = [
+            Bill(id=self.bills[0].id, user=self.user, date=timezone.localdate(), type='expense',
+                 category='food', amount=Decimal('99')),
+            Bill(id=self.bills[-1].id + 100, user=self.user, date=timezone.localdate(), type='expense',
+                 category='food', amount=Decimal('5')),
+        ]
+        saved = import_data._save_chunk(Bill, objs, stats, '账单')
+        self.assertEqual([bill.id for bill in saved], [objs[1].id])
+        self.assertEqual(stats, Counter(skipped=1))
+        self.assertEqual(Bill.objects.get(pk=self.bills[0].id).amount, Decimal('1'))
+
+    def test_deadlocked_chunk_is_retried(self):
+        rollups = self.rollups()
+        Bill.objects.all().delete()
+        add_bills = import_data.rollup.add_bills
+        calls = []
+
+        def deadlock_once(bills):
+            calls.append(len(bills))
+            if len(calls) == 1:
+                raise OperationalError(1213, 'Deadlock found when trying to get lock')
+            add_bills(bills)
+
+        with mock.patch.object(import_data.rollup, 'add_bills', deadlock_once), \
+                mock.patch.object(import_data.time, 'sleep') as sleep:
+            self.run_import()
+        self.assertEqual(calls, [3, 3])
+        sleep.assert_called_once()
+        self.assertEqual(Bill.objects.count(), 3)
+        self.assertEqual(self.rollups(), rollups)
+
+    def test_other_errors_are_not_retried(self):
+        Bill.objects.all().delete()
+        with mock.patch.object(import_data.rollup, 'add_bills', side_effect=OperationalError('no such table')):
+            with self.assertRaises(OperationalError), redirect_stdout(io.StringIO()):
+                import_data.import_data(self.directory)
+        self.assertFalse(Bill.objects.exists())
@@ -0,0 +1,434 @@
+"""
+接口的 SQL 条数和响应大小回归测试。
+
+每个用例分别在账单较少（SMALL_BILLS）和较多（LARGE_BILLS）时请求同一个接口：
+两次的 SQL 条数必须相同（随数据量增长的通常是 N+1），并且不超过预算；
+响应大小不超过预算。另有一个数据更多的用户，用来确认接口只读取当前用户的数据。
+DeepSeek 调用用 mock 替换，不访问网络。
+
+python manage.py test bills --settings=backend.test_settings
+"""
+import io
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipIf
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .. import llm, sync
+from ..bulk import insert_bills
+from ..models import AnalysisHistory, AnalysisMessage, Bill, Job
+from . import BillTestCase
+
+SMALL_BILLS = 30
+LARGE_BILLS = 300
+OTHER_USER_BILLS = 500
+
+# 单条账单序列化后的大致字节数，用于不分页的接口
+BILL_JSON_BYTES = 250
+BILL_CSV_BYTES = 100
+
+SEED_BILLS = [
+    ('expense', 'food', ['早餐 包子豆浆', '午饭 黄焖鸡米饭', '星巴克咖啡', '晚饭 火锅']),
+    ('expense', 'transportation', ['地铁', '滴滴打车', '加油']),
+    ('expense', 'shopping', ['淘宝 运动鞋', '超市买菜', '京东 耳机']),
+    ('expense', 'food', ['瑞幸咖啡', '外卖 麻辣烫']),
+    ('expense', 'living', ['水电费', '话费充值', None]),
+    ('expense', 'entertainment', ['电影票', '游戏充值']),
+    ('income', 'salary', ['工资']),
+    ('income', 'red_packet', ['微信红包']),
+]
+
+LLM_ANSWER = '本月餐饮支出最多，共 1234.50 元，比上月增加 12%。'
+
+
+def bill_rows(count, start=0):
+    """生成 count 条账单数据：分布在最近半年，每天两三笔，以支出为主。"""
+    today = timezone.localdate()
+    rows = []
+    for index in range(start, start + count):
+        bill_type, category, remarks = SEED_BILLS[index % len(SEED_BILLS)]
+        amount = Decimal(8000) if category == 'salary' else Decimal(5 + index % 60 * 7) / 2
+        rows.append({
+            'date': today - timedelta(days=index // 3 % 180),
+            'type': bill_type,
+            'category': category,
+            'amount': amount.quantize(Decimal('0.01')),
+            'remark': remarks[index // len(SEED_BILLS) % len(remarks)],
+        })
+    return rows
+
+
+def seed_conversation(user, turns):
+    """追加 turns 轮已经摘要过的分析对话，之后的窗口只包含新的消息。"""
+    history, created = AnalysisHistory.objects.get_or_create(user=user)
+    messages = []
+    if created:
+        messages.append(AnalysisMessage(history=history, role='system', content='账单汇总', tokens=4))
+    for index in range(turns):
+        messages.append(AnalysisMessage(history=history, role='user', content=f'第 {index} 个问题：这个月花了多少？', tokens=12))
+        messages.append(AnalysisMessage(history=history, role='assistant', content=LLM_ANSWER, tokens=24))
+    AnalysisMessage.objects.bulk_create(messages)
+    last = history.messages.order_by('-id').first()
+    history.summary = '用户关心每月餐饮支出。'
+    history.summarized_until = last.id
+    history.save(update_fields=['summary', 'summarized_until', 'updated_at'])
+
+
+def seed_jobs(user, count):
+    """已经完成的后台任务，最后一个仍在排队。"""
+    statuses = ['succeeded'] * (count - 1) + ['pending']
+    Job.objects.bulk_create([
+        Job(
+            user=user, kind='parse_bills', status=job_status, payload={'input': '午饭 25'},
+            result={'status': 'success'} if job_status == 'succeeded' else None,
+            status_code=200 if job_status == 'succeeded' else None,
+        )
+        for job_status in statuses
+    ])
+
+
+def llm_response(content):
+    return {
+        'choices': [{'message': {'content': content}}],
+        'usage': {'prompt_tokens': 10, 'completion_tokens': 5},
+    }
+
+
+def response_content(response):
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+def format_queries(queries):
+    return '\n'.join(f"{index}. {query['sql']}" for index, query in enumerate(queries.captured_queries, 1))
+
+
+class EndpointQueryBudgetTests(BillTestCase):
+    """bills/urls.py 和 backend/urls.py 中每个接口的 SQL 条数和响应大小预算。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        insert_bills(cls.other, bill_rows(OTHER_USER_BILLS))
+        seed_conversation(cls.other, OTHER_USER_BILLS // 3)
+        seed_jobs(cls.other, OTHER_USER_BILLS // 10)
+
+    def setUp(self):
+        super().setUp()
+        self.seeded = 0
+        # 需要每次请求数据不同的用例（注册、导入等）用来编号
+        self.calls = 0
+
+    def seed_to(self, count):
+        """把当前用户的数据补充到 count 条账单（对话和后台任务按比例增加）。"""
+        added = count - self.seeded
+        if added > 0:
+            insert_bills(self.user, bill_rows(added, start=self.seeded))
+            seed_conversation(self.user, added // 3)
+            seed_jobs(self.user, added // 10)
+            self.seeded = count
+        bills = Bill.objects.filter(user=self.user)
+        self.bill = bills.latest('id')
+        self.bill_ids = list(bills.order_by('-id').values_list('id', flat=True)[:5])
+        self.job = Job.objects.filter(user=self.user).latest('id')
+
+    def assertQueryBudget(self, request, max_queries, max_bytes, status_code=200, prepare=None):
+        """
+        在 SMALL_BILLS 和 LARGE_BILLS 条账单时各执行一次 request()（缓存清空后），
+        SQL 条数不能随账单数增长，也不能超过 max_queries；返回较大数据时的响应内容。
+        prepare 在统计 SQL 之前执行，用于准备每次请求的数据。
+        """
+        counts = []
+        for count in (SMALL_BILLS, LARGE_BILLS):
+            self.seed_to(count)
+            for cache in caches.all():
+                cache.clear()
+            if prepare is not None:
+                prepare()
+            with CaptureQueriesContext(connection) as queries:
+                response = request()
+                content = response_content(response)
+            self.assertEqual(response.status_code, status_code, content[:1000])
+            counts.append(len(queries))
+
+        self.assertEqual(
+            counts[0], counts[1],
+            f'SQL 条数随账单数增长：{SMALL_BILLS} 条账单时 {counts[0]} 条，'
+            f'{LARGE_BILLS} 条账单时 {counts[1]} 条\n{format_queries(queries)}'
+        )
+        self.assertLessEqual(counts[1], max_queries, f'SQL 条数超过预算\n{format_queries(queries)}')
+        self.assertLessEqual(len(content), max_bytes, f'响应 {len(content)} 字节，超过预算 {max_bytes} 字节')
+        return content
+
+    # /api/bills/
+
+    def test_api_root(self):
+        self.assertQueryBudget(lambda: self.client.get('/api/'), 1, 500)
+
+    def test_bill_list(self):
+        # 不带分页参数时返回全部账单（兼容旧前端），响应大小随账单数增长
+        content = self.assertQueryBudget(lambda: self.client.get('/api/bills/'), 2, LARGE_BILLS * BILL_JSON_BYTES)
+        self.assertNotIn(b'"user":%d' % self.other.id, content)
+
+    def test_bill_list_paginated(self):
+        self.assertQueryBudget(lambda: self.client.get('/api/bills/?page_size=20'), 2, 20 * BILL_JSON_BYTES + 500)
+
+    def test_bill_list_next_page(self):
+        def prepare():
+            self.next_url = self.client.get('/api/bills/?page_size=20').json()['next']
+
+        self.assertQueryBudget(lambda: self.client.get(self.next_url), 2, 20 * BILL_JSON_BYTES + 1000, prepare=prepare)
+
+    def test_bill_list_filtered(self):
+        date_after = (timezone.localdate() - timedelta(days=60)).isoformat()
+        self.assertQueryBudget(
+            lambda: self.client.get(
+                f'/api/bills/?type=expense&category=food,shopping&date_after={date_after}&page_size=20'
+            ),
+            2, 20 * BILL_JSON_BYTES + 500,
+        )
+
+    def test_bill_search(self):
+        self.assertQueryBudget(
+            lambda: self.client.get('/api/bills/?search=咖啡&page_size=20'), 2, 20 * BILL_JSON_BYTES + 500
+        )
+
+    def test_bill_retrieve(self):
+        self.assertQueryBudget(lambda: self.client.get(f'/api/bills/{self.bill.id}/'), 2, BILL_JSON_BYTES)
+
+    def test_bill_create(self):
+        data = {'date': timezone.localdate().isoformat(), 'type': 'expense', 'category': 'food',
+                'amount': '25.50', 'remark': '午饭'}
+        self.assertQueryBudget(
+            lambda: self.client.post('/api/bills/', data, format='json'), 5, BILL_JSON_BYTES, status_code=201
+        )
+
+    def test_bill_update(self):
+        data = {'date': timezone.localdate().isoformat(), 'type': 'expense', 'category': 'shopping',
+                'amount': '99.00', 'remark': '改成购物'}
+        # 修改和删除时加锁重新读取账单的旧值（SELECT ... FOR UPDATE），按它修正汇总
+        self.assertQueryBudget(
+            lambda: self.client.put(f'/api/bills/{self.bill.id}/', data, format='json'), 9, BILL_JSON_BYTES
+        )
+
+    def test_bill_partial_update(self):
+        self.assertQueryBudget(
+            lambda: self.client.patch(f'/api/bills/{self.bill.id}/', {'amount': '12.00'}, format='json'),
+            12, BILL_JSON_BYTES,
+        )
+
+    def test_bill_destroy(self):
+        self.assertQueryBudget(lambda: self.client.delete(f'/api/bills/{self.bill.id}/'), 9, 0, status_code=204)
+
+    def test_today_summary(self):
+        self.assertQueryBudget(lambda: self.client.get('/api/bills/today_summary/'), 2, 200)
+
+    def test_stats(self):
+        self.assertQueryBudget(lambda: self.client.get('/api/bills/stats/'), 3, 2000)
+
+    def test_stats_search(self):
+        # 按备注搜索时只能读 Bill 表，查询条数仍然固定
+        self.assertQueryBudget(lambda: self.client.get('/api/bills/stats/?search=咖啡'), 3, 1000)
+
+    def test_stats_series(self):
+        # 按天返回最近半年的数据，大小只和天数有关
+        self.assertQueryBudget(lambda: self.client.get('/api/bills/stats/series/?period=day'), 2, 40000)
+
+    def test_stats_series_by_category(self):
+        self.assertQueryBudget(
+            lambda: self.client.get('/api/bills/stats/series/?period=month&group_by=category'), 2, 5000
+        )
+
+    def test_stats_remarks(self):
+        self.assertQueryBudget(lambda: self.client.get('/api/bills/stats/remarks/?limit=10'), 2, 1500)
+
+    def test_changes_initial(self):
+        self.assertQueryBudget(
+            lambda: self.client.get('/api/bills/changes/?page_size=100'), 2, 100 * BILL_JSON_BYTES + 500
+        )
+
+    def test_changes_since(self):
+        def prepare():
+            _, _, self.sync_token, _ = sync.changes(self.user, page_size=LARGE_BILLS)
+            self.bill.delete()
+
+        self.assertQueryBudget(
+            lambda: self.client.get(f'/api/bills/changes/?since={self.sync_token}&page_size=100'),
+            3, 100 * BILL_JSON_BYTES + 1000, prepare=prepare,
+        )
+
+    def test_export(self):
+        # 流式导出按 2000 条一批读取，测试数据只需要一批
+        content = self.assertQueryBudget(
+            lambda: self.client.get('/api/bills/export/'), 2, LARGE_BILLS * BILL_CSV_BYTES
+        )
+        self.assertEqual(content.decode('utf-8-sig').count('\n'), LARGE_BILLS + 1)
+
+    def upload(self):
+        """每次上传一个月的历史流水，日期互不重叠，不会和已有账单去重。"""
+        self.calls += 1
+        lines = ['交易时间,收/支,金额(元),交易对方,商品']
+        for index in range(50):
+            day = timezone.localdate() - timedelta(days=365 + self.calls * 30 + index % 30)
+            lines.append(f'{day} 12:00:00,支出,{index + 1}.{self.calls:02d},商户{index},第 {self.calls} 次导入')
+        upload = io.BytesIO('\n'.join(lines).encode('utf-8'))
+        upload.name = 'statement.csv'
+        return self.client.post('/api/bills/import/', {'file': upload}, format='multipart')
+
+    def test_import_statement(self):
+        # 整个文件在一个事务里导入，比单批写入多一对 SAVEPOINT / RELEASE
+        self.assertQueryBudget(self.upload, 11, 1000, status_code=201)
+
+    def test_bulk_create(self):
+        rows = [dict(row, date=row['date'].isoformat(), amount=str(row['amount'])) for row in bill_rows(20)]
+        self.assertQueryBudget(
+            lambda: self.client.post('/api/bills/bulk/', rows, format='json'),
+            6, 20 * BILL_JSON_BYTES + 100, status_code=201,
+        )
+
+    def test_bulk_update(self):
+        def request():
+            rows = [
+                {'id': pk, 'date': timezone.localdate().isoformat(), 'type': 'expense',
+                 'category': 'food', 'amount': '18.00', 'remark': '批量修改'}
+                for pk in self.bill_ids
+            ]
+            return self.client.put('/api/bills/bulk/', rows, format='json')
+
+        self.assertQueryBudget(request, 10, 5 * BILL_JSON_BYTES + 100)
+
+    def test_bulk_partial_update(self):
+        self.assertQueryBudget(
+            lambda: self.client.patch(
+                '/api/bills/bulk/', [{'id': pk, 'amount': '9.90'} for pk in self.bill_ids], format='json'
+            ),
+            13, 5 * BILL_JSON_BYTES + 100,
+        )
+
+    def test_bulk_delete(self):
+        self.assertQueryBudget(
+            lambda: self.client.delete('/api/bills/bulk/', {'ids': self.bill_ids}, format='json'), 10, 200
+        )
+
+    # /api/deepseek/、/api/analyze/、/api/jobs/
+
+    def test_deepseek_local_parser(self):
+        self.assertQueryBudget(
+            lambda: self.client.post('/api/deepseek/?async=0', {'input': '午饭 25，打车 30'}, format='json'), 6, 3000
+        )
+
+    def llm_bills(self, *args, **kwargs):
+        """DeepSeek 解析结果，每次调用返回较早的不同日期，两次请求都需要新建汇总行。"""
+        self.calls += 1
+        day = timezone.localdate() - timedelta(days=365 + self.calls)
+        return llm_response(f"{day}|收入|8000|工资|工资\n{day}|支出|80|娱乐|和朋友看电影")
+
+    def test_deepseek_llm(self):
+        with mock.patch.object(llm.AsyncDeepSeekClient, 'complete', side_effect=self.llm_bills):
+            self.assertQueryBudget(
+                lambda: self.client.post('/api/deepseek/?async=0', {'input': '3月5号发工资8000，6号看电影80'}, format='json'),
+                8, 3000,
+            )
+
+    def test_deepseek_background(self):
+        self.assertQueryBudget(
+            lambda: self.client.post('/api/deepseek/', {'input': '午饭 25'}, format='json'),
+            3, 200, status_code=202,
+        )
+
+    def test_analyze_first_turn(self):
+        def prepare():
+            AnalysisHistory.objects.filter(user=self.user).delete()
+
+        with mock.patch.object(llm.AsyncDeepSeekClient, 'complete', return_value=llm_response(LLM_ANSWER)):
+            self.assertQueryBudget(
+                lambda: self.client.post('/api/analyze/?async=0', {'text': '这个月吃饭花了多少？'}, format='json'),
+                18, 20000, prepare=prepare,
+            )
+
+    def test_analyze_follow_up(self):
+        # 每轮都读取账单汇总（缓存清空后重新生成需要 5 条 SQL），conversation_history 中包含汇总
+        with mock.patch.object(llm.AsyncDeepSeekClient, 'complete', return_value=llm_response(LLM_ANSWER)):
+            self.assertQueryBudget(
+                lambda: self.client.post('/api/analyze/?async=0', {'text': '和上个月比呢？'}, format='json'), 14, 20000
+            )
+
+    def test_analyze_background(self):
+        self.assertQueryBudget(
+            lambda: self.client.post('/api/analyze/', {'text': '和上个月比呢？', 'async': True}, format='json'),
+            3, 200, status_code=202,
+        )
+
+    @skipIf(llm.httpx is None, '流式分析需要 httpx')
+    def test_analyze_stream(self):
+        async def stream_chat(client, messages, temperature=0.3, timeout=None, **extra):
+            for part in ('本月餐饮', '支出最多', '。'):
+                yield part
+
+        async def request():
+            response = await AsyncClient().post(
+                '/api/analyze/stream/', {'text': '这个月吃饭花了多少？'}, content_type='application/json',
+                headers={'Authorization': f'Bearer {self.token}'},
+            )
+            # 异步视图的 SQL 通过 sync_to_async 在当前线程执行，读完响应才会保存回复
+            body = b''.join([chunk async for chunk in response.streaming_content])
+            response.streaming_content = [body]
+            return response
+
+        with mock.patch.object(llm.AsyncDeepSeekClient, 'stream_chat', stream_chat):
+            content = self.assertQueryBudget(async_to_sync(request), 14, 2000)
+        self.assertIn(b'event: done', content)
+
+    def test_analysis_history(self):
+        self.assertQueryBudget(lambda: self.client.get('/api/analyze/history/?page_size=50'), 3, 10000)
+
+    def test_job_list(self):
+        self.assertQueryBudget(lambda: self.client.get('/api/jobs/'), 2, 50 * 200)
+
+    def test_job_detail(self):
+        self.assertQueryBudget(lambda: self.client.get(f'/api/jobs/{self.job.id}/'), 3, 500)
+
+    # backend/urls.py
+
+    def test_admin_index(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=True, is_superuser=True)
+        admin = APIClient()
+        admin.force_login(self.user)
+        self.assertQueryBudget(lambda: admin.get('/admin/'), 3, 10000)
+
+    def test_token_obtain(self):
+        self.assertQueryBudget(
+            lambda: APIClient().post('/api/token/', {'username': 'alice', 'password': 'alice123'}, format='json'),
+            1, 1000,
+        )
+
+    def test_token_refresh(self):
+        refresh = str(RefreshToken.for_user(self.user))
+        self.assertQueryBudget(
+            lambda: APIClient().post('/api/token/refresh/', {'refresh': refresh}, format='json'), 1, 1000
+        )
+
+    def test_register(self):
+        def request():
+            self.calls += 1
+            return APIClient().post(
+                '/api/register/', {'username': f'new{self.calls}', 'password': 'secret123'}, format='json'
+            )
+
+        self.assertQueryBudget(request, 2, 500, status_code=201)
+
+    def test_metrics(self):
+        if llm.metrics.prometheus_client is None:
+            self.assertQueryBudget(lambda: APIClient().get('/metrics'), 0, 200, status_code=501)
+        else:
+            self.assertQueryBudget(lambda: APIClient().get('/metrics'), 0, 200000)
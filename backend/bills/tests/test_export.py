@@ -0,0 +1,67 @@
+"""账单 CSV 导出（bills/export.py）。"""
+import csv
+import io
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from .. import export as bill_export
+from ..models import Bill
+from . import BillTestCase
+
+
+class BillExportTests(BillTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.today = timezone.localdate()
+        Bill.objects.bulk_create([
+            Bill(
+                user=cls.user, date=cls.today - timedelta(days=index % 4), type='expense', category='food',
+                amount=Decimal(index + 1), remark=f'午饭{index}',
+            )
+            for index in range(10)
+        ])
+        Bill.objects.create(user=cls.user, date=cls.today, type='income', category='salary',
+                            amount=Decimal('5000'), remark='=HYPERLINK("http://example.com")')
+        Bill.objects.create(user=cls.other, date=cls.today, type='expense', category='food', amount=Decimal(1))
+        cls.expected = list(
+            Bill.objects.filter(user=cls.user).order_by('-date', '-created_at', '-id').values_list('remark', flat=True)
+        )
+
+    def export(self, query=''):
+        response = self.client.get(f'/api/bills/export/{query}')
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        return response, list(csv.reader(io.StringIO(content)))
+
+    def test_header_and_rows(self):
+        response, rows = self.export()
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('attachment; filename="bills-', response['Content-Disposition'])
+        self.assertEqual(rows[0], ['\ufeff' + bill_export.EXPORT_COLUMNS[0]] + bill_export.EXPORT_COLUMNS[1:])
+        self.assertEqual(len(rows), len(self.expected) + 1)
+        salary = next(row for row in rows[1:] if row[1] == '收入')
+        self.assertEqual(salary[:4], [self.today.isoformat(), '收入', '工资', '5000.00'])
+
+    def test_rows_follow_list_order(self):
+        _, rows = self.export()
+        remarks = [row[4].lstrip("'") for row in rows[1:]]
+        self.assertEqual(remarks, self.expected)
+
+    def test_formula_cells_are_escaped(self):
+        _, rows = self.export('?type=income')
+        self.assertEqual([row[4] for row in rows[1:]], ['\'=HYPERLINK("http://example.com")'])
+
+    def test_uses_list_filters(self):
+        _, rows = self.export(f'?date_after={self.today.isoformat()}&category=food')
+        self.assertEqual({row[0] for row in rows[1:]}, {self.today.isoformat()})
+        self.assertEqual(len(rows) - 1, Bill.objects.filter(user=self.user, date=self.today, category='food').count())
+
+    def test_chunks_do_not_skip_or_repeat_rows(self):
+        queryset = Bill.objects.filter(user=self.user)
+        chunks = list(bill_export.iter_chunks(queryset, chunk_size=3))
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 3, 2])
+        self.assertEqual([row[-1] for chunk in chunks for row in chunk], self.expected)
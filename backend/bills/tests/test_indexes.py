@@ -0,0 +1,28 @@
+"""账单表索引和 explain_bill_queries 命令。"""
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from ..management.commands.explain_bill_queries import is_full_scan
+
+
+class ExplainBillQueriesTests(TestCase):
+
+    def test_canonical_queries_use_indexes(self):
+        out = StringIO()
+        call_command('explain_bill_queries', stdout=out)
+        self.assertNotIn('[全表扫描]', out.getvalue())
+
+    def test_is_full_scan(self):
+        self.assertTrue(is_full_scan('mysql', '{"table": {"table_name": "bills_bill", "access_type": "ALL"}}'))
+        self.assertFalse(is_full_scan('mysql', '{"table": {"table_name": "bills_bill", "access_type": "ref"}}'))
+        self.assertTrue(is_full_scan('postgresql', 'Seq Scan on bills_bill  (cost=0.00..1.01 rows=1 width=8)'))
+        self.assertFalse(is_full_scan('postgresql', 'Index Scan using bill_user_date_idx on bills_bill'))
+        self.assertTrue(is_full_scan('sqlite', '2 0 0 SCAN bills_bill'))
+        self.assertFalse(is_full_scan('sqlite', '3 0 0 SEARCH bills_bill USING INDEX bill_user_date_idx (user_id=?)'))
+
+    def test_unknown_vendor(self):
+        with self.assertRaises(CommandError):
+            is_full_scan('oracle', '')
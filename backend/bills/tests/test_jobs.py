@@ -0,0 +1,152 @@
+"""后台任务队列（bills/jobs.py）和任务相关接口。"""
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import override_settings
+from django.utils import timezone
+
+from .. import jobs
+from ..models import Bill, Job
+from . import BillTestCase
+
+
+def limits(**config):
+    return override_settings(BILL_JOBS={**jobs.DEFAULTS, **config})
+
+
+class JobQueueTests(BillTestCase):
+
+    def enqueue(self, user, text='午饭 25'):
+        return jobs.enqueue(user, 'parse_bills', {'input': text})
+
+    def test_enqueue_limit_per_user(self):
+        with limits(MAX_ACTIVE_PER_USER=2):
+            self.enqueue(self.user)
+            self.enqueue(self.user)
+            with self.assertRaises(jobs.JobLimitExceeded):
+                self.enqueue(self.user)
+            self.enqueue(self.other)
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue(self.user, 'mine_bitcoin', {})
+
+    def test_claim_in_order_and_queue_position(self):
+        first, second = self.enqueue(self.user), self.enqueue(self.other)
+        self.assertEqual((jobs.queue_position(first), jobs.queue_position(second)), (0, 1))
+        claimed = jobs.claim_next('w1')
+        self.assertEqual(claimed.id, first.id)
+        self.assertEqual((claimed.status, claimed.worker, claimed.attempts), ('running', 'w1', 1))
+        self.assertIsNone(jobs.queue_position(claimed))
+        self.assertEqual(jobs.claim_next('w2').id, second.id)
+        self.assertIsNone(jobs.claim_next('w3'))
+
+    def test_per_user_running_limit(self):
+        with limits(MAX_RUNNING_PER_USER=1):
+            alice_first, alice_second = self.enqueue(self.user), self.enqueue(self.user)
+            bob_job = self.enqueue(self.other)
+            self.assertEqual(jobs.claim_next('w1').id, alice_first.id)
+            # alice 已经有任务在执行，跳过她的第二个任务
+            self.assertEqual(jobs.claim_next('w2').id, bob_job.id)
+            self.assertIsNone(jobs.claim_next('w3'))
+            Job.objects.filter(pk=alice_first.pk).update(status='succeeded')
+            self.assertEqual(jobs.claim_next('w3').id, alice_second.id)
+
+    def test_global_running_limit(self):
+        with limits(MAX_RUNNING=1):
+            self.enqueue(self.user)
+            self.enqueue(self.other)
+            self.assertIsNotNone(jobs.claim_next('w1'))
+            self.assertIsNone(jobs.claim_next('w2'))
+
+    def test_run_job_success(self):
+        self.enqueue(self.user, '午饭 25')
+        job = jobs.run_job(jobs.claim_next('w1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.status_code), ('succeeded', 200))
+        self.assertEqual(job.result['status'], 'success')
+        self.assertEqual(Bill.objects.get(user=self.user).remark, '午饭')
+
+    def test_run_job_error_response_marks_failed(self):
+        caches['llm'].clear()
+        self.enqueue(self.user, '给妈妈转账 500')
+        with mock.patch('bills.ingest.get_client') as get_client:
+            get_client.return_value.chat.return_value = '无法解析'
+            job = jobs.run_job(jobs.claim_next('w1'))
+        self.assertEqual((job.status, job.status_code), ('failed', 400))
+
+    def test_run_job_exception_marks_failed(self):
+        self.enqueue(self.user)
+        with mock.patch.dict(jobs.HANDLERS, {'parse_bills': mock.Mock(side_effect=RuntimeError('boom'))}), \
+                self.assertLogs('bills.jobs', 'ERROR'):
+            job = jobs.run_job(jobs.claim_next('w1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('failed', 'boom'))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_maintain_requeues_stale_jobs(self):
+        with limits(MAX_ATTEMPTS=2, STALE_SECONDS=60, KEEP_DAYS=7):
+            now = timezone.now()
+            stale = self.enqueue(self.user)
+            exhausted = self.enqueue(self.other)
+            fresh = self.enqueue(self.other, '晚饭 30')
+            old = self.enqueue(self.user, '早餐 8')
+            Job.objects.filter(pk=stale.pk).update(status='running', attempts=1, started_at=now - timedelta(minutes=5))
+            Job.objects.filter(pk=exhausted.pk).update(status='running', attempts=2, started_at=now - timedelta(minutes=5))
+            Job.objects.filter(pk=fresh.pk).update(status='running', attempts=1, started_at=now)
+            Job.objects.filter(pk=old.pk).update(status='succeeded', finished_at=now - timedelta(days=8))
+            jobs.maintain()
+
+        self.assertEqual(
+            dict(Job.objects.values_list('id', 'status')),
+            {stale.id: 'pending', exhausted.id: 'failed', fresh.id: 'running'},
+        )
+        # 重新排队的任务再次被领取时计入执行次数
+        self.assertEqual(jobs.claim_next('w1').attempts, 2)
+
+    def test_run_worker_once(self):
+        self.enqueue(self.user, '午饭 25')
+        self.enqueue(self.other, '晚饭 30')
+        jobs.run_worker('w1', once=True)
+        self.assertEqual(list(Job.objects.values_list('status', flat=True)), ['succeeded', 'succeeded'])
+
+
+class JobEndpointTests(BillTestCase):
+
+    def test_queued_by_default(self):
+        response = self.client.post('/api/deepseek/', {'input': '午饭 25'}, format='json')
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get()
+        self.assertEqual(response.json(), {'job_id': job.id, 'status': 'pending', 'status_url': f'/api/jobs/{job.id}/'})
+        self.assertFalse(Bill.objects.exists())
+
+        self.assertEqual(self.client.get(f'/api/jobs/{job.id}/').json()['queue_position'], 0)
+        jobs.run_worker('w1', once=True)
+        data = self.client.get(f'/api/jobs/{job.id}/').json()
+        self.assertEqual((data['status'], data['status_code']), ('succeeded', 200))
+        self.assertEqual(data['result']['created_bills'][0]['remark'], '午饭')
+
+    def test_async_0_answers_inline(self):
+        response = self.client.post('/api/deepseek/?async=0', {'input': '午饭 25'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'success')
+        self.assertFalse(Job.objects.exists())
+
+    @limits(BACKGROUND_BY_DEFAULT=False)
+    def test_inline_by_setting(self):
+        self.assertEqual(self.client.post('/api/deepseek/', {'input': '午饭 25'}, format='json').status_code, 200)
+        response = self.client.post('/api/analyze/', {'text': '花了多少？', 'async': True}, format='json')
+        self.assertEqual(response.status_code, 202)
+
+    @limits(MAX_ACTIVE_PER_USER=1)
+    def test_queue_full(self):
+        self.client.post('/api/deepseek/', {'input': '午饭 25'}, format='json')
+        response = self.client.post('/api/analyze/', {'text': '花了多少？'}, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('error', response.json())
+
+    def test_other_users_jobs_hidden(self):
+        job = jobs.enqueue(self.other, 'analyze', {'text': '花了多少？'})
+        self.assertEqual(self.client.get(f'/api/jobs/{job.id}/').status_code, 404)
+        self.assertEqual(self.client.get('/api/jobs/').json(), [])
@@ -0,0 +1,132 @@
+"""DeepSeek 客户端（bills/llm.py）。"""
+import asyncio
+import threading
+from unittest import mock, skipIf
+
+import requests
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings
+
+from .. import llm
+
+httpx = llm.httpx
+
+CONFIG = {**llm.DEFAULTS, 'API_KEY': 'test-key', 'API_URL': 'https://deepseek.test/v1/chat/completions',
+          'BACKOFF_FACTOR': 0}
+
+
+def completion(content):
+    return {'choices': [{'message': {'content': content}}], 'usage': {'prompt_tokens': 1, 'completion_tokens': 1}}
+
+
+class ConfigTests(SimpleTestCase):
+
+    def test_missing_api_key(self):
+        with self.assertRaisesMessage(llm.ImproperlyConfiguredLLM, 'DEEPSEEK_API_KEY'):
+            llm.DeepSeekClient({**CONFIG, 'API_KEY': ''})
+
+    @override_settings(DEEPSEEK={'API_KEY': ''})
+    def test_shared_client_needs_api_key(self):
+        with self.assertRaises(llm.ImproperlyConfiguredLLM):
+            llm.get_client()
+
+    def test_extract_content(self):
+        self.assertEqual(llm.extract_content(completion('你好')), '你好')
+        self.assertIsNone(llm.extract_content({'choices': []}))
+
+
+class DeepSeekClientTests(SimpleTestCase):
+
+    def test_session_per_thread_shares_pool(self):
+        client = llm.DeepSeekClient(CONFIG)
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(client.session))
+        thread.start()
+        thread.join()
+        self.assertIs(client.session, client.session)
+        self.assertIsNot(client.session, sessions[0])
+        self.assertIs(sessions[0].get_adapter(CONFIG['API_URL']), client.adapter)
+        self.assertEqual(client.session.headers['Authorization'], 'Bearer test-key')
+
+    def test_chat(self):
+        client = llm.DeepSeekClient(CONFIG)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"choices": [{"message": {"content": "ok"}}]}'
+        with mock.patch.object(client.adapter, 'send', return_value=response) as send:
+            self.assertEqual(client.chat([{'role': 'user', 'content': 'hi'}], timeout=3), 'ok')
+        self.assertEqual(send.call_args.kwargs['timeout'], (CONFIG['CONNECT_TIMEOUT'], 3))
+
+    def test_errors(self):
+        client = llm.DeepSeekClient(CONFIG)
+        with mock.patch.object(client.adapter, 'send', side_effect=requests.exceptions.ReadTimeout('slow')):
+            with self.assertRaises(llm.LLMTimeoutError):
+                client.chat([])
+        with mock.patch.object(client.adapter, 'send', side_effect=requests.exceptions.ConnectionError('down')):
+            with self.assertRaises(llm.LLMError):
+                client.chat([])
+
+
+@skipIf(httpx is None, '异步客户端需要 httpx')
+class AsyncDeepSeekClientTests(SimpleTestCase):
+
+    def client_with(self, handler):
+        client = llm.AsyncDeepSeekClient(CONFIG)
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return client
+
+    def test_retries_then_succeeds(self):
+        responses = [httpx.Response(503), httpx.Response(429, headers={'Retry-After': '0'}),
+                     httpx.Response(200, json=completion('ok'))]
+        client = self.client_with(lambda request: responses.pop(0))
+        self.assertEqual(async_to_sync(client.chat)([]), 'ok')
+        self.assertEqual(responses, [])
+
+    def test_gives_up_after_max_retries(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(502)
+
+        client = self.client_with(handler)
+        with self.assertRaises(llm.LLMError):
+            async_to_sync(client.chat)([])
+        self.assertEqual(len(calls), CONFIG['MAX_RETRIES'] + 1)
+
+    def test_timeout(self):
+        def handler(request):
+            raise httpx.ReadTimeout('slow', request=request)
+
+        with self.assertRaises(llm.LLMTimeoutError):
+            async_to_sync(self.client_with(handler).chat)([])
+
+    def test_stream_chat(self):
+        body = (
+            'data: {"choices": [{"delta": {"content": "你"}}]}\n\n'
+            'data: {"choices": [{"delta": {"content": "好"}}]}\n\n'
+            'data: {"choices": [], "usage": {"prompt_tokens": 3, "completion_tokens": 2}}\n\n'
+            'data: [DONE]\n\n'
+        )
+        client = self.client_with(lambda request: httpx.Response(200, text=body))
+
+        async def collect():
+            return [chunk async for chunk in client.stream_chat([])]
+
+        self.assertEqual(async_to_sync(collect)(), ['你', '好'])
+
+    def test_shared_client_closed_with_event_loop(self):
+        async def use_client(pause):
+            client = llm.get_async_client()
+            self.assertIs(llm.get_async_client(), client)
+            if pause:
+                await asyncio.sleep(0)
+            self.assertFalse(client.client.is_closed)
+            return client
+
+        # WSGI 下每次 async_to_sync 都是新的事件循环，结束时关闭该循环的客户端
+        first = async_to_sync(use_client)(True)
+        second = async_to_sync(use_client)(False)
+        self.assertIsNot(first, second)
+        self.assertTrue(first.client.is_closed)
+        self.assertTrue(second.client.is_closed)
@@ -0,0 +1,58 @@
+"""请求指标中间件（bills/middleware.py）的 SQL 统计。"""
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.test import AsyncClient, override_settings
+
+from .. import metrics
+from ..bulk import insert_bills
+from ..middleware import collect_queries
+from . import BillTestCase
+
+
+class RequestMetricsTests(BillTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        insert_bills(cls.user, [
+            {'date': date(2026, 10, 1), 'type': 'expense', 'category': 'food', 'amount': Decimal('12.00')}
+        ])
+
+    def observed(self, observe):
+        """返回唯一一次 observe_request 调用的 (view, status, SQL 条数)。"""
+        observe.assert_called_once()
+        view, _, status, _, query_count, query_seconds = observe.call_args.args
+        self.assertIsNotNone(query_seconds)
+        return view, status, query_count
+
+    def test_collector_installed_on_connection(self):
+        connection.ensure_connection()
+        self.assertIn(collect_queries, connection.execute_wrappers)
+
+    def test_sync_request_counts_queries(self):
+        with mock.patch.object(metrics, 'observe_request') as observe:
+            self.assertEqual(self.client.get('/api/bills/stats/').status_code, 200)
+        view, status, query_count = self.observed(observe)
+        self.assertEqual((view, status), ('bill-stats', 200))
+        self.assertGreaterEqual(query_count, 2)
+
+    async def test_async_request_counts_queries(self):
+        # AsyncClient 走 ASGI 处理流程，中间件以 __acall__ 执行，ORM 调用在 sync_to_async 线程里
+        client = AsyncClient()
+        with mock.patch.object(metrics, 'observe_request') as observe:
+            response = await client.get('/api/bills/', headers={'Authorization': self.authorization})
+        self.assertEqual(response.status_code, 200)
+        view, status, query_count = self.observed(observe)
+        self.assertEqual((view, status), ('bill-list', 200))
+        # 读取用户和账单列表
+        self.assertGreaterEqual(query_count, 2)
+
+    @override_settings(METRICS={'SLOW_REQUEST_SECONDS': 0})
+    async def test_async_slow_request_logs_queries(self):
+        client = AsyncClient()
+        with self.assertLogs('bills.middleware', 'WARNING') as logs:
+            await client.get('/api/bills/', headers={'Authorization': self.authorization})
+        self.assertIn('bills_bill', logs.output[0])
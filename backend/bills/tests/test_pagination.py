@@ -0,0 +1,94 @@
+"""账单列表游标分页（bills/pagination.py）的顺序和游标。"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from ..models import Bill
+from . import BillTestCase
+
+
+class BillCursorPaginationTests(BillTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        today = timezone.localdate()
+        created_at = timezone.now()
+        bills = []
+        # 每天 5 笔，其中 3 笔 created_at 相同，只能靠 id 区分先后
+        for day in range(5):
+            for index in range(5):
+                bills.append(Bill(
+                    user=cls.user, date=today - timedelta(days=day), type='expense', category='food',
+                    amount=Decimal(index + 1), remark=f'{day}-{index}',
+                ))
+        Bill.objects.bulk_create(bills)
+        Bill.objects.bulk_create([
+            Bill(user=cls.other, date=today, type='expense', category='food', amount=Decimal(1)) for _ in range(5)
+        ])
+        for bill_ids in cls._ids_by_day(cls.user):
+            Bill.objects.filter(pk__in=bill_ids[:3]).update(created_at=created_at)
+            for offset, pk in enumerate(bill_ids[3:], 1):
+                Bill.objects.filter(pk=pk).update(created_at=created_at - timedelta(minutes=offset))
+        cls.expected = list(
+            Bill.objects.filter(user=cls.user).order_by('-date', '-created_at', '-id').values_list('id', flat=True)
+        )
+
+    @staticmethod
+    def _ids_by_day(user):
+        days = {}
+        for pk, date in Bill.objects.filter(user=user).order_by('id').values_list('id', 'date'):
+            days.setdefault(date, []).append(pk)
+        return list(days.values())
+
+    def walk(self, url, link):
+        """从 url 开始沿 link（'next' 或 'previous'）翻页，返回每页的 id 列表。"""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            pages.append([bill['id'] for bill in data['results']])
+            url = data[link]
+        return pages
+
+    def test_pages_follow_keyset_order(self):
+        pages = self.walk('/api/bills/?page_size=4', 'next')
+        self.assertEqual([len(page) for page in pages], [4] * 6 + [1])
+        self.assertEqual([pk for page in pages for pk in page], self.expected)
+
+    def test_previous_links_return_same_pages(self):
+        forward = self.walk('/api/bills/?page_size=4', 'next')
+        last_page = self.client.get('/api/bills/?page_size=4')
+        for _ in range(len(forward) - 1):
+            last_page = self.client.get(last_page.json()['next'])
+        backward = self.walk(last_page.json()['previous'], 'previous')
+        self.assertEqual(backward, forward[-2::-1])
+
+    def test_first_page_has_no_previous(self):
+        data = self.client.get('/api/bills/?page_size=30').json()
+        self.assertIsNone(data['previous'])
+        self.assertIsNone(data['next'])
+        self.assertEqual([bill['id'] for bill in data['results']], self.expected)
+
+    def test_new_bill_does_not_shift_next_page(self):
+        first = self.client.get('/api/bills/?page_size=4').json()
+        Bill.objects.create(
+            user=self.user, date=timezone.localdate(), type='expense', category='food', amount=Decimal(9)
+        )
+        second = self.client.get(first['next']).json()
+        self.assertEqual([bill['id'] for bill in second['results']], self.expected[4:8])
+
+    def test_large_page_size(self):
+        response = self.client.get('/api/bills/?page_size=100000')
+        self.assertEqual(len(response.json()['results']), len(self.expected))
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/bills/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_without_page_params_returns_plain_list(self):
+        data = self.client.get('/api/bills/').json()
+        self.assertIsInstance(data, list)
+        self.assertEqual(len(data), len(self.expected))
@@ -0,0 +1,136 @@
+"""记账文本的解析（bills/parsing.py）和保存（bills/ingest.py）。"""
+from datetime import date
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from ..ingest import parse_and_create_bills, save_parsed_bills
+from ..models import Bill
+from ..parsing import classify, map_category, parse_bill_line, parse_bill_lines, parse_simple_entry
+from . import BillTestCase
+
+TODAY = date(2026, 10, 17)
+
+
+class ParseBillLineTests(SimpleTestCase):
+
+    def test_full_line(self):
+        self.assertEqual(parse_bill_line('2026-10-16|支出|¥1,299.50|购物|李宁运动鞋', TODAY), ({
+            'type': 'expense', 'amount': '1299.50', 'date': '2026-10-16', 'category': 'shopping', 'remark': '李宁运动鞋',
+        }, None))
+
+    def test_income_and_defaults(self):
+        data, reason = parse_bill_line(' |收入| 5000 |工资| ', TODAY)
+        self.assertIsNone(reason)
+        self.assertEqual(data, {'type': 'income', 'amount': '5000', 'date': '2026-10-17', 'category': 'salary', 'remark': None})
+
+    def test_invalid_date_falls_back_to_today(self):
+        data, _ = parse_bill_line('昨天|支出|12|吃饭|午饭', TODAY)
+        self.assertEqual(data['date'], '2026-10-17')
+
+    def test_unknown_category(self):
+        self.assertEqual(map_category('彩票', 'income'), 'other')
+        self.assertEqual(map_category('彩票', 'expense'), 'living')
+
+    def test_rejected_lines(self):
+        self.assertEqual(parse_bill_line('2026-10-16|支出|12|吃饭', TODAY), (None, '字段数应为 5，实际为 4'))
+        self.assertEqual(parse_bill_line('2026-10-16||12|吃饭|午饭', TODAY), (None, '缺少收支类型或金额'))
+        self.assertEqual(parse_bill_line('2026-10-16|支出||吃饭|午饭', TODAY), (None, '缺少收支类型或金额'))
+
+    def test_lines_keep_numbers_and_skip_blanks(self):
+        rows, diagnostics = parse_bill_lines('2026-10-16|支出|12|吃饭|午饭\n\n无法解析\n|收入|100|红包|', TODAY)
+        self.assertEqual([(line_no, data['category']) for line_no, _, data in rows], [(1, 'food'), (4, 'red_packet')])
+        self.assertEqual(diagnostics, [{'line': 3, 'text': '无法解析', 'status': 'skipped', 'reason': '字段数应为 5，实际为 1'}])
+
+
+class ParseSimpleEntryTests(SimpleTestCase):
+
+    def test_single_entry(self):
+        self.assertEqual(parse_simple_entry('午饭 25', TODAY), '2026-10-17|支出|25|吃饭|午饭')
+        self.assertEqual(parse_simple_entry('昨天打车花了40.5元', TODAY), '2026-10-16|支出|40.5|交通|打车')
+        self.assertEqual(parse_simple_entry('前天 工资 ￥8000', TODAY), '2026-10-15|收入|8000|工资|工资')
+
+    def test_multiple_segments(self):
+        self.assertEqual(
+            parse_simple_entry('早餐 8，地铁 4；收到红包 200', TODAY),
+            '2026-10-17|支出|8|吃饭|早餐\n2026-10-17|支出|4|交通|地铁\n2026-10-17|收入|200|红包|红包',
+        )
+
+    def test_keeps_original_case(self):
+        # 关键词匹配不区分大小写，备注保留原文
+        self.assertEqual(parse_simple_entry('KTV 100', TODAY), '2026-10-17|支出|100|娱乐|KTV')
+        self.assertEqual(parse_simple_entry('Ktv唱歌 100RMB', TODAY), '2026-10-17|支出|100|娱乐|Ktv唱歌')
+        self.assertEqual(classify('KTV', 'expense'), 'entertainment')
+
+    def test_longest_keyword_wins(self):
+        self.assertEqual(parse_simple_entry('红包 50', TODAY), '2026-10-17|收入|50|红包|红包')
+        self.assertEqual(parse_simple_entry('外卖 30', TODAY), '2026-10-17|支出|30|吃饭|外卖')
+
+    def test_amount_sign_not_in_remark(self):
+        self.assertEqual(parse_simple_entry('零食 -20', TODAY), '2026-10-17|支出|20|吃饭|零食')
+        self.assertEqual(parse_simple_entry('打车 -¥35', TODAY), '2026-10-17|支出|35|交通|打车')
+
+    def test_leaves_hard_cases_to_deepseek(self):
+        for text in [
+            '', '25', '午饭',                   # 缺少备注或金额
+            '午饭 25 晚饭 30',                  # 一段里有两个金额
+            '3月5日 午饭 25', '买了 2 斤苹果 10',  # 数字是日期或数量
+            '给妈妈转账 500', '发红包 100',       # 收支方向不确定
+            '今天昨天 午饭 25',                 # 日期冲突
+            '彩票 10',                          # 没有匹配的分类
+            '包子 5', '买包 300',               # 只匹配到单个字（包、买）
+        ]:
+            with self.subTest(text=text):
+                self.assertIsNone(parse_simple_entry(text, TODAY))
+
+    def test_one_unparsable_segment_rejects_all(self):
+        self.assertIsNone(parse_simple_entry('午饭 25，彩票 10', TODAY))
+
+
+class SaveParsedBillsTests(BillTestCase):
+
+    def test_valid_lines_saved_in_one_batch(self):
+        result = '2026-10-16|支出|12|吃饭|午饭\n坏行\n2026-10-16|支出|abc|吃饭|晚饭\n|收入|100|红包|'
+        data, status_code = save_parsed_bills(self.user, result, TODAY, 'llm', False)
+        self.assertEqual(status_code, 200)
+        self.assertEqual([item['status'] for item in data['diagnostics']], ['created', 'skipped', 'invalid', 'created'])
+        self.assertEqual([bill['remark'] for bill in data['created_bills']], ['午饭', None])
+        self.assertEqual(Bill.objects.filter(user=self.user).count(), 2)
+        self.assertEqual((data['source'], data['cached']), ('llm', False))
+
+    def test_nothing_valid(self):
+        data, status_code = save_parsed_bills(self.user, '坏行\n2026-10-16|支出|abc|吃饭|晚饭', TODAY, 'llm', False)
+        self.assertEqual(status_code, 400)
+        self.assertEqual(data['status'], 'error')
+        self.assertFalse(Bill.objects.exists())
+
+    def test_missing_result(self):
+        _, status_code = save_parsed_bills(self.user, None, TODAY, 'llm', False)
+        self.assertEqual(status_code, 500)
+
+
+class ParseAndCreateBillsTests(BillTestCase):
+
+    def setUp(self):
+        super().setUp()
+        caches['llm'].clear()
+
+    @mock.patch('bills.ingest.get_client')
+    @mock.patch('bills.ingest.build_prompt')
+    def test_local_parser_skips_deepseek(self, build_prompt, get_client):
+        data, status_code = parse_and_create_bills(self.user, 'KTV 100')
+        self.assertEqual(status_code, 200)
+        self.assertEqual(data['source'], 'local')
+        self.assertEqual(Bill.objects.get(user=self.user).remark, 'KTV')
+        build_prompt.assert_not_called()
+        get_client.assert_not_called()
+
+    @mock.patch('bills.ingest.get_client')
+    def test_falls_back_to_deepseek(self, get_client):
+        get_client.return_value.chat.return_value = '2026-10-17|支出|500|生活|给妈妈转账'
+        data, status_code = parse_and_create_bills(self.user, '给妈妈转账 500')
+        self.assertEqual(status_code, 200)
+        self.assertEqual(data['source'], 'llm')
+        prompt = get_client.return_value.chat.call_args.args[0][0]['content']
+        self.assertIn('给妈妈转账 500', prompt)
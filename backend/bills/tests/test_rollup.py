@@ -0,0 +1,188 @@
+"""DailyBillRollup 的增量维护（bills/rollup.py、bills/signals.py、bills/bulk.py）。"""
+import importlib
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.apps import apps
+from django.db.models import Count, QuerySet, Sum
+
+from .. import rollup
+from ..bulk import bulk_delete_bills, bulk_update_bills, insert_bills
+from ..models import Bill, DailyBillRollup
+from . import BillTestCase
+
+DAY = date(2026, 10, 1)
+
+
+def bill_data(amount, category='food', day=DAY, bill_type='expense'):
+    return {'date': day, 'type': bill_type, 'category': category, 'amount': Decimal(amount), 'remark': None}
+
+
+class RollupTests(BillTestCase):
+
+    def rollups(self):
+        return {
+            (row.date, row.type, row.category): (row.amount, row.bill_count)
+            for row in DailyBillRollup.objects.filter(user=self.user)
+        }
+
+    def assertRollupsMatchBills(self):
+        """汇总表必须与按 Bill 表重新计算的结果一致，不留下笔数为 0 的行。"""
+        expected = {
+            (row['date'], row['type'], row['category']): (row['total'], row['count'])
+            for row in Bill.objects.filter(user=self.user).order_by()
+            .values('date', 'type', 'category').annotate(total=Sum('amount'), count=Count('id'))
+        }
+        self.assertEqual(self.rollups(), expected)
+
+    def create(self, amount, **fields):
+        return Bill.objects.create(user=self.user, **bill_data(amount, **fields))
+
+    def test_create(self):
+        self.create('10')
+        self.create('5.5')
+        self.create('100', bill_type='income', category='salary')
+        self.assertEqual(self.rollups(), {
+            (DAY, 'expense', 'food'): (Decimal('15.50'), 2),
+            (DAY, 'income', 'salary'): (Decimal('100.00'), 1),
+        })
+
+    def test_update_moves_amount_between_rows(self):
+        bill = self.create('10')
+        self.create('3')
+        bill.amount = Decimal('12')
+        bill.save()
+        self.assertEqual(self.rollups()[(DAY, 'expense', 'food')], (Decimal('15.00'), 2))
+
+        bill.category = 'shopping'
+        bill.date = DAY + timedelta(days=1)
+        bill.save()
+        self.assertEqual(self.rollups(), {
+            (DAY, 'expense', 'food'): (Decimal('3.00'), 1),
+            (DAY + timedelta(days=1), 'expense', 'shopping'): (Decimal('12.00'), 1),
+        })
+
+    def test_update_deferred_instance(self):
+        self.create('10')
+        # user_id 等汇总字段没有加载时，保存前从数据库读取原来的值
+        bill = Bill.objects.only('id', 'remark').get(user=self.user)
+        bill.amount = Decimal('20')
+        bill.save()
+        self.assertRollupsMatchBills()
+
+        bill = Bill.objects.only('id', 'date', 'type', 'category', 'amount').get(user=self.user)
+        bill.amount = Decimal('30')
+        bill.save()
+        self.assertRollupsMatchBills()
+
+    def test_stale_instances_use_stored_values(self):
+        # 两个请求先后读出同一条账单再各自保存：扣除的旧值以数据库为准，不是读出时的快照
+        bill = self.create('10')
+        # 同一汇总行里还有别的账单，扣错的金额不会因为整行删除而被掩盖
+        self.create('3')
+        first, second = Bill.objects.get(pk=bill.pk), Bill.objects.get(pk=bill.pk)
+        first.amount = Decimal('20')
+        first.save()
+        second.amount = Decimal('30')
+        second.save()
+        self.assertRollupsMatchBills()
+
+        stale = Bill.objects.get(pk=bill.pk)
+        self.assertEqual(bulk_update_bills(self.user, [{'id': bill.pk, 'amount': '40'}], partial=True)[1], [])
+        self.assertRollupsMatchBills()
+        stale.delete()
+        self.assertEqual(self.rollups(), {(DAY, 'expense', 'food'): (Decimal('3.00'), 1)})
+
+    def test_bulk_update_after_concurrent_edit(self):
+        bill = self.create('10')
+        self.create('3')
+        in_bulk = QuerySet.in_bulk
+
+        def read_then_edited_elsewhere(queryset, *args, **kwargs):
+            bills = in_bulk(queryset, *args, **kwargs)
+            # 读出之后、写入之前，另一个请求把金额改成了 25
+            edited = Bill.objects.get(pk=bill.pk)
+            edited.amount = Decimal('25')
+            edited.save()
+            return bills
+
+        with mock.patch.object(QuerySet, 'in_bulk', read_then_edited_elsewhere):
+            _, errors = bulk_update_bills(self.user, [{'id': bill.pk, 'category': 'shopping'}], partial=True)
+        self.assertEqual(errors, [])
+        self.assertRollupsMatchBills()
+
+    def test_delete_removes_empty_rows(self):
+        bill = self.create('10')
+        kept = self.create('10', category='shopping')
+        bill.delete()
+        self.assertEqual(self.rollups(), {(DAY, 'expense', 'shopping'): (Decimal('10.00'), 1)})
+        kept.delete()
+        self.assertEqual(self.rollups(), {})
+
+    def test_bulk_insert_update_delete(self):
+        self.create('1')
+        bills = insert_bills(self.user, [
+            bill_data(str(index + 1), category=('food', 'shopping', 'living')[index % 3],
+                      day=DAY + timedelta(days=index % 4))
+            for index in range(24)
+        ])
+        self.assertRollupsMatchBills()
+
+        ids = list(Bill.objects.filter(user=self.user).order_by('id').values_list('id', flat=True))
+        updated, errors = bulk_update_bills(
+            self.user, [{'id': pk, 'amount': '7.25', 'category': 'medical'} for pk in ids[::2]], partial=True
+        )
+        self.assertEqual(errors, [])
+        self.assertRollupsMatchBills()
+
+        deleted, missing = bulk_delete_bills(self.user, ids[:10] + [ids[-1] + 1000])
+        self.assertEqual((deleted, missing), (10, [ids[-1] + 1000]))
+        self.assertRollupsMatchBills()
+        self.assertEqual(len(bills), 24)
+
+    def test_batched_writes_do_not_grow_with_keys(self):
+        states = [(self.user.id, DAY + timedelta(days=index), 'expense', 'food', Decimal('1')) for index in range(20)]
+        rollup.add_states(states[:2])
+        # 锁定已有行、一条 UPDATE、一条 INSERT（外加事务保存点）
+        with self.assertNumQueries(5):
+            rollup.add_states(states)
+        with self.assertNumQueries(3):
+            rollup.remove_states(states)
+        self.assertEqual(self.rollups(), {
+            (DAY + timedelta(days=index), 'expense', 'food'): (Decimal('1.00'), 1) for index in range(2)
+        })
+
+    def test_queryset_writes_inside_suspended(self):
+        self.create('10')
+        bills = list(Bill.objects.filter(user=self.user))
+        with rollup.suspended():
+            Bill.objects.filter(user=self.user).delete()
+        # 暂停期间的写入由调用方自己同步
+        self.assertNotEqual(self.rollups(), {})
+        rollup.remove_bills(bills)
+        self.assertEqual(self.rollups(), {})
+
+    def test_rebuild(self):
+        self.create('10')
+        self.create('20', category='shopping')
+        DailyBillRollup.objects.filter(user=self.user).update(amount=0, bill_count=99)
+        self.assertEqual(rollup.rebuild(self.user.id), 2)
+        self.assertRollupsMatchBills()
+
+    def test_backfill_migration(self):
+        # 0005 之前已有的账单没有汇总行，0011 按 Bill 表补齐
+        self.create('10')
+        self.create('20', category='shopping')
+        self.create('5', day=DAY - timedelta(days=1))
+        DailyBillRollup.objects.all().delete()
+        migration = importlib.import_module('bills.migrations.0011_backfill_dailybillrollup')
+        migration.backfill(apps, None)
+        self.assertRollupsMatchBills()
+        migration.clear(apps, None)
+        self.assertFalse(DailyBillRollup.objects.exists())
+
+    def test_deleting_user_cascades(self):
+        self.create('10')
+        self.user.delete()
+        self.assertFalse(DailyBillRollup.objects.exists())
@@ -0,0 +1,65 @@
+"""账单备注搜索（bills/search.py）。"""
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from .. import search
+from ..bulk import insert_bills
+from ..models import Bill
+from . import BillTestCase
+
+REMARKS = ['星巴克 拿铁', '瑞幸咖啡', '星巴克 美式咖啡', '午饭', None]
+
+
+class BillSearchTests(BillTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        insert_bills(cls.user, [
+            {'date': date(2026, 10, index + 1), 'type': 'expense', 'category': 'food',
+             'amount': Decimal(index + 10), 'remark': remark}
+            for index, remark in enumerate(REMARKS)
+        ])
+        insert_bills(cls.other, [
+            {'date': date(2026, 10, 1), 'type': 'expense', 'category': 'food', 'amount': Decimal(1), 'remark': '星巴克'}
+        ])
+
+    def remarks(self, query):
+        response = self.client.get('/api/bills/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return sorted(bill['remark'] for bill in response.json())
+
+    def test_like_fallback_matches_substrings(self):
+        self.assertEqual(self.remarks('咖啡'), ['星巴克 美式咖啡', '瑞幸咖啡'])
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.remarks('星巴克 咖啡'), ['星巴克 美式咖啡'])
+        self.assertEqual(self.remarks('星巴克 奶茶'), [])
+
+    def test_search_with_pagination_and_stats(self):
+        data = self.client.get('/api/bills/', {'search': '星巴克', 'page_size': 1}).json()
+        self.assertEqual(len(data['results']), 1)
+        self.assertEqual(self.client.get(data['next']).json()['results'][0]['remark'], '星巴克 拿铁')
+        totals = self.client.get('/api/bills/stats/', {'search': '星巴克'}).json()['totals']
+        self.assertEqual([(row['type'], row['count']) for row in totals], [('expense', 2)])
+
+    def test_search_bills_without_fulltext(self):
+        queryset = search.search_bills(Bill.objects.filter(user=self.user), ['拿铁'])
+        self.assertNotIn('MATCH', str(queryset.query))
+        self.assertEqual(list(queryset.values_list('remark', flat=True)), ['星巴克 拿铁'])
+
+    def test_fulltext_query(self):
+        with mock.patch.object(search, 'supports_fulltext', return_value=True):
+            queryset = search.search_bills(Bill.objects.filter(user=self.user), ['星巴克', '"+拿铁*', '茶'])
+        sql, params = queryset.query.sql_with_params()
+        self.assertIn('MATCH', sql)
+        # 运算符被去掉，每个词作为必须出现的短语；太短的词退回 LIKE
+        self.assertIn('+"星巴克" +"拿铁"', params)
+        self.assertIn('%茶%', params)
+        self.assertEqual(queryset.query.order_by[0], '-search_rank')
+
+    def test_fulltext_skipped_for_short_terms(self):
+        with mock.patch.object(search, 'supports_fulltext', return_value=True):
+            queryset = search.search_bills(Bill.objects.filter(user=self.user), ['茶'])
+        self.assertNotIn('MATCH', str(queryset.query))
@@ -0,0 +1,85 @@
+"""银行 / 支付宝 / 微信账单文件导入（bills/statements.py）。"""
+import io
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.test import override_settings
+
+from .. import statements
+from ..models import Bill, DailyBillRollup
+from . import BillTestCase
+
+WECHAT_HEADER = '交易时间,收/支,金额(元),交易对方,商品'
+
+
+def wechat_file(*rows, preamble=('微信支付账单明细', '导出时间：2026-10-17'), encoding='utf-8'):
+    upload = io.BytesIO('\n'.join([*preamble, WECHAT_HEADER, *rows]).encode(encoding))
+    upload.name = 'statement.csv'
+    return upload
+
+
+class StatementImportTests(BillTestCase):
+
+    def upload(self, upload, **data):
+        return self.client.post('/api/bills/import/', {'file': upload, **data}, format='multipart')
+
+    def test_imports_and_classifies_rows(self):
+        response = self.upload(wechat_file(
+            '2026-10-01 12:00:00,支出,¥25.50,麦当劳,午餐',
+            '2026-10-02 09:00:00,收入,¥8000.00,公司,工资',
+            '2026-10-03 10:00:00,/,¥100.00,零钱通,转入',
+        ))
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual((data['profile'], data['created'], data['skipped']), ('wechat', 2, 1))
+        self.assertEqual(data['diagnostics'][0]['line'], 6)
+        bills = list(Bill.objects.filter(user=self.user).order_by('date').values_list('date', 'type', 'amount'))
+        self.assertEqual(bills, [
+            (date(2026, 10, 1), 'expense', Decimal('25.50')),
+            (date(2026, 10, 2), 'income', Decimal('8000.00')),
+        ])
+        self.assertEqual(DailyBillRollup.objects.filter(user=self.user).count(), 2)
+
+    def test_reupload_is_deduplicated(self):
+        rows = ['2026-10-01 08:00:00,支出,¥15.00,咖啡店,拿铁'] * 2 + ['2026-10-01 12:00:00,支出,¥30.00,食堂,午餐']
+        self.assertEqual(self.upload(wechat_file(*rows)).json()['created'], 3)
+        # 同一天两杯相同的咖啡都保留；再次上传同一个文件和其中的一部分都不会重复导入
+        response = self.upload(wechat_file(*rows))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['created'], response.json()['duplicates']), (0, 3))
+        response = self.upload(wechat_file(*rows, '2026-10-01 08:00:00,支出,¥15.00,咖啡店,拿铁'))
+        self.assertEqual((response.json()['created'], response.json()['duplicates']), (1, 3))
+        self.assertEqual(Bill.objects.filter(user=self.user).count(), 4)
+
+    def test_gb18030_file(self):
+        response = self.upload(wechat_file('2026-10-01 12:00:00,支出,¥25.50,麦当劳,午餐', encoding='gb18030'))
+        self.assertEqual(response.json()['encoding'], 'gb18030')
+        self.assertEqual(Bill.objects.get(user=self.user).remark, '麦当劳 午餐')
+
+    def test_unknown_header(self):
+        response = self.upload(wechat_file('2026-10-01,25.50', preamble=()), profile='bank')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('表头', response.json()['error'])
+
+    @override_settings(BILL_STATEMENT_MAX_ROWS=5)
+    def test_error_mid_file_imports_nothing(self):
+        rows = [f'2026-10-{day:02d} 12:00:00,支出,¥{day}.00,食堂,午餐' for day in range(1, 8)]
+        with mock.patch.object(statements, 'BATCH_SIZE', 2):
+            response = self.upload(wechat_file(*rows))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('5', response.json()['error'])
+        self.assertFalse(Bill.objects.filter(user=self.user).exists())
+        self.assertFalse(DailyBillRollup.objects.filter(user=self.user).exists())
+
+    def test_decode_error_mid_file_imports_nothing(self):
+        # 错误的字节在文本流第一次读取的 8KB 之后，前面的行已经分批写入
+        rows = [f'2026-10-01 12:00:00,支出,¥{index}.00,食堂,午餐' for index in range(1, 301)]
+        upload = io.BytesIO(
+            '\n'.join([WECHAT_HEADER, *rows]).encode('utf-8') + b'\n2026-10-02 12:00:00,\xd6\xa7\xb3\xf6,1.00,x,y'
+        )
+        upload.name = 'statement.csv'
+        with mock.patch.object(statements, 'BATCH_SIZE', 10):
+            response = self.upload(upload, encoding='utf-8')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Bill.objects.filter(user=self.user).exists())
@@ -0,0 +1,94 @@
+"""统计接口（bills/stats.py 和 BillViewSet 的 stats 系列 action）。"""
+from datetime import date
+from decimal import Decimal
+
+from ..bulk import insert_bills
+from . import BillTestCase
+
+BILLS = [
+    (date(2026, 9, 1), 'expense', 'food', '12.00', '午饭'),
+    (date(2026, 9, 1), 'expense', 'food', '8.00', '早餐'),
+    (date(2026, 9, 15), 'expense', 'shopping', '199.00', '运动鞋'),
+    (date(2026, 9, 30), 'income', 'salary', '8000.00', '工资'),
+    (date(2026, 10, 2), 'expense', 'food', '15.00', '午饭'),
+    (date(2026, 10, 3), 'expense', 'transportation', '4.00', '地铁'),
+    (date(2026, 10, 3), 'expense', 'food', '20.00', '午饭'),
+]
+
+
+def stat(total, count):
+    return {'total': Decimal(total), 'count': count}
+
+
+class StatsTests(BillTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        insert_bills(cls.user, [
+            {'date': day, 'type': bill_type, 'category': category, 'amount': Decimal(amount), 'remark': remark}
+            for day, bill_type, category, amount, remark in BILLS
+        ])
+        insert_bills(cls.other, [
+            {'date': date(2026, 9, 1), 'type': 'expense', 'category': 'food', 'amount': Decimal('500'), 'remark': '午饭'}
+        ])
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def test_totals_and_categories(self):
+        data = self.get('/api/bills/stats/')
+        self.assertEqual(
+            [(row['type'], row['total'], row['count']) for row in data['totals']],
+            [('expense', Decimal('258.00'), 6), ('income', Decimal('8000.00'), 1)],
+        )
+        self.assertEqual(
+            [(row['type'], row['category'], row['total'], row['count']) for row in data['categories']],
+            [
+                ('expense', 'shopping', Decimal('199.00'), 1),
+                ('expense', 'food', Decimal('55.00'), 4),
+                ('expense', 'transportation', Decimal('4.00'), 1),
+                ('income', 'salary', Decimal('8000.00'), 1),
+            ],
+        )
+
+    def test_filters_apply_to_stats(self):
+        data = self.get('/api/bills/stats/?type=expense&category=food,transportation&date_after=2026-10-01')
+        self.assertEqual([(row['type'], row['total'], row['count']) for row in data['totals']],
+                         [('expense', Decimal('39.00'), 3)])
+
+    def test_search_reads_bill_table(self):
+        data = self.get('/api/bills/stats/?search=午饭')
+        self.assertEqual([(row['type'], row['total'], row['count']) for row in data['totals']],
+                         [('expense', Decimal('47.00'), 3)])
+
+    def test_monthly_series(self):
+        data = self.get('/api/bills/stats/series/?period=month&type=expense')
+        self.assertEqual(
+            [(str(row['period'])[:7], row['total'], row['count']) for row in data['series']],
+            [('2026-09', Decimal('219.00'), 3), ('2026-10', Decimal('39.00'), 3)],
+        )
+
+    def test_daily_series_by_category(self):
+        data = self.get('/api/bills/stats/series/?period=day&group_by=category&date_after=2026-10-03')
+        self.assertEqual(
+            [(str(row['period'])[:10], row['category'], row['total']) for row in data['series']],
+            [('2026-10-03', 'food', Decimal('20.00')), ('2026-10-03', 'transportation', Decimal('4.00'))],
+        )
+
+    def test_invalid_period(self):
+        response = self.client.get('/api/bills/stats/series/?period=year')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.data)
+
+    def test_top_remarks(self):
+        data = self.get('/api/bills/stats/remarks/?limit=2')
+        self.assertEqual(
+            [(row['remark'], row['total'], row['count']) for row in data['remarks']],
+            [('午饭', Decimal('47.00'), 3), ('工资', Decimal('8000.00'), 1)],
+        )
+
+    def test_invalid_limit(self):
+        self.assertEqual(self.client.get('/api/bills/stats/remarks/?limit=abc').status_code, 400)
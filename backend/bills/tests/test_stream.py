@@ -0,0 +1,80 @@
+"""智能分析的流式接口 /api/analyze/stream/（Server-Sent Events）。"""
+import json
+from unittest import mock, skipIf
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import AsyncClient
+
+from .. import llm
+from ..models import AnalysisMessage
+from . import BillTestCase
+
+
+def parse_events(body):
+    events = []
+    for block in body.decode('utf-8').strip().split('\n\n'):
+        event, data = block.split('\n')
+        events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+    return events
+
+
+@skipIf(llm.httpx is None, '流式分析需要 httpx')
+class AnalyzeStreamTests(BillTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def post(self, body, token=None):
+        async def request():
+            response = await AsyncClient().post(
+                '/api/analyze/stream/', body, content_type='application/json',
+                headers={'Authorization': f'Bearer {token or self.token}'},
+            )
+            if response.streaming:
+                content = b''.join([chunk async for chunk in response.streaming_content])
+            else:
+                content = response.content
+            return response, content
+
+        return async_to_sync(request)()
+
+    def stream(self, *parts, error=None):
+        async def stream_chat(client, messages, temperature=0.3, timeout=None, **extra):
+            for part in parts:
+                yield part
+            if error is not None:
+                raise error
+
+        return mock.patch.object(llm.AsyncDeepSeekClient, 'stream_chat', stream_chat)
+
+    def test_streams_deltas_then_done(self):
+        with self.stream('本月餐饮', '支出最多。'):
+            response, content = self.post({'text': '这个月吃饭花了多少？'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertEqual(parse_events(content), [
+            ('delta', {'content': '本月餐饮'}),
+            ('delta', {'content': '支出最多。'}),
+            ('done', {'analysis': '本月餐饮支出最多。'}),
+        ])
+        self.assertEqual(
+            list(AnalysisMessage.objects.values_list('role', 'content')),
+            [('user', '这个月吃饭花了多少？'), ('assistant', '本月餐饮支出最多。')],
+        )
+
+    def test_error_mid_stream_saves_nothing(self):
+        with self.stream('本月', error=llm.LLMError('connection reset')), self.assertLogs('bills.views', 'ERROR'):
+            _, content = self.post({'text': '这个月吃饭花了多少？'})
+        self.assertEqual(parse_events(content), [('delta', {'content': '本月'}), ('error', {'error': '调用分析服务时出错。'})])
+        self.assertFalse(AnalysisMessage.objects.exists())
+
+    def test_timeout(self):
+        with self.stream(error=llm.LLMTimeoutError('slow')):
+            _, content = self.post({'text': '这个月吃饭花了多少？'})
+        self.assertEqual(parse_events(content), [('error', {'error': '请求分析服务超时，请稍后重试。'})])
+
+    def test_rejects_bad_requests(self):
+        self.assertEqual(self.post({'text': ''})[0].status_code, 400)
+        self.assertEqual(self.post({'text': '你好'}, token='invalid')[0].status_code, 401)
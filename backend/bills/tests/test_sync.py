@@ -0,0 +1,93 @@
+"""账单增量同步（bills/sync.py 和 /api/bills/changes/）。"""
+import io
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from .. import sync
+from ..bulk import insert_bills
+from ..models import Bill, BillTombstone
+from . import BillTestCase
+
+
+class SyncTests(BillTestCase):
+
+    def setUp(self):
+        super().setUp()
+        rows = [
+            {'date': date(2026, 10, 1), 'type': 'expense', 'category': 'food', 'amount': Decimal(index + 1)}
+            for index in range(5)
+        ]
+        insert_bills(self.user, rows)
+        insert_bills(self.other, rows[:1])
+        # 已有账单的修改时间早于令牌回退的时间，不会在之后的同步里重复出现
+        Bill.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def changes(self, since=None, page_size=None, status_code=200):
+        params = {key: value for key, value in {'since': since, 'page_size': page_size}.items() if value}
+        response = self.client.get('/api/bills/changes/', params)
+        self.assertEqual(response.status_code, status_code, response.content)
+        return response.json()
+
+    def sync_all(self, since=None, page_size=None):
+        """沿 next 拉取到 has_more 为 false，返回 (账单 id, 删除的 id, 最后的令牌, 请求次数)。"""
+        changed, deleted, requests = [], [], 0
+        while True:
+            data = self.changes(since, page_size)
+            requests += 1
+            changed += [bill['id'] for bill in data['changed']]
+            deleted += data['deleted']
+            since = data['next']
+            if not data['has_more']:
+                return changed, deleted, since, requests
+
+    def test_first_sync_returns_all_bills_in_pages(self):
+        changed, deleted, _, requests = self.sync_all(page_size=2)
+        self.assertEqual(changed, list(Bill.objects.filter(user=self.user).order_by('id').values_list('id', flat=True)))
+        self.assertEqual(deleted, [])
+        self.assertEqual(requests, 3)
+
+    def test_next_sync_returns_only_changes(self):
+        _, _, token, _ = self.sync_all()
+        self.assertEqual(self.changes(token)['changed'], [])
+
+        bill = Bill.objects.filter(user=self.user).first()
+        response = self.client.patch(f'/api/bills/{bill.id}/', {'amount': '99.00'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        created = self.client.post('/api/bills/', {
+            'date': '2026-10-02', 'type': 'expense', 'category': 'food', 'amount': '5.00',
+        }, format='json').json()
+        removed = Bill.objects.filter(user=self.user).last()
+        self.assertEqual(self.client.delete(f'/api/bills/{removed.id}/').status_code, 204)
+
+        changed, deleted, _, _ = self.sync_all(token)
+        self.assertEqual(changed, [bill.id, created['id']])
+        self.assertEqual(deleted, [removed.id])
+
+    def test_bulk_delete_records_tombstones(self):
+        _, _, token, _ = self.sync_all()
+        ids = list(Bill.objects.filter(user=self.user).values_list('id', flat=True)[:2])
+        response = self.client.delete('/api/bills/bulk/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(self.sync_all(token)[1]), sorted(ids))
+
+    def test_invalid_token(self):
+        for token in ('not-a-token', sync.encode_token(timezone.now(), 0, timezone.now())[:-4]):
+            self.assertIn('error', self.changes(token, status_code=400))
+        self.changes(page_size='x', status_code=400)
+
+    def test_expired_token(self):
+        old = timezone.now() - timedelta(days=sync.get_config()['TOMBSTONE_DAYS'] + 1)
+        self.assertIn('error', self.changes(sync.encode_token(old, 0, old), status_code=410))
+
+    def test_prune_tombstones(self):
+        BillTombstone.objects.create(user=self.user, bill_id=1)
+        BillTombstone.objects.create(user=self.user, bill_id=2)
+        BillTombstone.objects.filter(bill_id=1).update(deleted_at=timezone.now() - timedelta(days=31))
+        out = io.StringIO()
+        call_command('prune_bill_tombstones', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertEqual(list(BillTombstone.objects.values_list('bill_id', flat=True)), [2])
+        self.assertEqual(sync.prune_tombstones(days=0), 1)
@@ -1,13 +1,24 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import BillViewSet, call_deepseek, analyze_text_view, get_analysis_history
+from .views import (
+    BillViewSet, bill_list, bill_detail, bill_today_summary,
+    call_deepseek, analyze_text_view, analyze_stream_view, get_analysis_history,
+    job_list, job_detail,
+)
 
 router = DefaultRouter()
 router.register(r'bills', BillViewSet, basename='bill')
 
 urlpatterns = [
+    # 账单的读取接口使用异步视图（ASGI 下不占线程），写操作仍由 BillViewSet 处理
+    path('bills/', bill_list, name='bill-list'),
+    path('bills/today_summary/', bill_today_summary, name='bill-today-summary'),
+    path('bills/<int:pk>/', bill_detail, name='bill-detail'),
     path('', include(router.urls)),
     path('deepseek/', call_deepseek, name='call_deepseek'),
     path('analyze/', analyze_text_view, name='analyze_text'),
+    path('analyze/stream/', analyze_stream_view, name='analyze_stream'),
     path('analyze/history/', get_analysis_history, name='get_analysis_history'),
+    path('jobs/', job_list, name='job_list'),
+    path('jobs/<int:job_id>/', job_detail, name='job_detail'),
 ] 
\ No newline at end of file
@@ -1,10 +1,19 @@
 #!/usr/bin/env python
 """
-从SQLite数据库导出数据为JSON格式
+把数据库导出为 NDJSON 文件（每张表一个文件，可压缩）
+
+    python export_data.py                                  # 全量导出到 exported_data/
+    python export_data.py --since 2024-06-01T00:00:00      # 只导出该时间之后修改过的数据
+    python export_data.py --user alice --user 3 --compress zstd
+
+按主键分批读取（keyset 分页），内存占用与数据量无关。
+用户表数据量小，每次都按 --user 条件全部导出，保证增量导入时账单的用户存在。
 """
 import os
 import sys
 import json
+import time
+import argparse
 import django
 
 # 设置Django环境
@@ -12,62 +21,138 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 django.setup()
 
 from django.contrib.auth.models import User
-from bills.models import Bill, AnalysisHistory
-
-def export_data():
-    """导出所有数据到JSON文件"""
-    # 导出用户数据
-    users_data = []
-    for user in User.objects.all():
-        users_data.append({
-            'id': user.id,
-            'username': user.username,
-            'password': user.password,  # 加密后的密码
-            'email': user.email,
-            'is_staff': user.is_staff,
-            'is_active': user.is_active,
-            'is_superuser': user.is_superuser,
-            'date_joined': str(user.date_joined),
-            'last_login': str(user.last_login) if user.last_login else None,
-        })
-
-    # 导出账单数据
-    bills_data = []
-    for bill in Bill.objects.all():
-        bills_data.append({
-            'id': bill.id,
-            'user_id': bill.user_id,
-            'remark': bill.remark,
-            'amount': str(bill.amount),
-            'type': bill.type,
-            'category': bill.category,
-            'date': str(bill.date),
-            'created_at': str(bill.created_at),
-            'updated_at': str(bill.updated_at),
-        })
-
-    # 导出分析历史数据
-    histories_data = []
-    for history in AnalysisHistory.objects.all():
-        histories_data.append({
-            'id': history.id,
-            'user_id': history.user_id,
-            'history': history.history,
-            'updated_at': str(history.updated_at),
-        })
-
-    # 将数据写入JSON文件
-    all_data = {
-        'users': users_data,
-        'bills': bills_data,
-        'analysis_histories': histories_data,
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from bills.models import Bill, AnalysisHistory, AnalysisMessage
+from bills import datafiles
+
+CHUNK_SIZE = 2000
+
+# 表名 -> (模型, 导出的字段, 增量导出时比较的时间字段, 用户字段)
+TABLE_SPECS = {
+    'users': (
+        User,
+        ['id', 'username', 'password', 'email', 'is_staff', 'is_active', 'is_superuser',
+         'date_joined', 'last_login'],
+        None,
+        'id',
+    ),
+    'bills': (
+        Bill,
+        ['id', 'user_id', 'remark', 'amount', 'type', 'category', 'date', 'created_at', 'updated_at'],
+        'updated_at',
+        'user_id',
+    ),
+    'analysis_histories': (
+        AnalysisHistory,
+        ['id', 'user_id', 'summary', 'summarized_until', 'updated_at'],
+        'updated_at',
+        'user_id',
+    ),
+    'analysis_messages': (
+        AnalysisMessage,
+        ['id', 'history_id', 'role', 'content', 'tokens', 'created_at'],
+        'created_at',
+        'history__user_id',
+    ),
+}
+
+
+def parse_since(value):
+    """--since 支持日期或带时区/不带时区的时间，不带时区时按 settings.TIME_ZONE 处理。"""
+    since = parse_datetime(value)
+    if since is None:
+        date = parse_date(value)
+        if date is None:
+            raise argparse.ArgumentTypeError(f'无法解析时间: {value}')
+        since = timezone.datetime.combine(date, timezone.datetime.min.time())
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def resolve_users(values):
+    """--user 可以是用户名或用户 id，返回用户 id 列表。"""
+    ids = [int(value) for value in values if value.isdigit()]
+    names = [value for value in values if not value.isdigit()]
+    user_ids = list(User.objects.filter(Q(id__in=ids) | Q(username__in=names)).values_list('id', flat=True))
+    missing = set(names) - set(User.objects.filter(username__in=names).values_list('username', flat=True))
+    if missing:
+        print(f"用户不存在: {', '.join(sorted(missing))}")
+    return user_ids
+
+
+def iter_rows(queryset, fields, chunk_size=CHUNK_SIZE):
+    """
+    按主键分批读取，每批一条 WHERE id > ? ORDER BY id LIMIT ? 查询。
+    MySQL 驱动不支持服务端游标，.iterator() 仍会把整个结果集读进内存，所以这里用 keyset 分页。
+    """
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).order_by('id').values_list(*fields)[:chunk_size])
+        if not rows:
+            return
+        for row in rows:
+            yield dict(zip(fields, row))
+        last_id = rows[-1][0]
+
+
+def export_table(table, directory, compress, since=None, user_ids=None):
+    model, fields, since_field, user_field = TABLE_SPECS[table]
+    queryset = model.objects.all()
+    if user_ids is not None:
+        queryset = queryset.filter(**{f'{user_field}__in': user_ids})
+    if since is not None and since_field:
+        queryset = queryset.filter(**{f'{since_field}__gte': since})
+
+    datafiles.remove_stale_tables(directory, table, compress)
+    count = 0
+    with datafiles.open_writer(datafiles.table_path(directory, table, compress), compress) as f:
+        for row in iter_rows(queryset, fields):
+            f.write(datafiles.dump_row(row))
+            count += 1
+    return count
+
+
+def export_data(directory='exported_data', compress='gzip', since=None, users=None):
+    """导出所有数据到 directory，返回每张表的行数"""
+    os.makedirs(directory, exist_ok=True)
+    user_ids = resolve_users(users) if users else None
+    exported_at = timezone.now()
+
+    counts = {}
+    for table in datafiles.TABLES:
+        started = time.monotonic()
+        counts[table] = export_table(table, directory, compress, since, user_ids)
+        elapsed = time.monotonic() - started
+        print(f"{table}: {counts[table]} 行, {elapsed:.1f}s ({counts[table] / max(elapsed, 0.001):.0f} 行/秒)")
+
+    # 下次增量导出可以使用 manifest 中的 exported_at 作为 --since
+    manifest = {
+        'exported_at': exported_at.isoformat(),
+        'since': since.isoformat() if since else None,
+        'users': user_ids,
+        'compress': compress,
+        'counts': counts,
     }
+    with open(os.path.join(directory, datafiles.MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=4)
+
+    print(f"已导出 {counts['users']} 个用户, {counts['bills']} 个账单, "
+          f"{counts['analysis_histories']} 个分析历史记录, {counts['analysis_messages']} 条分析消息到 {directory}")
+    return counts
+
 
-    with open('exported_data.json', 'w', encoding='utf-8') as f:
-        json.dump(all_data, f, ensure_ascii=False, indent=4)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='把数据库导出为 NDJSON 文件')
+    parser.add_argument('--output', default='exported_data', help='导出目录')
+    parser.add_argument('--compress', choices=sorted(datafiles.EXTENSIONS), default='gzip')
+    parser.add_argument('--since', type=parse_since, help='只导出该时间之后修改过的数据')
+    parser.add_argument('--user', action='append', help='只导出指定用户（用户名或 id），可以重复')
+    args = parser.parse_args(argv)
+    export_data(args.output, args.compress, args.since, args.user)
 
-    print(f"已导出 {len(users_data)} 个用户, {len(bills_data)} 个账单, {len(histories_data)} 个分析历史记录")
-    return all_data
 
 if __name__ == '__main__':
-    export_data() 
\ No newline at end of file
+    main()
@@ -0,0 +1,36 @@
+"""
+生产环境的 gunicorn 配置（ASGI，uvicorn worker），在 backend 目录下启动时自动读取：
+
+    gunicorn backend.asgi:application
+
+每个 worker 是一个事件循环，记账和智能分析接口在等待 DeepSeek 时不占线程，
+一个进程可以同时处理几百个请求；worker 数按 CPU 核数设置即可，不需要按并发数增加。
+每个 worker 有自己的数据库连接池（backend/dbpool.py），最多 POOL_SIZE + MAX_OVERFLOW 个连接，
+workers 乘以这个数需要小于 MySQL 的 max_connections。
+以下参数都可以用环境变量覆盖。
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'uvicorn_worker.UvicornWorker'
+
+# 大于 DEEPSEEK['READ_TIMEOUT'] 加上重试的时间，避免正在等待 DeepSeek 的 worker 被杀掉
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 180))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 60))
+keepalive = 5
+
+# 定期重启 worker，释放可能的内存泄漏；jitter 避免所有 worker 同时重启
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = 1000
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def child_exit(server, worker):
+    # 多进程部署时清理退出的 worker 留下的 prometheus 指标文件，见 bills/metrics.py
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
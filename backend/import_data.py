@@ -1,10 +1,28 @@
 #!/usr/bin/env python
 """
-将JSON数据导入MySQL数据库
+把 export_data.py 导出的 NDJSON 数据导入数据库
+
+    python import_data.py                                   # 从 exported_data/ 导入，已存在的数据跳过
+    python import_data.py dump/ --on-conflict update        # 已存在的账单/对话用导出的数据覆盖
+    python import_data.py dump/ --workers 4                 # 账单和分析消息用 4 个进程并行导入
+    python import_data.py exported_data.json                # 兼容旧版 export_data.py 导出的单个 JSON 文件
+
+按批读取、按批提交：每批一次 IN 查询判断哪些记录已存在，再用一条 bulk_create 写入，
+同时维护 DailyBillRollup。用户已存在（用户名相同）时不会覆盖，账单等数据归到已有用户下。
+新增的记录保留导出时的 created_at / updated_at；被覆盖的账单和分析历史的 updated_at 改为导入时间，
+增量同步（/api/bills/changes/）和下次增量导出才能看到这些修改。
+多进程导入时某一批遇到数据库死锁会整批回滚，稍后重试。
 """
 import os
 import sys
 import json
+import time
+import random
+import argparse
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
 import django
 
 # 设置Django环境
@@ -12,106 +30,452 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 django.setup()
 
 from django.contrib.auth.models import User
-from bills.models import Bill, AnalysisHistory
-from django.db import transaction
-
-def import_data(json_file_path='exported_data.json'):
-    """从JSON文件导入数据到MySQL数据库"""
-    print(f"开始从 {json_file_path} 导入数据...")
-    
-    # 读取JSON文件
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import DatabaseError, OperationalError, connection, connections, transaction
+from django.utils import timezone
+from bills.models import Bill, AnalysisHistory, AnalysisMessage
+from bills.conversation import estimate_tokens
+from bills.cache import invalidate_user_summaries
+from bills import datafiles, rollup
+
+CHUNK_SIZE = 2000
+PROGRESS_INTERVAL = 5
+DEADLOCK_RETRIES = 3
+
+# 导入过程中共享的状态：导出数据里的 id -> 本库 id，fork 出的子进程会继承
+STATE = {
+    'on_conflict': 'skip',
+    'user_map': {},
+    'history_map': {},
+}
+
+# 单条记录数据不合法时 bulk_create 可能抛出的异常
+ROW_ERRORS = (DatabaseError, ValidationError, ValueError, TypeError)
+
+BILL_FIELDS = ['user_id', 'remark', 'amount', 'type', 'category', 'date', 'created_at', 'updated_at']
+MESSAGE_FIELDS = ['history_id', 'role', 'content', 'tokens', 'created_at']
+
+
+@contextmanager
+def preserve_timestamps(*models):
+    """
+    导入时保留原始的 created_at / updated_at。
+    auto_now / auto_now_add 字段在 bulk_create 时会被改成当前时间，这里在当前进程里暂时关闭。
+    """
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    flags = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
     try:
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except Exception as e:
-        print(f"读取JSON文件失败: {e}")
-        return False
-    
-    users_count = 0
-    bills_count = 0
-    histories_count = 0
-    
-    # 使用事务保证数据一致性
-    with transaction.atomic():
-        # 导入用户数据
-        print("导入用户数据...")
-        for user_data in data.get('users', []):
-            try:
-                # 检查用户是否已存在
-                if not User.objects.filter(username=user_data['username']).exists():
-                    user = User(
-                        id=user_data['id'],
-                        username=user_data['username'],
-                        email=user_data['email'],
-                        password=user_data['password'],
-                        is_staff=user_data['is_staff'],
-                        is_active=user_data['is_active'],
-                        is_superuser=user_data['is_superuser'],
-                    )
-                    if user_data['date_joined']:
-                        user.date_joined = user_data['date_joined']
-                    if user_data['last_login']:
-                        user.last_login = user_data['last_login']
-                    user.save()
-                    users_count += 1
-                else:
-                    print(f"用户 {user_data['username']} 已存在，跳过")
-            except Exception as e:
-                print(f"导入用户 {user_data.get('username', 'unknown')} 失败: {e}")
-                continue
-        
-        # 导入账单数据
-        print("导入账单数据...")
-        for bill_data in data.get('bills', []):
-            try:
-                # 检查账单是否已存在
-                if not Bill.objects.filter(id=bill_data['id']).exists():
-                    user = User.objects.get(id=bill_data['user_id'])
-                    bill = Bill(
-                        id=bill_data['id'],
-                        user=user,
-                        remark=bill_data['remark'],
-                        amount=bill_data['amount'],
-                        type=bill_data['type'],
-                        category=bill_data['category'],
-                        date=bill_data['date'],
-                        created_at=bill_data['created_at'],
-                        updated_at=bill_data['updated_at'],
-                    )
-                    bill.save()
-                    bills_count += 1
-                else:
-                    print(f"账单ID {bill_data['id']} 已存在，跳过")
-            except Exception as e:
-                print(f"导入账单ID {bill_data.get('id', 'unknown')} 失败: {e}")
-                continue
-        
-        # 导入分析历史数据
-        print("导入分析历史数据...")
-        for history_data in data.get('analysis_histories', []):
+        yield
+    finally:
+        for field, auto_now, auto_now_add in flags:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _conflict_options(update_fields):
+    """bulk_create 的冲突处理参数：没有 update_fields 时忽略冲突；MySQL 不支持指定 unique_fields。"""
+    if not update_fields:
+        return {'ignore_conflicts': True}
+    options = {'update_conflicts': True, 'update_fields': update_fields}
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = ['id']
+    return options
+
+
+def _update_fields(fields):
+    return fields if STATE['on_conflict'] == 'update' else None
+
+
+def is_deadlock(error):
+    """MySQL 的 1213 / PostgreSQL 的 40P01：数据库已经回滚了整个事务，只能整批重试。"""
+    code = error.args[0] if error.args else None
+    return code == 1213 or getattr(error.__cause__, 'pgcode', None) == '40P01'
+
+
+def _bulk_create(model, objs, update_fields):
+    """
+    写入一批记录，返回实际写入的记录。
+    忽略冲突时 bulk_create 会原样返回所有对象，这里先查出主键已存在的记录，把它们排除。
+    """
+    options = _conflict_options(update_fields)
+    existing = set()
+    if options.get('ignore_conflicts'):
+        pks = [obj.pk for obj in objs if obj.pk is not None]
+        if pks:
+            existing = set(model.objects.filter(pk__in=pks).values_list('pk', flat=True))
+    saved = [obj for obj in objs if obj.pk is None or obj.pk not in existing]
+    model.objects.bulk_create(objs, batch_size=len(objs), **options)
+    return saved
+
+
+def _save_chunk(model, objs, stats, label, update_fields=None):
+    """
+    一批记录在一个事务里写入；整批失败时逐条重试，找出有问题的记录。
+    返回实际写入的记录，主键冲突被忽略的记录计入 skipped。
+    """
+    if not objs:
+        return []
+    try:
+        with transaction.atomic():
+            saved = _bulk_create(model, objs, update_fields)
+    except ROW_ERRORS as e:
+        if isinstance(e, OperationalError) and is_deadlock(e):
+            raise
+        saved = []
+        failed = 0
+        for obj in objs:
             try:
-                # 检查历史记录是否已存在
-                if not AnalysisHistory.objects.filter(id=history_data['id']).exists():
-                    user = User.objects.get(id=history_data['user_id'])
-                    history = AnalysisHistory(
-                        id=history_data['id'],
-                        user=user,
-                        history=history_data['history'],
-                        updated_at=history_data['updated_at'],
-                    )
-                    history.save()
-                    histories_count += 1
-                else:
-                    print(f"分析历史ID {history_data['id']} 已存在，跳过")
-            except Exception as e:
-                print(f"导入分析历史ID {history_data.get('id', 'unknown')} 失败: {e}")
-                continue
-    
-    print(f"数据导入完成: {users_count} 个用户, {bills_count} 个账单, {histories_count} 个分析历史记录")
+                with transaction.atomic():
+                    saved += _bulk_create(model, [obj], update_fields)
+            except ROW_ERRORS as e:
+                if isinstance(e, OperationalError) and is_deadlock(e):
+                    raise
+                failed += 1
+                stats['failed'] += 1
+                if stats['failed'] <= 20:
+                    print(f"导入{label} ID {obj.pk} 失败: {e}")
+        stats['skipped'] += len(objs) - len(saved) - failed
+        return saved
+    stats['skipped'] += len(objs) - len(saved)
+    return saved
+
+
+def import_users(rows):
+    """用户不覆盖：用户名已存在时沿用已有用户，只记录 id 的对应关系。"""
+    stats = Counter()
+    names = [row['username'] for row in rows]
+    existing = dict(User.objects.filter(username__in=names).values_list('username', 'id'))
+    new_users = []
+    for row in rows:
+        if row['username'] in existing:
+            stats['skipped'] += 1
+            continue
+        new_users.append(User(
+            id=row['id'],
+            username=row['username'],
+            email=row.get('email', ''),
+            password=row['password'],
+            is_staff=row.get('is_staff', False),
+            is_active=row.get('is_active', True),
+            is_superuser=row.get('is_superuser', False),
+            date_joined=row['date_joined'],
+            last_login=row.get('last_login'),
+        ))
+    # 写入失败和 id 冲突都在下面按用户名核对时计入 failed
+    _save_chunk(User, new_users, Counter(), '用户')
+
+    # id 冲突被忽略的用户不会出现在结果里
+    created = dict(User.objects.filter(username__in=names).values_list('username', 'id'))
+    for row in rows:
+        if row['username'] in created:
+            STATE['user_map'][row['id']] = created[row['username']]
+            if row['username'] not in existing:
+                stats['created'] += 1
+        else:
+            stats['failed'] += 1
+            print(f"导入用户 {row['username']} 失败: id {row['id']} 已被其他用户占用")
+    return stats, set()
+
+
+def import_bills(rows):
+    stats = Counter()
+    user_map = STATE['user_map']
+    bills = []
+    for row in rows:
+        user_id = user_map.get(row['user_id'])
+        if user_id is None:
+            stats['skipped'] += 1
+            continue
+        bills.append(Bill(
+            id=row.get('id'),
+            user_id=user_id,
+            remark=row['remark'],
+            amount=row['amount'],
+            type=row['type'],
+            category=row['category'],
+            date=row['date'],
+            created_at=row['created_at'],
+            updated_at=row['updated_at'],
+        ))
+
+    # 一次 IN 查询取出已存在账单的汇总维度，覆盖时先从汇总里扣除
+    existing = {
+        row[0]: row[1:]
+        for row in Bill.objects.filter(id__in=[bill.id for bill in bills if bill.id]).values_list(
+            'id', 'user_id', 'date', 'type', 'category', 'amount'
+        )
+    }
+    if STATE['on_conflict'] == 'update':
+        now = timezone.now()
+        for bill in bills:
+            if bill.id in existing:
+                bill.updated_at = now
+        stats['updated'] += sum(1 for bill in bills if bill.id in existing)
+    else:
+        stats['skipped'] += sum(1 for bill in bills if bill.id in existing)
+        bills = [bill for bill in bills if bill.id not in existing]
+
+    with transaction.atomic():
+        saved = _save_chunk(Bill, bills, stats, '账单', _update_fields(BILL_FIELDS))
+        rollup.remove_states(existing[bill.id] for bill in saved if bill.id in existing)
+        rollup.add_bills(saved)
+    stats['created'] += sum(1 for bill in saved if bill.id not in existing)
+    return stats, {bill.user_id for bill in saved}
+
+
+def import_histories(rows):
+    """每个用户只有一个分析历史：用户已有对话时，导入的消息并入已有对话。"""
+    stats = Counter()
+    user_map = STATE['user_map']
+    stats['skipped'] += sum(1 for row in rows if row['user_id'] not in user_map)
+    rows = [dict(row, user_id=user_map[row['user_id']]) for row in rows if row['user_id'] in user_map]
+    existing = dict(
+        AnalysisHistory.objects.filter(user_id__in=[row['user_id'] for row in rows]).values_list('user_id', 'id')
+    )
+    new_histories = []
+    updated = []
+    for row in rows:
+        history_id = existing.get(row['user_id'])
+        if history_id is None:
+            new_histories.append(AnalysisHistory(
+                id=row['id'],
+                user_id=row['user_id'],
+                summary=row.get('summary', ''),
+                summarized_until=row.get('summarized_until', 0),
+                updated_at=row['updated_at'],
+            ))
+        elif history_id == row['id'] and STATE['on_conflict'] == 'update':
+            updated.append(AnalysisHistory(
+                id=history_id, user_id=row['user_id'], summary=row.get('summary', ''),
+                summarized_until=row.get('summarized_until', 0), updated_at=timezone.now(),
+            ))
+        else:
+            stats['skipped'] += 1
+
+    _save_chunk(AnalysisHistory, new_histories, stats, '分析历史')
+    if updated:
+        AnalysisHistory.objects.bulk_update(updated, ['summary', 'summarized_until', 'updated_at'])
+        stats['updated'] += len(updated)
+
+    current = dict(
+        AnalysisHistory.objects.filter(user_id__in=[row['user_id'] for row in rows]).values_list('user_id', 'id')
+    )
+    for row in rows:
+        if row['user_id'] in current:
+            STATE['history_map'][row['id']] = current[row['user_id']]
+            if row['user_id'] not in existing:
+                stats['created'] += 1
+    return stats, set()
+
+
+def import_messages(rows):
+    stats = Counter()
+    history_map = STATE['history_map']
+    messages = []
+    for row in rows:
+        history_id = history_map.get(row['history_id'])
+        if history_id is None:
+            stats['skipped'] += 1
+            continue
+        messages.append(AnalysisMessage(
+            id=row.get('id'),
+            history_id=history_id,
+            role=row['role'],
+            content=row['content'],
+            tokens=row.get('tokens') or estimate_tokens(row['content']),
+            created_at=row['created_at'],
+        ))
+
+    existing = set(
+        AnalysisMessage.objects.filter(id__in=[message.id for message in messages if message.id])
+        .values_list('id', flat=True)
+    )
+    if STATE['on_conflict'] == 'update':
+        stats['updated'] += len(existing)
+    else:
+        stats['skipped'] += len(existing)
+        messages = [message for message in messages if message.id not in existing]
+    saved = _save_chunk(AnalysisMessage, messages, stats, '分析消息', _update_fields(MESSAGE_FIELDS))
+    stats['created'] += sum(1 for message in saved if message.id not in existing)
+    return stats, set()
+
+
+# 表名 -> (导入函数, 能否多进程并行)；用户和分析历史需要在主进程里建立 id 对应关系
+IMPORTERS = {
+    'users': (import_users, False),
+    'bills': (import_bills, True),
+    'analysis_histories': (import_histories, False),
+    'analysis_messages': (import_messages, True),
+}
+
+
+class Progress:
+    def __init__(self, table):
+        self.table = table
+        self.rows = 0
+        self.stats = Counter()
+        self.started = self.reported = time.monotonic()
+
+    def add(self, rows, stats):
+        self.rows += rows
+        self.stats.update(stats)
+        if time.monotonic() - self.reported >= PROGRESS_INTERVAL:
+            self.report()
+
+    def report(self, final=False):
+        self.reported = time.monotonic()
+        elapsed = self.reported - self.started
+        print(
+            f"{self.table}{'完成' if final else ''}: {self.rows} 行, 新增 {self.stats['created']}, "
+            f"更新 {self.stats['updated']}, 跳过 {self.stats['skipped']}, 失败 {self.stats['failed']}, "
+            f"{elapsed:.1f}s ({self.rows / max(elapsed, 0.001):.0f} 行/秒)"
+        )
+
+
+def _run_chunk(table, rows):
+    """导入一批；遇到死锁时数据库已回滚这一批的事务，等待片刻后整批重试。"""
+    for attempt in range(DEADLOCK_RETRIES + 1):
+        try:
+            stats, user_ids = IMPORTERS[table][0](rows)
+            return len(rows), stats, user_ids
+        except OperationalError as e:
+            if not is_deadlock(e) or attempt == DEADLOCK_RETRIES:
+                raise
+            time.sleep(random.uniform(0.05, 0.2) * (attempt + 1))
+
+
+def import_table(table, rows, workers=1, chunk_size=CHUNK_SIZE):
+    """导入一张表，返回 (统计, 涉及的用户 id)。"""
+    progress = Progress(table)
+    touched = set()
+    parallel = IMPORTERS[table][1] and workers > 1
+    if not parallel:
+        for chunk in chunked(rows, chunk_size):
+            count, stats, user_ids = _run_chunk(table, chunk)
+            progress.add(count, stats)
+            touched |= user_ids
+    else:
+        # 子进程通过 fork 继承 STATE，不能复用父进程的数据库连接
+        connections.close_all()
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) as pool:
+            pending = set()
+            for chunk in chunked(rows, chunk_size):
+                # 限制同时在途的批次数，保持内存占用稳定
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        count, stats, user_ids = future.result()
+                        progress.add(count, stats)
+                        touched |= user_ids
+                pending.add(pool.submit(_run_chunk, table, chunk))
+            for future in pending:
+                count, stats, user_ids = future.result()
+                progress.add(count, stats)
+                touched |= user_ids
+    progress.report(final=True)
+    return progress.stats, touched
+
+
+def legacy_tables(json_file_path):
+    """旧版 export_data.py 导出的单个 JSON 文件，分析消息嵌在 history 字段里。"""
+    with open(json_file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    messages = [
+        dict(message, history_id=history['id'], created_at=history['updated_at'])
+        for history in data.get('analysis_histories', [])
+        for message in history.get('history', [])
+    ]
+    return {
+        'users': data.get('users', []),
+        'bills': data.get('bills', []),
+        'analysis_histories': data.get('analysis_histories', []),
+        'analysis_messages': messages,
+    }
+
+
+def ndjson_tables(directory):
+    """按 manifest.json 记录的压缩方式读取各表的文件。"""
+    manifest = datafiles.read_manifest(directory)
+    compress = manifest.get('compress') if manifest else None
+    tables = {}
+    for table in datafiles.TABLES:
+        path, table_compress = datafiles.find_table(directory, table, compress)
+        tables[table] = datafiles.read_rows(path, table_compress) if path else []
+    return tables
+
+
+def reset_sequences():
+    """显式写入 id 后，PostgreSQL 需要重置自增序列；MySQL 和 SQLite 会自动调整。"""
+    statements = connection.ops.sequence_reset_sql(no_style(), [User, Bill, AnalysisHistory, AnalysisMessage])
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def import_data(source='exported_data', on_conflict='skip', workers=1, chunk_size=CHUNK_SIZE):
+    """从导出目录（或旧版 JSON 文件）导入数据"""
+    print(f"开始从 {source} 导入数据...")
+    if os.path.isdir(source):
+        try:
+            tables = ndjson_tables(source)
+        except ValueError as e:
+            print(f"读取导出目录失败: {e}")
+            return False
+    else:
+        try:
+            tables = legacy_tables(source)
+        except Exception as e:
+            print(f"读取JSON文件失败: {e}")
+            return False
+
+    STATE.update(on_conflict=on_conflict, user_map={}, history_map={})
+
+    started = time.monotonic()
+    totals = {}
+    touched = set()
+    with preserve_timestamps(Bill, AnalysisHistory, AnalysisMessage):
+        for table in datafiles.TABLES:
+            totals[table], user_ids = import_table(table, tables[table], workers, chunk_size)
+            touched |= user_ids
+    reset_sequences()
+    for user_id in touched:
+        invalidate_user_summaries(user_id)
+
+    print(
+        f"数据导入完成: {totals['users']['created']} 个用户, {totals['bills']['created']} 个账单, "
+        f"{totals['analysis_histories']['created']} 个分析历史记录, {totals['analysis_messages']['created']} 条分析消息, "
+        f"耗时 {time.monotonic() - started:.1f}s"
+    )
     return True
 
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='导入 export_data.py 导出的数据')
+    parser.add_argument('source', nargs='?', default='exported_data', help='导出目录或旧版 JSON 文件')
+    parser.add_argument('--on-conflict', choices=['skip', 'update'], default='skip',
+                        help='账单、分析历史和消息已存在时跳过还是覆盖（用户始终不覆盖，覆盖的记录 updated_at 改为导入时间）')
+    parser.add_argument('--workers', type=int, default=1, help='导入账单和分析消息的进程数')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='每批写入的行数')
+    args = parser.parse_args(argv)
+    return import_data(args.source, args.on_conflict, args.workers, args.chunk_size)
+
+
 if __name__ == '__main__':
-    if len(sys.argv) > 1:
-        import_data(sys.argv[1])
-    else:
-        import_data() 
\ No newline at end of file
+    sys.exit(0 if main() else 1)
@@ -12,6 +12,7 @@ import type { Dayjs } from 'dayjs'; // Type import grouped with dayjs
 import isBetween from 'dayjs/plugin/isBetween';
 // Group local component/style imports
 import BillForm from './BillForm';
+import { postAndWait, JobFailedError } from '../jobs';
 import { Column, Line } from '@ant-design/plots';
 import './BillList.css';
 
@@ -178,25 +179,23 @@ const BillList: React.FC<BillListProps> = ({ onDataChange, apiClient }) => {
         setAnalysisLoading(true);
 
         try {
-            // 使用缓存的账单数据构建请求
-            const cachedBills = localStorage.getItem('cachedBills');
-            const billsData = cachedBills ? JSON.parse(cachedBills) : [];
-            
-            const response = await apiClient.post<{ analysis: string, conversation_history: any[] }>('/api/analyze/', { 
-                text: currentInput,
-                bills: billsData // 每次都发送最新的账单数据
+            // 账单数据由后端从数据库汇总，不再上传；分析在后台任务中完成
+            const result = await postAndWait<{ analysis: string, conversation_history: any[] }>(apiClient, '/api/analyze/', {
+                text: currentInput
             });
-            
+
             const aiMessage: ChatMessage = {
                 id: Date.now() + 1,
                 sender: 'ai',
-                content: response.data.analysis
+                content: result.analysis
             };
             setChatMessages(prev => [...prev, aiMessage]);
         } catch (error) {
             console.error("Analysis request failed:", error);
             const axiosError = error as AxiosError<any>;
-            const errorMessage = axiosError.response?.data?.detail || axiosError.response?.data?.error || '分析请求失败，请稍后再试';
+            const errorMessage = error instanceof JobFailedError
+                ? error.message
+                : axiosError.response?.data?.detail || axiosError.response?.data?.error || '分析请求失败，请稍后再试';
             message.error(errorMessage);
 
             const errorAiMessage: ChatMessage = {
@@ -458,22 +457,19 @@ const BillList: React.FC<BillListProps> = ({ onDataChange, apiClient }) => {
      // This function likely belongs to the "自然语言输入" (Bill creation) Modal, keep it separate
       const callDeepseekAPI = useCallback(async (input: string) => {
         try {
-            const response = await apiClient.post(
-                '/api/deepseek/', // Endpoint for CREATING bills via NLP
-                { input },
-                { headers: { 'Content-Type': 'application/json' } }
-            );
-            if (response.data.status === 'success') {
-                message.success(response.data.message);
+            // Endpoint for CREATING bills via NLP, runs as a background job
+            const result = await postAndWait(apiClient, '/api/deepseek/', { input });
+            if (result.status === 'success') {
+                message.success(result.message);
                 fetchBills();
                 onDataChange(); // Refresh header summary
             } else {
-                message.error(response.data.message || '处理失败');
+                message.error(result.message || '处理失败');
             }
-            return response.data;
+            return result;
         } catch (error) {
             console.error('调用 Deepseek API (for bill creation) 失败:', error);
-            message.error('调用账单创建服务失败');
+            message.error(error instanceof JobFailedError ? error.message : '调用账单创建服务失败');
             throw error; // Re-throw to be caught by modal handler
         }
     }, [apiClient, fetchBills, onDataChange]); // Dependencies
@@ -0,0 +1,58 @@
+import { AxiosInstance } from 'axios';
+
+// 记账（/api/deepseek/）和智能分析（/api/analyze/）默认提交后台任务：
+// 返回 202 和 job_id，轮询 /api/jobs/<id>/ 直到任务结束，结果与同步返回的内容相同
+
+interface JobSubmitted {
+    job_id: number;
+    status: string;
+    status_url: string;
+}
+
+interface JobStatus {
+    status: 'pending' | 'running' | 'succeeded' | 'failed';
+    result: any;
+    status_code: number | null;
+    error: string;
+}
+
+const POLL_INTERVAL_MS = 1000;
+const POLL_TIMEOUT_MS = 3 * 60 * 1000;
+
+export class JobFailedError extends Error {
+    result: any;
+
+    constructor(message: string, result?: any) {
+        super(message);
+        this.name = 'JobFailedError';
+        this.result = result;
+    }
+}
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
+
+/**
+ * 提交请求，返回 202 时等待后台任务完成，返回任务结果；
+ * 服务端配置为在请求内完成时直接返回响应内容。任务失败时抛出 JobFailedError。
+ */
+export async function postAndWait<T = any>(apiClient: AxiosInstance, url: string, data: unknown): Promise<T> {
+    const response = await apiClient.post(url, data, { headers: { 'Content-Type': 'application/json' } });
+    if (response.status !== 202) {
+        return response.data as T;
+    }
+
+    const { status_url } = response.data as JobSubmitted;
+    const deadline = Date.now() + POLL_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+        await sleep(POLL_INTERVAL_MS);
+        const { data: job } = await apiClient.get<JobStatus>(status_url);
+        if (job.status === 'succeeded') {
+            return job.result as T;
+        }
+        if (job.status === 'failed') {
+            const reason = job.result?.error || job.result?.message || job.error || '任务执行失败';
+            throw new JobFailedError(reason, job.result);
+        }
+    }
+    throw new JobFailedError('任务仍在排队，请稍后刷新查看结果');
+}